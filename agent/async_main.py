@@ -0,0 +1,211 @@
+"""
+Asyncio execution path: the same check cycle as agent.main, but every source fetch,
+per-message Gmail get and notifier send runs on one event loop over a shared
+httpx connection pool, bounded by the run.*_concurrency semaphores.
+
+Selected with `python agent/main.py --async` (or run.use_async: true).
+"""
+import asyncio
+import logging
+from typing import List, Optional
+
+import httpx
+
+from agent.config.schema import AppConfig
+from agent.time.window import TimeWindow
+from agent.mail.client import AsyncEmailClient
+from agent.mail.factory import create_async_email_client, only_unread
+from agent.notifier.manager import AsyncNotificationManager
+from agent.slack.client import AsyncSlackSessionClient
+from agent.state.lease import Lease
+from agent.state.store import StateStore
+from agent.deadline import DEADLINE
+from agent.tracing import span
+from agent.main import (
+    CHECK_ERRORS, RUN_SECONDS, RUNS, CheckCycle, enabled_sources, leader_lease, meet_alerts, next_check_delay,
+    raise_check_error, recall_meet_scan, save_slack_state, slack_alerts, slack_check_error, slack_client_options,
+    slack_name_cache, slack_seen, wait_for_next_check, wake_source, write_trace,
+)
+from agent.metrics.server import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+
+def create_http_client(config: AppConfig) -> httpx.AsyncClient:
+    """One connection pool for every async client in the process."""
+    limits = httpx.Limits(max_connections=config.run.max_connections,
+                          max_keepalive_connections=config.run.max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=30)
+
+
+async def check_slack(config: AppConfig, http: httpx.AsyncClient, state: Optional[StateStore] = None) -> List[str]:
+    """Async counterpart of agent.main.check_slack."""
+    logger.info("Checking Slack API...")
+    try:
+        cache = slack_name_cache(config, state)
+        slack_client = AsyncSlackSessionClient(http=http, **slack_client_options(config, cache))
+        result = await slack_client.get_unread_count()
+
+        mentions = []
+        if config.slack.fetch_mentions:
+            try:
+                mentions, seen = await slack_client.get_mentions(result['raw_data'], slack_seen(state))
+                save_slack_state(state, seen, cache)
+            except Exception as e:
+                logger.error("Fetching Slack mentions failed: %s", e)
+        return slack_alerts(config, result['unread_count'], mentions)
+    except Exception as e:
+        return slack_check_error(e)
+
+
+async def check_meet(config: AppConfig, http: httpx.AsyncClient, email_client: Optional[AsyncEmailClient] = None,
+                     matched: Optional[List[str]] = None, state: Optional[StateStore] = None) -> List[str]:
+    """Async counterpart of agent.main.check_meet."""
+    logger.info("Checking mail for Meet invitations...")
+    owned = email_client is None
+    try:
+        if owned:
+            email_client = create_async_email_client(config, http, state)
+            await email_client.connect()
+
+        fingerprint = await email_client.fingerprint() if config.meet.precheck and state is not None else None
+        alerts = recall_meet_scan(config, state, fingerprint, matched)
+        if alerts is None:
+            emails = await email_client.get_emails(sender_filter=config.meet.sender, only_unread=only_unread(config))
+            alerts = meet_alerts(config, state, fingerprint, emails, matched)
+        return alerts
+    except Exception as e:
+        raise_check_error("Meet", e)
+    finally:
+        if owned and email_client is not None:
+            await email_client.close()
+
+
+async def acknowledge_meet(config: AppConfig, http: httpx.AsyncClient,
+                           email_client: Optional[AsyncEmailClient], email_ids: List[str]):
+    """Async counterpart of agent.main.acknowledge_meet."""
+    if not email_ids or config.meet.acknowledge == "none":
+        return
+    owned = email_client is None
+    try:
+        if owned:
+            email_client = create_async_email_client(config, http)
+            await email_client.connect()
+        await email_client.acknowledge(email_ids, config.meet.acknowledge, config.meet.ack_label)
+    except Exception as e:
+        logger.error("Acknowledging Meet emails failed: %s", e)
+    finally:
+        if owned and email_client is not None:
+            await email_client.close()
+
+
+async def poll_source(cycle: CheckCycle, source: str, check) -> List[str]:
+    """
+    Async counterpart of agent.main.poll_source; `check` is a coroutine function.
+    A check still running at the deadline is cancelled.
+    """
+    messages = cycle.recall(source)
+    if messages is not None:
+        return messages
+    try:
+        with cycle.checking(source):
+            async with asyncio.timeout(DEADLINE.remaining()):
+                messages = await check()
+    except CHECK_ERRORS as e:
+        return cycle.failed(source, e)
+    return cycle.record(source, messages)
+
+
+async def run_once(config: AppConfig, http: httpx.AsyncClient, notifier_manager: AsyncNotificationManager,
+                   email_client: Optional[AsyncEmailClient] = None, state: Optional[StateStore] = None,
+                   lease: Optional[Lease] = None) -> bool:
+    """
+    Async counterpart of agent.main.run_once: all enabled sources are checked concurrently.
+    Returns False if alerts were triggered but could not be delivered.
+    """
+    with span("run"), RUN_SECONDS.time(), DEADLINE.run(config.run.deadline):
+        # The lease file is small and local; locking it doesn't need a worker thread.
+        cycle = CheckCycle(config, state, lease)
+        checks = {
+            "slack": lambda: check_slack(config, http, state),
+            "meet": lambda: check_meet(config, http, email_client, cycle.meet_ids, state),
+        }
+        # Alerts keep the source order (Slack first) regardless of which finished first.
+        with DEADLINE.hold_back(config.run.notify_reserve):
+            results = await asyncio.gather(*(poll_source(cycle, source, checks[source])
+                                             for source in enabled_sources(config)))
+
+        message = cycle.collect(results)
+        if message is not None:
+            cycle.sent(message, await notifier_manager.notify(message))
+        elif cycle.all_clear:
+            await notifier_manager.resolve()
+        await acknowledge_meet(config, http, email_client, cycle.to_acknowledge())
+        return cycle.finish()
+
+
+async def _wait_for_next_check(config: AppConfig, email_client: Optional[AsyncEmailClient], timeout: float) -> bool:
+    """Sleep until the next check; blocking push-capable clients (IMAP IDLE) wait in a worker thread."""
+    client = getattr(email_client, "client", None)
+    if hasattr(client, "wait_for_changes"):
+        return await asyncio.to_thread(wait_for_next_check, config, client, timeout)
+    await asyncio.sleep(timeout)
+    return False
+
+
+async def run(config: AppConfig, daemon: bool = False, state: Optional[StateStore] = None,
+              lease: Optional[Lease] = None) -> bool:
+    """
+    Run one check cycle (or, with `daemon`, keep checking every run.interval seconds)
+    on a single event loop. Returns the result of the last cycle.
+    """
+    if state is None:
+        state = StateStore()
+    if daemon and lease is None:
+        lease = leader_lease(config)
+    async with create_http_client(config) as http:
+        notifier_manager = AsyncNotificationManager(
+            config.notifications, http, max_concurrency=config.run.notify_concurrency, state=state)
+
+        if not daemon:
+            return await run_once(config, http, notifier_manager, state=state, lease=lease)
+
+        if config.metrics.enabled:
+            start_metrics_server(config.metrics.port, host=config.metrics.host)
+
+        # Keep one mail connection for the lifetime of the daemon.
+        email_client = None
+        if config.meet and config.meet.enabled:
+            try:
+                email_client = create_async_email_client(config, http, state)
+                await email_client.connect()
+            except Exception as e:
+                logger.error("Email client connection failed: %s. Connecting per check instead.", e)
+                email_client = None
+
+        logger.info("Daemon mode (async) started.")
+        delivered = True
+        try:
+            while True:
+                delay = config.run.interval
+                if TimeWindow.is_working_hours(config.working_hours):
+                    try:
+                        delivered = await run_once(config, http, notifier_manager, email_client, state, lease)
+                    except Exception as e:
+                        logger.exception("Unexpected error: %s", e)
+                        RUNS.inc(outcome="error")
+                        delivered = False
+                        try:
+                            await notifier_manager.notify(f"CRITICAL AGENT ERROR: {e}")
+                        except Exception:
+                            pass
+                    write_trace(config)
+                    delay = next_check_delay(config, state)
+                if await _wait_for_next_check(config, email_client, delay):
+                    wake_source(config, state, "meet")
+        finally:
+            if email_client is not None:
+                await email_client.close()
+            if lease is not None:
+                lease.release()
+        return delivered
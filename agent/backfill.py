@@ -0,0 +1,179 @@
+"""
+Backfill: classify the whole mailbox history with MeetFilter at once, e.g. when
+onboarding a user or after changing the meet keywords, and seed the StateStore
+with the result.
+
+    python -m agent.main --backfill
+
+Message IDs are listed page by page (backfill.page_size per messages.list call) and
+each page's messages are downloaded concurrently, paced by quota.gmail. Parsing and
+filtering run on a process pool in chunks of backfill.chunk_size while the next page
+downloads. Matches are appended to backfill.output_file as JSON lines and added to
+the StateStore's processed IDs; after every page the list position is checkpointed
+in state.json, so an interrupted backfill resumes after the last completed page.
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from agent.async_main import create_http_client
+from agent.config.schema import AppConfig, MeetConfig
+from agent.errors import RateLimitedError
+from agent.mail.async_gmail_client import AsyncGmailClient
+from agent.mail.filters import MEET_BODY_PHRASES, MeetFilter, MeetNotification
+from agent.mail.gmail_payload import parse_message
+from agent.metrics.registry import REGISTRY
+from agent.state.store import StateStore
+
+logger = logging.getLogger(__name__)
+
+# StateStore section holding the checkpoint: {"key", "page_token", "output_offset", "pages", "messages", "matched", "done"}.
+BACKFILL_SECTION = "backfill"
+
+BACKFILL_MESSAGES = REGISTRY.counter(
+    "agent_backfill_messages_total", "Messages classified by --backfill by result.", ["result"])
+
+
+def backfill_meet_config(meet: MeetConfig) -> MeetConfig:
+    """
+    MeetFilter settings for history: no age limit, and every email classified on its
+    own (one chunk never holds all emails of an event, nor should old ones be dropped).
+    """
+    return meet.model_copy(update={"max_age_days": None, "group_by_event": False, "skip_past_events": False})
+
+
+def backfill_query(meet: MeetConfig) -> str:
+    """Gmail search over all mail (not just the inbox), narrowed like the regular query."""
+    terms = [f"from:{meet.sender}"] if meet.sender else []
+    if meet.server_filter:
+        terms.append(MeetFilter(meet).search_terms())
+    return " ".join(terms)
+
+
+def _record(notification: MeetNotification) -> Dict[str, Any]:
+    event = notification.event
+    return {
+        "id": notification.email_id,
+        "title": notification.title,
+        "status": notification.status,
+        "received_at": notification.received_at.isoformat(),
+        "event": None if event is None else {
+            "uid": event.uid,
+            "sequence": event.sequence,
+            "start": event.start.isoformat() if event.start else None,
+            "end": event.end.isoformat() if event.end else None,
+        },
+    }
+
+
+def classify(messages: List[Dict], meet_config: MeetConfig) -> List[Dict[str, Any]]:
+    """Parse and filter one chunk of message resources. Runs in a worker process."""
+    emails = [parse_message(m, meet_config.max_body_bytes, MEET_BODY_PHRASES) for m in messages]
+    return [_record(n) for n in MeetFilter(meet_config).filter_and_parse(emails)]
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class Backfill:
+    def __init__(self, config: AppConfig, state: StateStore, http: httpx.AsyncClient, executor: Executor):
+        self.settings = config.backfill
+        self.state = state
+        self.executor = executor
+        self.meet_config = backfill_meet_config(config.meet)
+        self.query = backfill_query(self.meet_config)
+        self.client = AsyncGmailClient(http, max_concurrency=self.settings.concurrency,
+                                       max_body_bytes=self.meet_config.max_body_bytes,
+                                       stop_phrases=MEET_BODY_PHRASES)
+
+    def _checkpoint(self) -> Dict[str, Any]:
+        """The stored checkpoint if it was made with the same query and filter, else a fresh one."""
+        key = f"{self.query}\n{self.meet_config.model_dump_json()}"
+        checkpoint = self.state.get(BACKFILL_SECTION)
+        if checkpoint and checkpoint.get("key") == key:
+            return checkpoint
+        if checkpoint:
+            logger.info("Meet configuration changed since the last backfill; starting over.")
+        return {"key": key, "page_token": None, "output_offset": 0, "pages": 0, "messages": 0,
+                "matched": 0, "done": False}
+
+    async def _fetch(self, message_id: str) -> Dict:
+        for attempt in range(self.settings.max_retries + 1):
+            try:
+                return await self.client.get_message_resource(message_id)
+            except RateLimitedError as e:
+                if attempt == self.settings.max_retries:
+                    raise
+                delay = e.retry_after if e.retry_after is not None else 2 ** attempt
+                logger.warning("Rate limited fetching %s; retrying in %.1fs.", message_id, delay)
+                await asyncio.sleep(delay)
+
+    async def _commit(self, checkpoint: Dict[str, Any], out, page: Dict[str, Any]):
+        """Write a classified page, then checkpoint past it."""
+        records = [record for chunk in await asyncio.gather(*page["chunks"]) for record in chunk]
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+        out.flush()
+        os.fsync(out.fileno())
+
+        BACKFILL_MESSAGES.inc(len(records), result="matched")
+        BACKFILL_MESSAGES.inc(page["messages"] - len(records), result="rejected")
+        self.state.processed_ids.update(record["id"] for record in records)
+        checkpoint.update(page_token=page["next_token"], output_offset=out.tell(), pages=checkpoint["pages"] + 1,
+                          messages=checkpoint["messages"] + page["messages"],
+                          matched=checkpoint["matched"] + len(records), done=page["next_token"] is None)
+        self.state.set(BACKFILL_SECTION, checkpoint)
+        self.state.save()
+        logger.info("Backfill: %d pages, %d messages, %d matched.",
+                    checkpoint["pages"], checkpoint["messages"], checkpoint["matched"])
+
+    async def run(self) -> Dict[str, Any]:
+        checkpoint = self._checkpoint()
+        if checkpoint["done"]:
+            logger.info("Backfill already complete (%d messages, %d matched).", checkpoint["messages"], checkpoint["matched"])
+            return checkpoint
+
+        await self.client.connect()
+        loop = asyncio.get_running_loop()
+        output_file = self.settings.output_file
+        # Drop lines written after the last checkpoint, so a resumed run doesn't repeat them.
+        mode = "r+" if checkpoint["output_offset"] and os.path.exists(output_file) else "w"
+        with open(output_file, mode) as out:
+            out.truncate(checkpoint["output_offset"])
+            out.seek(checkpoint["output_offset"])
+            page_token = checkpoint["page_token"]
+            pending = None
+            while True:
+                ids, next_token = await self.client.list_message_ids(self.query, page_token, self.settings.page_size)
+                messages = await asyncio.gather(*(self._fetch(message_id) for message_id in ids))
+                chunks = [loop.run_in_executor(self.executor, classify, chunk, self.meet_config)
+                          for chunk in _chunks(messages, self.settings.chunk_size)]
+                # This page is classified while the previous one is written and the next one downloads.
+                if pending is not None:
+                    await self._commit(checkpoint, out, pending)
+                pending = {"chunks": chunks, "messages": len(ids), "next_token": next_token}
+                if next_token is None:
+                    break
+                page_token = next_token
+            await self._commit(checkpoint, out, pending)
+        return checkpoint
+
+
+def run_backfill(config: AppConfig, state: Optional[StateStore] = None) -> Dict[str, Any]:
+    """Run (or resume) the backfill to completion; returns the final checkpoint."""
+    if config.email.provider.lower() not in ("gmail", "gmail_rest"):
+        raise ValueError("Backfill needs the Gmail API (email.provider: gmail).")
+    state = state or StateStore()
+
+    async def _run():
+        async with create_http_client(config) as http:
+            with ProcessPoolExecutor(max_workers=config.backfill.workers) as executor:
+                return await Backfill(config, state, http, executor).run()
+
+    return asyncio.run(_run())
@@ -62,6 +62,15 @@ def load_config(path: str = CONFIG_PATH) -> AppConfig:
     if env_pushover_token:
         config.notifications.pushover.api_token = env_pushover_token
         
+    # IMAP credentials overrides
+    env_imap_user = os.getenv("IMAP_USERNAME")
+    if env_imap_user:
+        config.email.imap.username = env_imap_user
+
+    env_imap_password = os.getenv("IMAP_PASSWORD")
+    if env_imap_password:
+        config.email.imap.password = env_imap_password
+
     # Working Hours overrides
     env_start_hours = os.getenv("WORKING_HOURS_START")
     if env_start_hours:
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class TimeWindowConfig(BaseModel):
@@ -9,17 +9,33 @@ class TimeWindowConfig(BaseModel):
     end: str = "17:00"
     days: List[int] = Field(default_factory=lambda: [0, 1, 2, 3, 4])  # 0=Mon, 6=Sun
 
+class ImapConfig(BaseModel):
+    """Configuration for the IMAP (IDLE) email provider."""
+    host: str = "imap.gmail.com"
+    port: int = 993
+    use_ssl: bool = True
+    username: Optional[str] = None # Can be overridden by env var
+    password: Optional[str] = None # Can be overridden by env var (use an app password)
+    mailbox: str = "INBOX"
+    timeout: int = 30 # Socket timeout for regular commands
+    idle_timeout: int = 29 * 60 # Re-issue IDLE at least this often (RFC 2177 recommends < 30 min)
+    reconnect_initial_delay: float = 1.0
+    reconnect_max_delay: float = 300.0
+    max_reconnect_attempts: int = 8
+
 class EmailConfig(BaseModel):
     """Configuration for email provider."""
-    provider: str = "gmail"
+    provider: str = "gmail" # 'gmail' (Gmail API polling), 'gmail_rest' (same, without googleapiclient) or 'imap' (IMAP IDLE)
     slack_sender: str = "notification@slack.com"
     subject_keywords: List[str] = Field(default_factory=list)
+    imap: ImapConfig = Field(default_factory=ImapConfig)
 
 class CallMeBotConfig(BaseModel):
     """Configuration for CallMeBot notifications."""
     enabled: bool = True
     message: str = "Urgent Slack notification detected."
     username: Optional[str] = None  # Can be overridden by env var
+    api_url: str = "http://api.callmebot.com/start.php"
 
 class TelegramConfig(BaseModel):
     """Configuration for Telegram notifications."""
@@ -34,6 +50,9 @@ class PushoverConfig(BaseModel):
     retry: int = 30 # Seconds between retries (min 30)
     expire: int = 3600 # Seconds until retry stops (max 86400)
     sound: str = "pushover" # Sound to play
+    api_url: str = "https://api.pushover.net/1/messages.json"
+    track_receipts: bool = True # Priority 2: don't re-page the same alert while it rings or was just acknowledged; cancel it once nothing triggers
+    ack_quiet_period: int = 3600 # Seconds after an acknowledgment during which the same alert is not sent again
 
 class NotificationStrategyConfig(BaseModel):
     """Configuration for notification behavior."""
@@ -51,24 +70,118 @@ class NotificationConfig(BaseModel):
 class LoggingConfig(BaseModel):
     """Configuration for logging."""
     level: str = "INFO"
+    format: str = "text" # 'text' or 'json' (one JSON object per line)
+    queued: bool = True # Format and write records on a background thread (QueueHandler/QueueListener)
+    rate_limit_per_minute: int = 30 # Max similar INFO/DEBUG records per logger+message per minute (0 = unlimited)
+    rate_limits: Dict[str, int] = Field(default_factory=dict) # Per-logger overrides, e.g. {"agent.mail": 5}
+
+class MetricsConfig(BaseModel):
+    """Configuration for the metrics registry exposition."""
+    enabled: bool = True
+    host: str = "0.0.0.0"
+    port: int = 9108 # Prometheus text endpoint, served in daemon mode
+    output_file: Optional[str] = "metrics.prom" # Written at the end of one-shot runs
+
+class TracingConfig(BaseModel):
+    """Configuration for per-run span traces (Chrome trace format)."""
+    enabled: bool = False
+    # Written after each run; {timestamp} gives daemon cycles their own files
+    output_file: str = "trace.json"
+
+class RunConfig(BaseModel):
+    """Configuration for how the agent is executed."""
+    daemon: bool = False # If true, keep running and check every `interval` seconds
+    interval: int = 300 # Seconds between checks in daemon mode
+    use_async: bool = False # Run sources, Gmail gets and notifiers on one asyncio event loop (same as --async)
+    max_connections: int = 100 # HTTP connection pool size shared by all async clients
+    gmail_concurrency: int = 10 # Concurrent Gmail messages.get calls in async mode
+    notify_concurrency: int = 4 # Concurrent notifier sends in async mode
+    deadline: Optional[float] = None # Seconds a whole check cycle may take; every call's timeout is capped by what is left
+    notify_reserve: float = 15 # Part of the deadline kept for notifying; sources still running after deadline - notify_reserve are cancelled
+    memo_ttl: float = 60 # Seconds a source's result is reused, and a delivered alert not resent, by later runs (0: off)
+    history_size: int = 200 # Run records kept in state.json for `python -m agent.stats` (0: none)
+
+class PollingConfig(BaseModel):
+    """Configuration for adaptive per-source poll intervals."""
+    enabled: bool = False # Off: every run checks every source, as a fixed cron schedule expects
+    min_interval: int = 60 # Seconds between checks right after a source had activity
+    max_interval: int = 900 # Upper bound for idle sources
+    backoff: float = 2.0 # Interval multiplier after each idle check (and after a 429 without Retry-After)
+    tolerance: int = 30 # Run a source up to this many seconds early (absorbs cron jitter)
+
+class ProviderQuotaConfig(BaseModel):
+    """Token bucket for one provider, in quota units."""
+    rate: float # Units refilled per second
+    burst: float # Bucket capacity
+
+class QuotaConfig(BaseModel):
+    """Configuration for client-side quota pacing of Gmail and Slack calls."""
+    enabled: bool = True
+    # Gmail: 250 units per user per second (messages.get/list cost 5 each).
+    gmail: ProviderQuotaConfig = Field(default_factory=lambda: ProviderQuotaConfig(rate=250, burst=250))
+    # Slack: 100 units per minute; a Tier 3 method (50+/min) costs 2 units, Tier 4 costs 1.
+    slack: ProviderQuotaConfig = Field(default_factory=lambda: ProviderQuotaConfig(rate=100 / 60, burst=20))
+    max_wait: float = 30 # Longer waits fail the source as rate limited instead of stalling the run
+
+class LeaseConfig(BaseModel):
+    """Configuration for the leader lease letting several replicas share one state.json."""
+    enabled: bool = False
+    path: str = "state.lease" # Lease file, locked on every access; must be on the same filesystem for all replicas
+    holder: Optional[str] = None # This replica's name (default: hostname:pid)
+    ttl: float = 600 # Seconds the lease lasts; every run renews it, one-shot runs release it on exit
+
+class BackfillConfig(BaseModel):
+    """Configuration for --backfill (classifying the whole mailbox history)."""
+    output_file: str = "backfill.jsonl" # Matches as JSON lines, appended to page by page
+    page_size: int = 500 # Message IDs per messages.list page (Gmail's maximum)
+    concurrency: int = 20 # Concurrent messages.get calls, all paced by quota.gmail
+    workers: Optional[int] = None # Processes parsing and filtering messages (None: one per CPU)
+    chunk_size: int = 100 # Messages per process pool task
+    max_retries: int = 5 # Per message, when rate limited
 
 class SlackConfig(BaseModel):
     workspace_url: str
     token: Optional[str] = None
     cookie: Optional[str] = None
+    fetch_mentions: bool = True # Add sender, channel and first line of new mentions to the alert
+    max_mentions: int = 5 # Mentions listed per alert
+    mention_concurrency: int = 4 # Parallel conversations.history fetches
+    name_cache_ttl: int = 24 * 3600 # Seconds channel/user names stay cached (persisted in state.json)
 
 class MeetConfig(BaseModel):
     """Configuration for Google Meet monitoring."""
     enabled: bool = True
     sender: Optional[str] = None
     subject_keywords: List[str] = Field(default_factory=lambda: ["invitation", "canceled", "updated"])
+    max_body_bytes: int = 65536 # Stop decoding a message body after this many bytes
+    # After an alert is delivered: 'label' (apply ack_label), 'archive', 'read', or 'none' to keep alerting
+    acknowledge: str = "none"
+    ack_label: str = "slack-alert-agent"
+    # Compile the filter into the Gmail search query (client-side checks still apply). Gmail matches
+    # subject keywords as whole words only, so keywords that are part of a word need this off.
+    server_filter: bool = True
+    max_age_days: Optional[int] = None # Ignore emails older than this (Gmail newer_than:)
+    require_invite: bool = False # Only emails with an invite.ics attachment (server-side only)
+    fetch_threads: bool = True # Gmail: threads.list + one threads.get per thread instead of a get per message
+    group_by_event: bool = True # One alert per calendar event (invite UID), from its latest email (SEQUENCE)
+    skip_past_events: bool = True # Don't alert on events that have already ended (invite DTEND/DTSTART)
+    remind_before: Optional[float] = None # Minutes before an event's start (invite DTSTART) to page about it (None: no reminders)
+    precheck: bool = True # Reuse the last scan's result while the mailbox fingerprint (Gmail historyId) is unchanged
 
 class AppConfig(BaseModel):
     """Root configuration model."""
     working_hours: TimeWindowConfig = Field(default_factory=TimeWindowConfig)
     meet: MeetConfig = Field(default_factory=MeetConfig)
+    email: EmailConfig = Field(default_factory=EmailConfig)
     notifications: NotificationConfig = Field(default_factory=NotificationConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    run: RunConfig = Field(default_factory=RunConfig)
+    polling: PollingConfig = Field(default_factory=PollingConfig)
+    quota: QuotaConfig = Field(default_factory=QuotaConfig)
+    lease: LeaseConfig = Field(default_factory=LeaseConfig)
+    backfill: BackfillConfig = Field(default_factory=BackfillConfig)
     slack: Optional[SlackConfig] = None
     # mode field is deprecated/removed as we now run all enabled services
 
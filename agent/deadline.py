@@ -0,0 +1,79 @@
+"""
+Run-wide deadline (run.deadline): one time budget for a whole check cycle.
+
+    with DEADLINE.run(config.run.deadline):
+        with DEADLINE.hold_back(config.run.notify_reserve):
+            ...sources...
+        ...notify...
+
+Every outgoing call takes its timeout from DEADLINE.timeout(default): the usual
+per-call timeout, shortened to what is left of the budget. Once the budget is spent
+the call raises DeadlineExceeded instead of starting. hold_back() moves the deadline
+earlier for a block, so sources cannot eat the time needed to deliver what they found.
+Without a deadline, timeout() returns the default and nothing is ever cut off.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from agent.errors import DeadlineExceeded
+
+
+class Deadline:
+    """Monotonic-clock deadline shared by every thread and task of the current run."""
+
+    def __init__(self):
+        self.expires_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def run(self, seconds: Optional[float]):
+        """Start a budget of `seconds` (None or 0: unlimited) for the enclosed block."""
+        with self._lock:
+            self.expires_at = time.monotonic() + seconds if seconds else None
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.expires_at = None
+
+    @contextmanager
+    def hold_back(self, seconds: float):
+        """Pull the deadline `seconds` earlier for the enclosed block."""
+        with self._lock:
+            saved = self.expires_at
+            if saved is not None:
+                self.expires_at = saved - seconds
+        try:
+            yield self
+        finally:
+            with self._lock:
+                if saved is not None:
+                    self.expires_at = saved
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, never negative; None without a deadline."""
+        expires_at = self.expires_at
+        if expires_at is None:
+            return None
+        return max(0.0, expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def check(self, needed: float = 0.0):
+        """Raise DeadlineExceeded unless at least `needed` seconds are left."""
+        remaining = self.remaining()
+        if remaining is not None and (remaining <= 0 or remaining < needed):
+            raise DeadlineExceeded(f"Run deadline reached ({remaining:.1f}s left, {needed:.1f}s needed)")
+
+    def timeout(self, default: float) -> float:
+        """Timeout for the next call: `default`, capped at the remaining budget."""
+        self.check()
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+
+# Process-wide deadline of the running check cycle (cycles never overlap).
+DEADLINE = Deadline()
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+class RateLimitedError(Exception):
+    """
+    A provider rejected a call because of rate limiting (HTTP 429, Gmail rateLimitExceeded).
+    `retry_after` is the server-requested wait in seconds, if it sent one.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run-wide deadline (run.deadline) ran out before a call could be made."""
+
+
+class SourceCheckFailed(Exception):
+    """
+    A source could not be checked (network error, API error). Unlike an empty result
+    it says nothing about whether there is something to alert about.
+    """
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header: delay in seconds or an HTTP date. None if absent or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
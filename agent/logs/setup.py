@@ -1,13 +1,177 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
 from agent.config.schema import LoggingConfig
 
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into the JSON payload.
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "suppressed"}
+
+# Argument types a queued record may carry unrendered: they cannot change before the listener formats it.
+_IMMUTABLE_ARGS = (str, bytes, int, float, bool, type(None))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, noting how many similar messages were rate limited."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (suppressed {suppressed} similar messages)"
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-logger rate limiter for repetitive messages.
+
+    Records are grouped by (logger name, unformatted message template), so hot loops
+    must log with lazy %-style arguments for similar messages to be grouped.
+    At most `per_minute` records per group pass every 60s window; the rest are dropped
+    and counted, and the count is attached to the next record that passes.
+    WARNING and above are never dropped. Once per window, groups whose window has
+    expired with nothing suppressed are forgotten.
+    """
+
+    def __init__(self, per_minute: int, overrides: Optional[Dict[str, int]] = None, window: float = 60.0):
+        super().__init__()
+        self.per_minute = per_minute
+        self.overrides = overrides or {}
+        self.window = window
+        self._lock = threading.Lock()
+        # (logger, template) -> [window start, emitted in window, suppressed]
+        self._groups: Dict[Tuple[str, str], list] = {}
+        self._last_sweep = time.monotonic()
+
+    def _limit_for(self, name: str) -> int:
+        # Most specific logger prefix wins, e.g. 'agent.mail' covers 'agent.mail.filters'.
+        best, best_len = self.per_minute, -1
+        for prefix, limit in self.overrides.items():
+            if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best_len:
+                best, best_len = limit, len(prefix)
+        return best
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        limit = self._limit_for(record.name)
+        if limit <= 0:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= self.window:
+                self._sweep(now)
+            group = self._groups.get(key)
+            if group is None or now - group[0] >= self.window:
+                suppressed = group[2] if group else 0
+                self._groups[key] = [now, 1, 0]
+                record.suppressed = suppressed
+                return True
+            if group[1] < limit:
+                group[1] += 1
+                record.suppressed, group[2] = group[2], 0
+                return True
+            group[2] += 1
+            return False
+
+    def _sweep(self, now: float):
+        """Drop expired groups; those with a pending suppressed count wait for their next record."""
+        self._groups = {key: group for key, group in self._groups.items()
+                        if now - group[0] < self.window or group[2]}
+        self._last_sweep = now
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record to the listener thread untouched.
+    The stdlib version formats the message in the caller's thread; here
+    `msg % args` and JSON encoding happen on the listener thread instead.
+    Records with arguments that could still change (lists, dicts, exceptions,
+    other objects) are rendered in the caller's thread, so the message shows them
+    as they were when logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args.values() if isinstance(record.args, dict) else record.args or ()
+        if not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def _build_formatter(config: LoggingConfig) -> logging.Formatter:
+    if config.format.lower() == "json":
+        return JsonFormatter()
+    return TextFormatter(TEXT_FORMAT)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_logging(config: LoggingConfig):
+    global _listener
+
     # Convert string level to logging constant
     level = getattr(logging, config.level.upper(), logging.INFO)
-    
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter(config))
+
+    root = logging.getLogger()
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    if config.queued:
+        # Callers only enqueue the record; formatting and stdout I/O run on the listener thread.
+        log_queue = queue.SimpleQueue()
+        handler = LazyQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        handler = stream_handler
+
+    if config.rate_limit_per_minute > 0 or config.rate_limits:
+        handler.addFilter(RateLimitFilter(config.rate_limit_per_minute, config.rate_limits))
+    root.addHandler(handler)
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from agent.deadline import DEADLINE
+from agent.mail.client import AsyncEmailClient, EmailMessage
+from agent.mail.gmail_payload import DEFAULT_MAX_BODY_BYTES, parse_message
+from agent.mail.gmail_requests import (
+    GMAIL_MESSAGES_FETCHED, GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, PROFILE_REQUEST, Flow, GmailRequest, T,
+    acknowledge, check_rate_limited, get_request, list_request, load_credentials, message_resources,
+    oauth_refresh_form, search_query,
+)
+from agent.metrics.registry import timed
+from agent.ratelimit import LIMITER
+from agent.tracing import span
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+API_ENDPOINT = "https://gmail.googleapis.com/"
+
+# Per-call timeout before run.deadline caps it (the shared client's default).
+REQUEST_TIMEOUT = 30
+
+class AsyncGmailClient(AsyncEmailClient):
+    """
+    Gmail client on httpx.AsyncClient, talking to the REST API directly (no discovery
+    document). Per-message (or, with fetch_threads, per-thread) gets run concurrently,
+    at most `max_concurrency` at a time.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, api_endpoint: Optional[str] = None,
+                 token_uri: Optional[str] = None, max_concurrency: int = 10,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, stop_phrases: Sequence[str] = (),
+                 exclude_label: Optional[str] = None, search_terms: str = "", fetch_threads: bool = False):
+        self.http = http
+        self.api_endpoint = (api_endpoint or os.getenv('GMAIL_API_ENDPOINT') or API_ENDPOINT).rstrip('/')
+        self.token_uri = token_uri or os.getenv('GMAIL_TOKEN_URI') or TOKEN_URI
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_body_bytes = max_body_bytes
+        self.stop_phrases = tuple(stop_phrases)
+        self.exclude_label = exclude_label
+        # Extra Gmail search terms (MeetFilter.search_terms) narrowing every query server-side.
+        self.search_terms = search_terms
+        # threads.list + a threads.get per thread, as in GmailClient.
+        self.fetch_threads = fetch_threads
+        self.access_token: Optional[str] = None
+        self.expires_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._label_ids: Dict[str, str] = {}
+
+    async def connect(self):
+        """Exchange the refresh token for an access token."""
+        creds = load_credentials()
+        if not creds:
+            raise Exception("Could not authenticate with Gmail. Check credentials.")
+
+        timeout = DEADLINE.timeout(REQUEST_TIMEOUT)
+        with span("gmail.oauth_refresh"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method="oauth_refresh"):
+            response = await self.http.post(self.token_uri, data=oauth_refresh_form(creds), timeout=timeout)
+            response.raise_for_status()
+        token = response.json()
+        self.access_token = token['access_token']
+        self.expires_at = time.monotonic() + int(token.get('expires_in', 3600))
+        logger.info("Successfully connected to Gmail API.")
+
+    async def _call(self, request: GmailRequest) -> Dict:
+        """Call users/me/<path>, recording latency and outcome like GmailClient._execute."""
+        if not self.access_token:
+            raise Exception("Client not connected. Call connect() first.")
+        if time.monotonic() >= self.expires_at - 60:
+            # Concurrent gets share one refresh.
+            async with self._refresh_lock:
+                if time.monotonic() >= self.expires_at - 60:
+                    await self.connect()
+
+        await LIMITER.acquire_async('gmail', request.method)
+        url = f"{self.api_endpoint}/gmail/v1/users/me/{request.path}"
+        timeout = DEADLINE.timeout(REQUEST_TIMEOUT)
+        with span(f"gmail.{request.method}"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method=request.method):
+            response = await self.http.request(
+                request.http_method, url, params=request.params, json=request.body,
+                headers={'Authorization': f"Bearer {self.access_token}"}, timeout=timeout)
+            check_rate_limited(request.method, response.status_code, response.content,
+                               response.headers.get('Retry-After'))
+            response.raise_for_status()
+        return response.json() if response.content else {}
+
+    async def _call_bounded(self, request: GmailRequest) -> Dict:
+        async with self.semaphore:
+            return await self._call(request)
+
+    async def _run(self, flow: Flow[T]) -> T:
+        """Async counterpart of gmail_requests.run_flow: a list of requests runs concurrently."""
+        try:
+            step = next(flow)
+            while True:
+                if isinstance(step, list):
+                    step = flow.send(list(await asyncio.gather(*(self._call_bounded(r) for r in step))))
+                else:
+                    step = flow.send(await self._call(step))
+        except StopIteration as done:
+            return done.value
+
+    async def list_message_ids(self, query: str, page_token: Optional[str] = None,
+                               page_size: int = 100) -> Tuple[List[str], Optional[str]]:
+        """One page of messages.list: its message IDs and the next page's token (None after the last)."""
+        results = await self._call(list_request(query, page_token=page_token, page_size=page_size))
+        return [m['id'] for m in results.get('messages', [])], results.get('nextPageToken')
+
+    async def get_message_resource(self, message_id: str) -> Dict:
+        """The raw message resource (format=full), unparsed."""
+        msg_data = await self._call_bounded(get_request(message_id))
+        GMAIL_MESSAGES_FETCHED.inc()
+        return msg_data
+
+    async def get_emails(self, sender_filter: Optional[str] = None, only_unread: bool = False) -> List[EmailMessage]:
+        query = search_query(sender_filter, only_unread, self.exclude_label, self.search_terms)
+        logger.info("Querying Gmail with: %s", query)
+        resources = await self._run(message_resources(query, only_unread, self.fetch_threads, self._label_ids,
+                                                      self.exclude_label))
+        return [parse_message(msg_data, self.max_body_bytes, self.stop_phrases) for msg_data in resources]
+
+    async def fingerprint(self) -> Optional[str]:
+        """The mailbox's historyId, as in GmailClient."""
+        return str((await self._call(PROFILE_REQUEST))['historyId'])
+
+    async def mark_as_read(self, email_ids: List[str]):
+        await self._run(acknowledge(self._label_ids, email_ids, "read"))
+        if email_ids:
+            logger.info("Marked %d emails as read.", len(email_ids))
+
+    async def acknowledge(self, email_ids: List[str], action: str, label: Optional[str] = None):
+        await self._run(acknowledge(self._label_ids, email_ids, action, label))
+        if email_ids:
+            logger.info("Acknowledged %d emails (%s).", len(email_ids), action)
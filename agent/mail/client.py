@@ -1,18 +1,90 @@
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from dataclasses import dataclass
+from typing import Callable, List, Optional
 from datetime import datetime
 
-@dataclass
+logger = logging.getLogger(__name__)
+
 class EmailMessage:
-    """Generic email message representation."""
-    id: str
-    sender: str
-    subject: str
-    snippet: str
-    body: str
-    timestamp: datetime
-    is_read: bool
+    """
+    Generic email message representation. Immutable and slotted, as a poll can hold
+    thousands of them. The body is either given directly or produced by `body_loader`
+    on first access; the loader then runs once and is dropped along with whatever raw
+    payload it referenced. `calendar` is the text/calendar part of Calendar
+    invitations, if the provider extracted it; it can be deferred the same way
+    with `calendar_loader`.
+    """
+    __slots__ = ('id', 'sender', 'subject', 'snippet', 'timestamp', 'is_read', '_body', '_body_loader',
+                 '_calendar', '_calendar_loader')
+
+    def __init__(self, id: str, sender: str, subject: str, snippet: str, body: Optional[str] = None,
+                 timestamp: Optional[datetime] = None, is_read: bool = False,
+                 body_loader: Optional[Callable[[], str]] = None, calendar: Optional[str] = None,
+                 calendar_loader: Optional[Callable[[], Optional[str]]] = None):
+        init = object.__setattr__
+        init(self, 'id', id)
+        init(self, 'sender', sender)
+        init(self, 'subject', subject)
+        init(self, 'snippet', snippet)
+        init(self, 'timestamp', timestamp)
+        init(self, 'is_read', is_read)
+        init(self, '_body', body if body is not None or body_loader is not None else '')
+        init(self, '_body_loader', body_loader if body is None else None)
+        init(self, '_calendar', calendar)
+        init(self, '_calendar_loader', calendar_loader if calendar is None else None)
+
+    @property
+    def body(self) -> str:
+        loader = self._body_loader
+        if loader is not None:
+            object.__setattr__(self, '_body', loader())
+            object.__setattr__(self, '_body_loader', None)
+        return self._body
+
+    @property
+    def body_loaded(self) -> bool:
+        return self._body_loader is None
+
+    @property
+    def calendar(self) -> Optional[str]:
+        loader = self._calendar_loader
+        if loader is not None:
+            object.__setattr__(self, '_calendar', loader())
+            object.__setattr__(self, '_calendar_loader', None)
+        return self._calendar
+
+    @property
+    def calendar_loaded(self) -> bool:
+        return self._calendar_loader is None
+
+    def with_body(self, body: str) -> "EmailMessage":
+        """Copy of this message with `body` as its body."""
+        return EmailMessage(self.id, self.sender, self.subject, self.snippet, body, self.timestamp, self.is_read,
+                            calendar=self._calendar, calendar_loader=self._calendar_loader)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"EmailMessage is immutable; cannot set '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"EmailMessage is immutable; cannot delete '{name}'")
+
+    def _key(self):
+        return self.id, self.sender, self.subject, self.snippet, self.body, self.timestamp, self.is_read, self.calendar
+
+    def __eq__(self, other):
+        if not isinstance(other, EmailMessage):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        # Leaves the body out so hashing never forces a decode.
+        return hash((self.id, self.sender, self.subject, self.timestamp))
+
+    def __repr__(self):
+        body = repr(self._body) if self.body_loaded else '<not loaded>'
+        return (f"EmailMessage(id={self.id!r}, sender={self.sender!r}, subject={self.subject!r}, "
+                f"snippet={self.snippet!r}, body={body}, timestamp={self.timestamp!r}, is_read={self.is_read!r})")
 
 class EmailClient(ABC):
     """Abstract base class for email providers."""
@@ -34,3 +106,83 @@ class EmailClient(ABC):
     def mark_as_read(self, email_ids: List[str]):
         """Mark specific emails as read."""
         pass
+
+    def acknowledge(self, email_ids: List[str], action: str, label: Optional[str] = None):
+        """
+        Mark emails whose alert was delivered so later checks skip them: 'label' applies
+        `label`, 'archive' removes them from the inbox, 'read' marks them read.
+        Providers without labels or archiving mark them read instead.
+        """
+        if action != "read":
+            logger.warning("%s does not support acknowledge '%s'; marking as read instead.", type(self).__name__, action)
+        self.mark_as_read(email_ids)
+
+    def fingerprint(self) -> Optional[str]:
+        """
+        A value that changes whenever the mailbox does, fetched at constant cost, or None
+        if the provider has none. An unchanged fingerprint means a scan would find the same.
+        """
+        return None
+
+    def close(self):
+        """Release the connection, if the provider keeps one open."""
+        pass
+
+class AsyncEmailClient(ABC):
+    """Asyncio counterpart of EmailClient."""
+
+    @abstractmethod
+    async def connect(self):
+        """Authenticate and connect to the service."""
+        pass
+
+    @abstractmethod
+    async def get_emails(self, sender_filter: Optional[str] = None, only_unread: bool = False) -> List[EmailMessage]:
+        """Fetch emails, optionally filtered by sender and read status."""
+        pass
+
+    @abstractmethod
+    async def mark_as_read(self, email_ids: List[str]):
+        """Mark specific emails as read."""
+        pass
+
+    async def acknowledge(self, email_ids: List[str], action: str, label: Optional[str] = None):
+        """See EmailClient.acknowledge."""
+        if action != "read":
+            logger.warning("%s does not support acknowledge '%s'; marking as read instead.", type(self).__name__, action)
+        await self.mark_as_read(email_ids)
+
+    async def fingerprint(self) -> Optional[str]:
+        """See EmailClient.fingerprint."""
+        return None
+
+    async def close(self):
+        """Release the connection, if the provider keeps one open."""
+        pass
+
+class ThreadedEmailClient(AsyncEmailClient):
+    """
+    Adapts a blocking EmailClient to AsyncEmailClient by running each call in a
+    worker thread. Used for providers without a native async implementation (IMAP).
+    """
+
+    def __init__(self, client: EmailClient):
+        self.client = client
+
+    async def connect(self):
+        await asyncio.to_thread(self.client.connect)
+
+    async def get_emails(self, sender_filter: Optional[str] = None, only_unread: bool = False) -> List[EmailMessage]:
+        return await asyncio.to_thread(self.client.get_emails, sender_filter, only_unread)
+
+    async def mark_as_read(self, email_ids: List[str]):
+        await asyncio.to_thread(self.client.mark_as_read, email_ids)
+
+    async def acknowledge(self, email_ids: List[str], action: str, label: Optional[str] = None):
+        await asyncio.to_thread(self.client.acknowledge, email_ids, action, label)
+
+    async def fingerprint(self) -> Optional[str]:
+        return await asyncio.to_thread(self.client.fingerprint)
+
+    async def close(self):
+        await asyncio.to_thread(self.client.close)
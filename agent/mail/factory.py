@@ -0,0 +1,77 @@
+from agent.config.schema import AppConfig
+from agent.mail.client import AsyncEmailClient, EmailClient, ThreadedEmailClient
+from agent.mail.filters import MEET_BODY_PHRASES, MeetFilter
+
+
+def _exclude_label(config: AppConfig):
+    """With meet.acknowledge: label, acknowledged messages are left out of Gmail queries."""
+    return config.meet.ack_label if config.meet.acknowledge == "label" else None
+
+
+def only_unread(config: AppConfig) -> bool:
+    """
+    Whether Meet queries skip read mail: with meet.acknowledge: read, and on IMAP, which
+    has no labels or archiving and marks acknowledged mail read instead.
+    """
+    action = config.meet.acknowledge
+    return action == "read" or (action != "none" and config.email.provider.lower() == "imap")
+
+
+def _search_terms(config: AppConfig) -> str:
+    """MeetFilter's predicates as Gmail search terms, with meet.server_filter."""
+    return MeetFilter(config.meet).search_terms() if config.meet.server_filter else ""
+
+
+def create_email_client(config: AppConfig, state=None) -> EmailClient:
+    """
+    Build the EmailClient selected by `email.provider` (not yet connected).
+    With `state` (a StateStore), the IMAP client keeps its scan there between runs.
+    """
+    provider = config.email.provider.lower()
+
+    # Provider modules are imported lazily so one backend's dependencies
+    # (e.g. googleapiclient) are not loaded when another is configured.
+    if provider == "gmail":
+        from agent.mail.gmail_client import GmailClient
+        return GmailClient(max_body_bytes=config.meet.max_body_bytes, stop_phrases=MEET_BODY_PHRASES,
+                           exclude_label=_exclude_label(config), search_terms=_search_terms(config),
+                           fetch_threads=config.meet.fetch_threads)
+
+    if provider == "gmail_rest":
+        from agent.mail.gmail_rest_client import GmailRestClient
+        return GmailRestClient(max_body_bytes=config.meet.max_body_bytes, stop_phrases=MEET_BODY_PHRASES,
+                               exclude_label=_exclude_label(config), search_terms=_search_terms(config),
+                               fetch_threads=config.meet.fetch_threads)
+
+    if provider == "imap":
+        from agent.mail.imap_client import ImapClient
+        return ImapClient(
+            config.email.imap,
+            header_filter=MeetFilter(config.meet).matches_headers,
+            max_body_bytes=config.meet.max_body_bytes,
+            state=state,
+            scope=config.meet.model_dump_json(),
+            since_days=config.meet.max_age_days,
+        )
+
+    raise ValueError(f"Unknown email provider: {config.email.provider}. Expected 'gmail', 'gmail_rest' or 'imap'.")
+
+
+def create_async_email_client(config: AppConfig, http, state=None) -> AsyncEmailClient:
+    """
+    Build the AsyncEmailClient for `email.provider`, sharing the `http` (httpx.AsyncClient)
+    connection pool. Providers without a native async client run in worker threads.
+    """
+    # AsyncGmailClient talks to the REST API directly either way.
+    if config.email.provider.lower() in ("gmail", "gmail_rest"):
+        from agent.mail.async_gmail_client import AsyncGmailClient
+        return AsyncGmailClient(
+            http,
+            max_concurrency=config.run.gmail_concurrency,
+            max_body_bytes=config.meet.max_body_bytes,
+            stop_phrases=MEET_BODY_PHRASES,
+            exclude_label=_exclude_label(config),
+            search_terms=_search_terms(config),
+            fetch_threads=config.meet.fetch_threads,
+        )
+    return ThreadedEmailClient(create_email_client(config, state))
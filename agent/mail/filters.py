@@ -1,11 +1,31 @@
-from dataclasses import dataclass
-from datetime import datetime
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 from agent.mail.client import EmailMessage
+from agent.mail.ics import CalendarEvent, parse_event
 from agent.config.schema import MeetConfig
+from agent.metrics.registry import REGISTRY
+from agent.tracing import span
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Body phrases identifying a Google Calendar / Meet email. The user asked for
+# "Invitation from Google Calendar", but "Join with Google Meet" shows up too, so any one is accepted.
+MEET_BODY_PHRASES = ("Invitation from Google Calendar", "Join with Google Meet", "meet.google.com")
+
+# Every Google Calendar invitation, update and cancellation carries this attachment.
+INVITE_FILENAME = "invite.ics"
+
+# Subject keywords Gmail can match as a subject: term: one or more plain words.
+_WHOLE_WORDS = re.compile(r"\w+(?: \w+)*")
+
+FILTER_SECONDS = REGISTRY.histogram(
+    "agent_meet_filter_duration_seconds", "Time spent in MeetFilter.filter_and_parse.")
+FILTER_EMAILS = REGISTRY.counter(
+    "agent_meet_filter_emails_total", "Emails evaluated by MeetFilter by result.", ["result"])
+
 @dataclass
 class MeetNotification:
     """Structured representation of a Google Meet/Calendar notification."""
@@ -13,6 +33,13 @@ class MeetNotification:
     title: str
     received_at: datetime
     status: str  # 'invitation', 'updated', 'cancelled', etc.
+    event: Optional[CalendarEvent] = None # From the invitation's text/calendar part
+    # Older emails about the same event, collapsed into this one (meet.group_by_event)
+    superseded_ids: List[str] = field(default_factory=list)
+
+    @property
+    def email_ids(self) -> List[str]:
+        return [self.email_id] + self.superseded_ids
 
 class MeetFilter:
     def __init__(self, config: 'MeetConfig'): # Use string forward ref or import if needed, but safe here
@@ -22,34 +49,94 @@ class MeetFilter:
         """
         Filter emails to keep only relevant Meet notifications.
         """
+        with span("meet.filter", emails=len(emails)), FILTER_SECONDS.time():
+            notifications = self._filter(emails)
+            matched = len(notifications)
+            if self.config.group_by_event:
+                notifications = self._latest_per_event(notifications)
+            superseded = matched - len(notifications)
+            if self.config.skip_past_events:
+                notifications = self._upcoming(notifications)
+        FILTER_EMAILS.inc(len(notifications), result="matched")
+        FILTER_EMAILS.inc(superseded, result="superseded")
+        FILTER_EMAILS.inc(matched - superseded - len(notifications), result="past")
+        FILTER_EMAILS.inc(len(emails) - matched, result="rejected")
+        logger.info("MeetFilter matched %d of %d emails (%d events).", matched, len(emails), len(notifications))
+        return notifications
+
+    def valid_until(self, notifications: List[MeetNotification]) -> Optional[float]:
+        """
+        Unix time at which the first of `notifications` stops passing the filter without
+        any change to the mailbox (its event ends, its email ages out), or None.
+        """
+        deadlines = []
+        for notification in notifications:
+            event = notification.event
+            if self.config.skip_past_events and event is not None and (event.end or event.start):
+                deadlines.append((event.end or event.start).timestamp())
+            if self.config.max_age_days:
+                deadlines.append((notification.received_at + timedelta(days=self.config.max_age_days)).timestamp())
+        return min(deadlines, default=None)
+
+    def search_terms(self) -> str:
+        """
+        The filter's predicates as Gmail search terms (the sender goes in as from: separately),
+        so the server drops non-matching mail before anything is downloaded.
+        Gmail matches subject: terms as whole words, while matches_headers() looks for the
+        keywords as substrings. The keywords are only pushed when every one of them is made
+        of plain words; otherwise (e.g. "Invitation:") the subject check is left to the client.
+        A keyword that is only part of a word in the subject (e.g. "invit") still can't match
+        server-side. filter_and_parse() checks every returned email.
+        """
+        terms = []
+        keywords = self.config.subject_keywords
+        if keywords and all(_WHOLE_WORDS.fullmatch(k.strip()) for k in keywords):
+            terms.append("{" + " ".join(f"subject:{_quote(k.strip())}" for k in keywords) + "}")
+        elif keywords:
+            logger.info("Subject keywords %s are not all whole words; checking them locally only.", keywords)
+        terms.append("{" + " ".join(_quote(p) for p in MEET_BODY_PHRASES) + "}")
+        if self.config.max_age_days:
+            terms.append(f"newer_than:{self.config.max_age_days}d")
+        if self.config.require_invite:
+            terms.append(f"filename:{INVITE_FILENAME}")
+        return " ".join(terms)
+
+    def matches_headers(self, email: EmailMessage) -> bool:
+        """
+        Sender, age and subject checks only. Lets clients that fetch headers first
+        (IMAP) download bodies just for the emails that can still match.
+        """
+        # Check sender (optional)
+        if self.config.sender and self.config.sender not in email.sender:
+            return False
+
+        if self.config.max_age_days and email.timestamp < datetime.now() - timedelta(days=self.config.max_age_days):
+            return False
+
+        # Check keywords
+        if self.config.subject_keywords:
+            subject_lower = email.subject.lower()
+            return any(k.lower() in subject_lower for k in self.config.subject_keywords)
+        return True
+
+    def _filter(self, emails: list[EmailMessage]) -> list[MeetNotification]:
         notifications = []
-        
+
         for email in emails:
-            # Check sender (optional)
-            if self.config.sender and self.config.sender not in email.sender:
+            if not self.matches_headers(email):
                 continue
 
-            # Check keywords 
             subject_lower = email.subject.lower()
-            if self.config.subject_keywords:
-                matched = False
-                for k in self.config.subject_keywords:
-                    if k.lower() in subject_lower:
-                        matched = True
-                        break
-                if not matched:
-                    continue
 
             # Check body for specific Google Calendar footer or Meet links
-            # User requested "Invitation from Google Calendar", but we also found "Join with Google Meet" in the debug logs.
-            # We allow either to be robust.
-            valid_body_phrases = ["Invitation from Google Calendar", "Join with Google Meet", "meet.google.com"]
-            if not any(phrase in email.body for phrase in valid_body_phrases):
+            if not any(phrase in email.body for phrase in MEET_BODY_PHRASES):
                  continue
 
+            event = parse_event(email.calendar) if email.calendar else None
+
             # Determine status
             status = "invitation"
-            if "cancel" in subject_lower:
+            if "cancel" in subject_lower or (event is not None and event.cancelled):
                 status = "cancelled"
             elif "update" in subject_lower:
                 status = "updated"
@@ -59,9 +146,45 @@ class MeetFilter:
                 email_id=email.id,
                 title=email.subject,
                 received_at=email.timestamp,
-                status=status
+                status=status,
+                event=event
             )
             notifications.append(notification)
-            logger.info(f"Identified Meet notification: {notification.title}")
+            logger.debug("Identified Meet notification: %s", notification.title)
 
         return notifications
+
+    @staticmethod
+    def _latest_per_event(notifications: List[MeetNotification]) -> List[MeetNotification]:
+        """
+        One notification per calendar event (UID): the email with the highest SEQUENCE,
+        the most recent one on a tie. Emails without calendar data stay separate.
+        """
+        latest: Dict[str, MeetNotification] = {}
+        for notification in notifications:
+            key = notification.event.uid if notification.event is not None else f"email:{notification.email_id}"
+            current = latest.get(key)
+            if current is None:
+                latest[key] = notification
+            elif (notification.event.sequence, notification.received_at) >= (current.event.sequence, current.received_at):
+                notification.superseded_ids = current.email_ids + notification.superseded_ids
+                latest[key] = notification
+            else:
+                current.superseded_ids.append(notification.email_id)
+        return list(latest.values())
+
+    @staticmethod
+    def _upcoming(notifications: List[MeetNotification]) -> List[MeetNotification]:
+        """Drop events that are already over."""
+        upcoming = []
+        for notification in notifications:
+            if notification.event is not None and notification.event.is_over():
+                logger.debug("Skipping past event: %s", notification.title)
+                continue
+            upcoming.append(notification)
+        return upcoming
+
+
+def _quote(term: str) -> str:
+    """Quote a search term that is not a single word."""
+    return f'"{term}"' if any(not c.isalnum() for c in term) else term
@@ -1,24 +1,68 @@
 import os
 import logging
-import base64
-from datetime import datetime
-from typing import List, Optional
-from email import message_from_bytes
+from functools import partial
+from typing import Dict, Optional, Sequence
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-
-from agent.mail.client import EmailClient, EmailMessage
+from googleapiclient.errors import HttpError
+
+from agent.deadline import DEADLINE
+from agent.errors import RateLimitedError, parse_retry_after
+from agent.mail.gmail_payload import DEFAULT_MAX_BODY_BYTES
+from agent.mail.gmail_requests import (
+    GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, BlockingGmailClient, GmailRequest, is_rate_limited,
+)
+from agent.metrics.registry import timed
+from agent.ratelimit import LIMITER
+from agent.tracing import span
 
 logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
-
-class GmailClient(EmailClient):
-    def __init__(self):
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Per-call timeouts before run.deadline caps them: googleapiclient's and google-auth's defaults.
+REQUEST_TIMEOUT = 60
+OAUTH_TIMEOUT = 120
+
+def set_http_timeout(http, seconds: float):
+    """
+    Apply a socket timeout to an httplib2.Http, or the one wrapped by google-auth's
+    AuthorizedHttp. httplib2 only reads Http.timeout when it opens a connection, so
+    connections already kept alive are updated too.
+    """
+    http = getattr(http, 'http', http)
+    http.timeout = seconds
+    for conn in getattr(http, 'connections', {}).values():
+        conn.timeout = seconds
+        if getattr(conn, 'sock', None) is not None:
+            conn.sock.settimeout(seconds)
+
+def service_request(service, request: GmailRequest):
+    """The googleapiclient request for `request`, e.g. service.users().threads().get(userId='me', id=...)."""
+    resource, verb = request.method.split('.')
+    users = service.users()
+    collection = users if resource == 'users' else getattr(users, resource)()
+    kwargs = dict(request.params, userId='me')
+    if request.id is not None:
+        kwargs['id'] = request.id
+    if request.body is not None:
+        kwargs['body'] = request.body
+    return getattr(collection, verb)(**kwargs)
+
+class GmailClient(BlockingGmailClient):
+    def __init__(self, api_endpoint: Optional[str] = None, token_uri: Optional[str] = None,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, stop_phrases: Sequence[str] = (),
+                 exclude_label: Optional[str] = None, search_terms: str = "", fetch_threads: bool = False):
+        super().__init__(max_body_bytes, stop_phrases, exclude_label, search_terms, fetch_threads)
         self.service = None
+        # Endpoint overrides (GMAIL_API_ENDPOINT / GMAIL_TOKEN_URI) let the client talk to
+        # local stand-ins, e.g. the benchmark harness. Defaults are Google's production URLs.
+        self.api_endpoint = api_endpoint or os.getenv('GMAIL_API_ENDPOINT')
+        self.token_uri = token_uri or os.getenv('GMAIL_TOKEN_URI') or TOKEN_URI
 
     def connect(self):
         """
@@ -40,7 +84,7 @@ class GmailClient(EmailClient):
             creds = Credentials(
                 None, # No access token initially
                 refresh_token=refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
+                token_uri=self.token_uri,
                 client_id=client_id,
                 client_secret=client_secret,
                 scopes=SCOPES
@@ -52,7 +96,7 @@ class GmailClient(EmailClient):
                 try:
                     creds = Credentials.from_authorized_user_file('token.json', SCOPES)
                 except Exception as e:
-                    logger.error(f"Failed to load token.json: {e}")
+                    logger.error("Failed to load token.json: %s", e)
             else:
                  # Local interactive flow (only if strictly needed, usually avoiding in agent)
                  logger.warning("No credentials found in env or token.json.")
@@ -60,91 +104,40 @@ class GmailClient(EmailClient):
         if creds and not creds.valid and creds.refresh_token:
             logger.info("Credentials invalid or expired. Refreshing...")
             try:
-                creds.refresh(Request())
+                request = partial(Request(), timeout=DEADLINE.timeout(OAUTH_TIMEOUT))
+                with span("gmail.oauth_refresh"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method="oauth_refresh"):
+                    creds.refresh(request)
                 logger.info("Refresh completed.")
             except Exception as e:
-                logger.error(f"Refresh failed: {e}")
+                logger.error("Refresh failed: %s", e)
                 # We don't raise here, we let the check below handle it (or maybe we should raise)
 
         if not creds or not creds.valid:
             raise Exception("Could not authenticate with Gmail. Check credentials.")
 
-        self.service = build('gmail', 'v1', credentials=creds)
+        with span("gmail.discovery.build"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method="discovery.build"):
+            client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+            self.service = build('gmail', 'v1', credentials=creds, client_options=client_options)
         logger.info("Successfully connected to Gmail API.")
 
-    def get_emails(self, sender_filter: Optional[str] = None, only_unread: bool = False) -> List[EmailMessage]:
+    def _execute(self, method: str, request):
+        """
+        Execute a Gmail API request, recording its latency and outcome.
+        Waits for the method's quota units first; rate-limit rejections are raised as RateLimitedError.
+        The socket timeout is capped by what is left of run.deadline.
+        """
+        LIMITER.acquire('gmail', method)
+        set_http_timeout(request.http, DEADLINE.timeout(REQUEST_TIMEOUT))
+        try:
+            with span(f"gmail.{method}"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method=method):
+                return request.execute()
+        except HttpError as e:
+            if is_rate_limited(e.resp.status, e.error_details if isinstance(e.error_details, list) else []):
+                retry_after = parse_retry_after(e.resp.get('retry-after'))
+                raise RateLimitedError(f"Gmail rate limited {method} (Retry-After: {retry_after})", retry_after) from e
+            raise
+
+    def _call(self, request: GmailRequest) -> Dict:
         if not self.service:
             raise Exception("Client not connected. Call connect() first.")
-
-        query = 'label:INBOX'
-        if only_unread:
-            query += ' is:unread'
-        if sender_filter:
-            query += f' from:{sender_filter}'
-
-        logger.info(f"Querying Gmail with: {query}")
-        
-        results = self.service.users().messages().list(userId='me', q=query).execute()
-        messages = results.get('messages', [])
-        
-        email_objects = []
-        if not messages:
-            logger.info("No messages found.")
-            return []
-
-        for msg in messages:
-            msg_data = self.service.users().messages().get(userId='me', id=msg['id']).execute()
-            
-            payload = msg_data.get('payload', {})
-            headers = payload.get('headers', [])
-            
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '(No Subject)')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), '(Unknown)')
-            
-            # Internal date is ms timestamp
-            internal_date = int(msg_data.get('internalDate', 0))
-            timestamp = datetime.fromtimestamp(internal_date / 1000.0)
-            
-            # Extract body
-            body = ""
-            if 'parts' in payload:
-                for part in payload['parts']:
-                    if part['mimeType'] == 'text/plain':
-                        data = part['body'].get('data')
-                        if data:
-                            body += base64.urlsafe_b64decode(data).decode()
-            elif 'body' in payload:
-                data = payload['body'].get('data')
-                if data:
-                    body = base64.urlsafe_b64decode(data).decode()
-            
-            # Fallback to snippet if body is empty
-            if not body:
-                body = msg_data.get('snippet', '')
-
-            email_objects.append(EmailMessage(
-                id=msg['id'],
-                sender=sender,
-                subject=subject,
-                snippet=msg_data.get('snippet', ''),
-                body=body,
-                timestamp=timestamp,
-                is_read=False
-            ))
-
-        return email_objects
-
-    def mark_as_read(self, email_ids: List[str]):
-        if not self.service:
-             raise Exception("Client not connected.")
-
-        if not email_ids:
-            return
-
-        batch = {
-            'ids': email_ids,
-            'removeLabelIds': ['UNREAD']
-        }
-        
-        self.service.users().messages().batchModify(userId='me', body=batch).execute()
-        logger.info(f"Marked {len(email_ids)} emails as read.")
+        return self._execute(request.method, service_request(self.service, request))
@@ -0,0 +1,207 @@
+"""
+Parsing of Gmail API message resources (users.messages.get, format=full) into EmailMessage.
+Kept free of googleapiclient imports so it can be reused offline (replay, benchmarks).
+"""
+import base64
+import codecs
+from datetime import datetime
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from agent.mail.client import EmailMessage
+
+# Decoded bytes kept per message body. Enough for any Calendar email; large
+# HTML newsletters are cut off instead of being decoded in full.
+DEFAULT_MAX_BODY_BYTES = 64 * 1024
+
+# base64url characters decoded per step (multiple of 4, ~12KB of output).
+_CHUNK_CHARS = 16 * 1024
+
+
+def get_header(headers: List[Dict[str, str]], name: str, default: str) -> str:
+    return next((h['value'] for h in headers if h['name'] == name), default)
+
+
+class BodyBuffer:
+    """
+    Accumulates decoded body text up to `max_bytes` of decoded input.
+    Marks itself done once the cap is hit or any of `stop_phrases` has been seen,
+    so callers can stop decoding early.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BODY_BYTES, stop_phrases: Sequence[str] = ()):
+        self.max_bytes = max_bytes
+        self.stop_phrases = tuple(stop_phrases)
+        self.size = 0
+        self.done = False
+        self._pieces: List[str] = []
+        # Phrases can straddle two chunks; keep enough of the previous text to catch them.
+        self._overlap = max((len(p) for p in self.stop_phrases), default=1) - 1
+        self._tail = ""
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_bytes - self.size)
+
+    def feed(self, text: str, raw_size: int):
+        if not text and not raw_size:
+            return
+        self._pieces.append(text)
+        self.size += raw_size
+        if self.size >= self.max_bytes:
+            self.done = True
+        if self.stop_phrases:
+            window = self._tail + text
+            if any(phrase in window for phrase in self.stop_phrases):
+                self.done = True
+            self._tail = window[-self._overlap:] if self._overlap else ""
+
+    def getvalue(self) -> str:
+        return "".join(self._pieces)
+
+
+def _charset(part: Dict) -> str:
+    for header in part.get('headers', []):
+        if header['name'].lower() == 'content-type':
+            for param in header['value'].split(';')[1:]:
+                key, _, value = param.strip().partition('=')
+                if key.lower() == 'charset' and value:
+                    charset = value.strip('"\' ')
+                    try:
+                        codecs.lookup(charset)
+                        return charset
+                    except LookupError:
+                        break
+    return 'utf-8'
+
+
+def decode_into(data: str, buffer: BodyBuffer, charset: str = 'utf-8'):
+    """
+    Incrementally base64url-decode `data` into `buffer`, a chunk at a time,
+    stopping as soon as the buffer reports it is done.
+    """
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    for start in range(0, len(data), _CHUNK_CHARS):
+        piece = data[start:start + _CHUNK_CHARS]
+        last = start + _CHUNK_CHARS >= len(data)
+        if last:
+            # Tolerate unpadded base64url.
+            piece += '=' * (-len(piece) % 4)
+        raw = base64.urlsafe_b64decode(piece)
+        if len(raw) >= buffer.remaining:
+            raw, last = raw[:buffer.remaining], True
+        buffer.feed(decoder.decode(raw, final=last), len(raw))
+        if buffer.done or last:
+            return
+
+
+def iter_parts(part: Dict) -> Iterator[Dict]:
+    """Depth-first walk over a payload and all nested multipart parts."""
+    yield part
+    for child in part.get('parts', []) or []:
+        yield from iter_parts(child)
+
+
+def _is_attachment(part: Dict) -> bool:
+    return bool(part.get('filename')) or 'attachmentId' in part.get('body', {})
+
+
+def text_parts(payload: Dict) -> List[Tuple[str, str]]:
+    """
+    (base64url data, charset) of the parts that make up the message text, including
+    bodies nested in multipart/alternative or multipart/mixed: the text/plain parts,
+    or the text/html ones if the message has no plain-text part.
+    """
+    for mime_type in ('text/plain', 'text/html'):
+        parts = [(part['body']['data'], _charset(part)) for part in iter_parts(payload)
+                 if part.get('mimeType') == mime_type and not _is_attachment(part)
+                 and part.get('body', {}).get('data')]
+        if parts:
+            return parts
+    return []
+
+
+def calendar_part(payload: Dict) -> Optional[Tuple[str, str]]:
+    """(base64url data, charset) of the inline text/calendar part (Calendar invitations), if any."""
+    for part in iter_parts(payload):
+        data = part.get('body', {}).get('data')
+        if part.get('mimeType') == 'text/calendar' and data:
+            return data, _charset(part)
+    return None
+
+
+def calendar_text(payload: Dict, max_bytes: int = DEFAULT_MAX_BODY_BYTES) -> Optional[str]:
+    """The inline text/calendar part (Calendar invitations), decoded; None if there is none."""
+    part = calendar_part(payload)
+    return decode_parts([part], max_bytes) if part is not None else None
+
+
+def decode_parts(parts: Sequence[Tuple[str, str]], max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                 stop_phrases: Sequence[str] = ()) -> str:
+    """Decode text_parts() output, stopping after `max_bytes` or once one of `stop_phrases` was found."""
+    buffer = BodyBuffer(max_bytes, stop_phrases)
+    for data, charset in parts:
+        if buffer.done:
+            break
+        if buffer.size:
+            buffer.feed("\n", 0)
+        decode_into(data, buffer, charset)
+    return buffer.getvalue()
+
+
+def extract_body(payload: Dict, max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                 stop_phrases: Sequence[str] = ()) -> str:
+    """
+    Decode the message text from a payload, including bodies nested in
+    multipart/alternative or multipart/mixed. text/plain parts are used; text/html
+    only if the message has no plain-text part. Decoding stops after `max_bytes`
+    or once one of `stop_phrases` has been found.
+    """
+    return decode_parts(text_parts(payload), max_bytes, stop_phrases)
+
+
+def _load_body(parts: Sequence[Tuple[str, str]], snippet: str, max_bytes: int,
+               stop_phrases: Sequence[str]) -> str:
+    # Fallback to snippet if body is empty
+    return decode_parts(parts, max_bytes, stop_phrases) or snippet
+
+
+def parse_message(msg_data: Dict, max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                  stop_phrases: Sequence[str] = ()) -> EmailMessage:
+    """
+    Convert a Gmail message resource into a generic EmailMessage. The body and the
+    calendar part are decoded on first access: most messages are rejected on their
+    headers and never need them. Only the base64url strings of those parts are kept
+    until then, not the resource.
+    """
+    payload = msg_data.get('payload', {})
+    headers = payload.get('headers', [])
+
+    subject = get_header(headers, 'Subject', '(No Subject)')
+    sender = get_header(headers, 'From', '(Unknown)')
+
+    # Internal date is ms timestamp
+    internal_date = int(msg_data.get('internalDate', 0))
+    timestamp = datetime.fromtimestamp(internal_date / 1000.0)
+
+    snippet = msg_data.get('snippet', '')
+    # Base64url needed for max_body_bytes of output; the rest would never be decoded.
+    max_chars = -(-max_body_bytes // 3) * 4
+    parts = tuple((data[:max_chars], charset) for data, charset in text_parts(payload))
+    body_loader = partial(_load_body, parts, snippet, max_body_bytes, tuple(stop_phrases))
+    calendar_loader = None
+    calendar = calendar_part(payload)
+    if calendar is not None:
+        data, charset = calendar
+        calendar_loader = partial(decode_parts, ((data[:max_chars], charset),), max_body_bytes)
+
+    return EmailMessage(
+        id=msg_data['id'],
+        sender=sender,
+        subject=subject,
+        snippet=snippet,
+        timestamp=timestamp,
+        is_read=False,
+        body_loader=body_loader,
+        calendar_loader=calendar_loader
+    )
@@ -0,0 +1,332 @@
+"""
+Request building shared by the Gmail clients (GmailClient, GmailRestClient and
+AsyncGmailClient): credentials, search queries, partial-response field masks,
+thread message scoping, rate limit detection and users.messages.batchModify
+bodies. Kept free of googleapiclient imports.
+
+Calls that depend on earlier responses (fetching a query's emails, resolving a
+label, acknowledging) are written once as flows: generators that yield the
+GmailRequest to make, or a list of them to make in any order or concurrently, and
+are sent back the response. Each client only runs the requests: BlockingGmailClient
+(GmailClient, GmailRestClient) with run_flow, AsyncGmailClient concurrently.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Generator, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
+
+from agent.errors import RateLimitedError, parse_retry_after
+from agent.mail.client import EmailClient, EmailMessage
+from agent.mail.gmail_payload import DEFAULT_MAX_BODY_BYTES, parse_message
+from agent.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# One set of series for all Gmail clients, so dashboards don't care which one ran.
+GMAIL_REQUEST_SECONDS = REGISTRY.histogram(
+    "agent_gmail_request_duration_seconds", "Latency of Gmail API calls and OAuth refresh.", ["method"])
+GMAIL_REQUESTS = REGISTRY.counter(
+    "agent_gmail_requests_total", "Gmail API calls and OAuth refreshes by outcome.", ["method", "outcome"])
+GMAIL_MESSAGES_FETCHED = REGISTRY.counter(
+    "agent_gmail_messages_fetched_total", "Messages downloaded with messages().get or threads().get.")
+
+# users.messages.batchModify accepts at most this many IDs per call.
+BATCH_MODIFY_MAX_IDS = 1000
+
+# 403s with these reasons are quota/rate rejections, not permission errors.
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Partial responses (`fields`): only what parse_message and the clients read.
+MESSAGE_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload(mimeType,filename,headers,body(data,attachmentId),parts)"
+LIST_FIELDS = "messages(id),nextPageToken"
+THREAD_LIST_FIELDS = "threads(id),nextPageToken"
+THREAD_FIELDS = f"messages({MESSAGE_FIELDS})"
+
+
+def load_credentials() -> Optional[Dict[str, str]]:
+    """OAuth client ID, secret and refresh token: GMAIL_* env vars, then token.json."""
+    creds = {
+        'client_id': os.getenv('GMAIL_CLIENT_ID'),
+        'client_secret': os.getenv('GMAIL_CLIENT_SECRET'),
+        'refresh_token': os.getenv('GMAIL_REFRESH_TOKEN'),
+    }
+    if all(creds.values()):
+        logger.info("Using credentials from environment.")
+        return creds
+    if os.path.exists('token.json'):
+        logger.info("Loading credentials from token.json")
+        try:
+            with open('token.json') as f:
+                data = json.load(f)
+            return {key: data[key] for key in creds}
+        except Exception as e:
+            logger.error("Failed to load token.json: %s", e)
+    else:
+        logger.warning("No credentials found in env or token.json.")
+    return None
+
+
+def oauth_refresh_form(creds: Dict[str, str]) -> Dict[str, str]:
+    """Form body of the token endpoint POST that exchanges the refresh token for an access token."""
+    return {'grant_type': 'refresh_token', **creds}
+
+
+def is_rate_limited(status: int, error_details: List) -> bool:
+    if status == 429:
+        return True
+    return status == 403 and any(d.get('reason') in RATE_LIMIT_REASONS for d in error_details if isinstance(d, dict))
+
+
+def error_details(body: bytes) -> List:
+    """The `errors` list of a Gmail JSON error response (empty if there is none)."""
+    try:
+        return json.loads(body).get('error', {}).get('errors', [])
+    except (ValueError, AttributeError):
+        return []
+
+
+def check_rate_limited(method: str, status: int, body: bytes, retry_after: Optional[str]):
+    """Raise RateLimitedError if a REST response is a quota or rate rejection."""
+    if status in (403, 429) and is_rate_limited(status, error_details(body)):
+        delay = parse_retry_after(retry_after)
+        raise RateLimitedError(f"Gmail rate limited {method} (Retry-After: {delay})", delay)
+
+
+# meet.acknowledge values that modify the message.
+ACK_ACTIONS = ("label", "archive", "read")
+
+
+def label_search_name(label: str) -> str:
+    """Gmail search syntax for a label name: spaces and slashes become hyphens."""
+    return label.replace('/', '-').replace(' ', '-').lower()
+
+
+def search_query(sender_filter: Optional[str] = None, only_unread: bool = False,
+                 exclude_label: Optional[str] = None, search_terms: str = "") -> str:
+    query = 'label:INBOX'
+    if only_unread:
+        query += ' is:unread'
+    if sender_filter:
+        query += f' from:{sender_filter}'
+    if exclude_label:
+        query += f' -label:{label_search_name(exclude_label)}'
+    if search_terms:
+        query += f' {search_terms}'
+    return query
+
+
+def in_query_scope(label_ids: Sequence[str], only_unread: bool = False,
+                   exclude_label_id: Optional[str] = None) -> bool:
+    """
+    Whether a message of a fetched thread satisfies search_query's label terms.
+    threads.list matches a thread if any one of its messages does, and threads.get
+    returns all of them, including ones the query would have left out.
+    """
+    if 'INBOX' not in label_ids:
+        return False
+    if only_unread and 'UNREAD' not in label_ids:
+        return False
+    return exclude_label_id is None or exclude_label_id not in label_ids
+
+
+def thread_messages(thread: Dict, only_unread: bool = False,
+                    exclude_label_id: Optional[str] = None) -> List[Dict]:
+    """The message resources of a threads.get response that are in the query's scope."""
+    return [m for m in thread.get('messages', [])
+            if in_query_scope(m.get('labelIds', []), only_unread, exclude_label_id)]
+
+
+def ack_label_changes(action: str, label_id: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """(addLabelIds, removeLabelIds) that acknowledge a message with `action`."""
+    if action == "label":
+        return [label_id], []
+    if action == "archive":
+        return [], ['INBOX']
+    if action == "read":
+        return [], ['UNREAD']
+    raise ValueError(f"Unknown acknowledge action: {action}. Expected one of {', '.join(ACK_ACTIONS)}.")
+
+
+def batch_modify_bodies(email_ids: Sequence[str], add: Sequence[str] = (),
+                        remove: Sequence[str] = ()) -> Iterator[Dict]:
+    """batchModify request bodies covering `email_ids`, BATCH_MODIFY_MAX_IDS per call."""
+    for start in range(0, len(email_ids), BATCH_MODIFY_MAX_IDS):
+        body = {'ids': list(email_ids[start:start + BATCH_MODIFY_MAX_IDS])}
+        if add:
+            body['addLabelIds'] = list(add)
+        if remove:
+            body['removeLabelIds'] = list(remove)
+        yield body
+
+
+# REST paths under users/me/, by method.
+REST_PATHS = {
+    'messages.list': 'messages',
+    'messages.get': 'messages/{id}',
+    'messages.batchModify': 'messages/batchModify',
+    'threads.list': 'threads',
+    'threads.get': 'threads/{id}',
+    'users.getProfile': 'profile',
+    'labels.list': 'labels',
+    'labels.create': 'labels',
+}
+
+
+class GmailRequest(NamedTuple):
+    """One users.* API call: `method` as named in the quota table and metrics, e.g. 'threads.get'."""
+    method: str
+    params: Dict[str, Any] = {}
+    id: Optional[str] = None
+    body: Optional[Dict] = None
+
+    @property
+    def http_method(self) -> str:
+        return 'GET' if self.body is None else 'POST'
+
+    @property
+    def path(self) -> str:
+        return REST_PATHS[self.method].format(id=self.id)
+
+
+PROFILE_REQUEST = GmailRequest('users.getProfile', {'fields': 'historyId'})
+LABELS_REQUEST = GmailRequest('labels.list')
+
+
+def list_request(query: str, threads: bool = False, page_token: Optional[str] = None,
+                 page_size: Optional[int] = None) -> GmailRequest:
+    params = {'q': query, 'fields': THREAD_LIST_FIELDS if threads else LIST_FIELDS}
+    if page_size:
+        params['maxResults'] = page_size
+    if page_token:
+        params['pageToken'] = page_token
+    return GmailRequest('threads.list' if threads else 'messages.list', params)
+
+
+def get_request(resource_id: str, thread: bool = False) -> GmailRequest:
+    if thread:
+        return GmailRequest('threads.get', {'fields': THREAD_FIELDS}, resource_id)
+    return GmailRequest('messages.get', {'fields': MESSAGE_FIELDS}, resource_id)
+
+
+def create_label_request(name: str) -> GmailRequest:
+    return GmailRequest('labels.create', body={'name': name, 'labelListVisibility': 'labelShow',
+                                               'messageListVisibility': 'show'})
+
+
+T = TypeVar('T')
+# Yields a request (or a list of them), is sent the response (or the list of responses), returns T.
+Flow = Generator[Union[GmailRequest, List[GmailRequest]], Any, T]
+
+
+def run_flow(flow: Flow[T], call: Callable[[GmailRequest], Dict]) -> T:
+    """Run a flow with a blocking `call`, one request at a time."""
+    try:
+        step = next(flow)
+        while True:
+            if isinstance(step, list):
+                step = flow.send([call(request) for request in step])
+            else:
+                step = flow.send(call(step))
+    except StopIteration as done:
+        return done.value
+
+
+def label_id(label_ids: Dict[str, str], name: str, create: bool = True) -> Flow[Optional[str]]:
+    """
+    ID of the user label `name`, cached in `label_ids` and created on first use (None if
+    it doesn't exist and not `create`).
+    """
+    if name not in label_ids:
+        labels = yield LABELS_REQUEST
+        label = next((l for l in labels.get('labels', []) if l['name'] == name), None)
+        if label is None and not create:
+            return None
+        if label is None:
+            logger.info("Creating Gmail label %s.", name)
+            label = yield create_label_request(name)
+        label_ids[name] = label['id']
+    return label_ids[name]
+
+
+def message_resources(query: str, only_unread: bool = False, fetch_threads: bool = False,
+                      label_ids: Optional[Dict[str, str]] = None,
+                      exclude_label: Optional[str] = None) -> Flow[List[Dict]]:
+    """
+    The message resources matching `query`: a messages.get per listed message or, with
+    `fetch_threads`, a threads.get per listed thread, keeping the messages in the query's
+    scope (thread_messages).
+    """
+    if not fetch_threads:
+        results = yield list_request(query)
+        messages = results.get('messages', [])
+        if not messages:
+            logger.info("No messages found.")
+            return []
+        resources = yield [get_request(m['id']) for m in messages]
+    else:
+        results = yield list_request(query, threads=True)
+        threads = results.get('threads', [])
+        if not threads:
+            logger.info("No threads found.")
+            return []
+        exclude_label_id = (yield from label_id(label_ids, exclude_label, create=False)) if exclude_label else None
+        thread_data = yield [get_request(t['id'], thread=True) for t in threads]
+        resources = [m for thread in thread_data for m in thread_messages(thread, only_unread, exclude_label_id)]
+    GMAIL_MESSAGES_FETCHED.inc(len(resources))
+    return resources
+
+
+def acknowledge(label_ids: Dict[str, str], email_ids: Sequence[str], action: str,
+                label: Optional[str] = None) -> Flow[None]:
+    """Apply meet.acknowledge `action` to `email_ids` with batchModify calls, resolving `label` first."""
+    if not email_ids:
+        return
+    add, remove = ack_label_changes(action, (yield from label_id(label_ids, label)) if action == "label" else None)
+    for body in batch_modify_bodies(email_ids, add, remove):
+        yield GmailRequest('messages.batchModify', body=body)
+
+
+class BlockingGmailClient(EmailClient):
+    """
+    EmailClient over the Gmail API for GmailClient and GmailRestClient, which only
+    implement connect() and _call(), running a single request.
+    """
+
+    def __init__(self, max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, stop_phrases: Sequence[str] = (),
+                 exclude_label: Optional[str] = None, search_terms: str = "", fetch_threads: bool = False):
+        # Body decoding stops after max_body_bytes, or as soon as one of stop_phrases is found.
+        self.max_body_bytes = max_body_bytes
+        self.stop_phrases = tuple(stop_phrases)
+        # Messages carrying this label were already acknowledged and are left out of queries.
+        self.exclude_label = exclude_label
+        # Extra Gmail search terms (MeetFilter.search_terms) narrowing every query server-side.
+        self.search_terms = search_terms
+        # List matching threads and download each with one threads.get, instead of a
+        # messages.get per message: an event's invitation, updates and cancellation
+        # share a thread.
+        self.fetch_threads = fetch_threads
+        self._label_ids: Dict[str, str] = {}
+
+    def _call(self, request: GmailRequest) -> Dict:
+        raise NotImplementedError
+
+    def get_emails(self, sender_filter: Optional[str] = None, only_unread: bool = False) -> List[EmailMessage]:
+        query = search_query(sender_filter, only_unread, self.exclude_label, self.search_terms)
+        logger.info("Querying Gmail with: %s", query)
+        resources = run_flow(message_resources(query, only_unread, self.fetch_threads, self._label_ids,
+                                               self.exclude_label), self._call)
+        return [parse_message(msg_data, self.max_body_bytes, self.stop_phrases) for msg_data in resources]
+
+    def fingerprint(self) -> Optional[str]:
+        """The mailbox's historyId, which Gmail advances on every change (one unit of quota)."""
+        return str(self._call(PROFILE_REQUEST)['historyId'])
+
+    def mark_as_read(self, email_ids: List[str]):
+        run_flow(acknowledge(self._label_ids, email_ids, "read"), self._call)
+        if email_ids:
+            logger.info("Marked %d emails as read.", len(email_ids))
+
+    def acknowledge(self, email_ids: List[str], action: str, label: Optional[str] = None):
+        run_flow(acknowledge(self._label_ids, email_ids, action, label), self._call)
+        if email_ids:
+            logger.info("Acknowledged %d emails (%s).", len(email_ids), action)
@@ -0,0 +1,87 @@
+import os
+import logging
+import time
+from typing import Dict, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agent.deadline import DEADLINE
+from agent.mail.gmail_payload import DEFAULT_MAX_BODY_BYTES
+from agent.mail.gmail_requests import (
+    GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, BlockingGmailClient, GmailRequest, check_rate_limited, load_credentials,
+    oauth_refresh_form,
+)
+from agent.metrics.registry import timed
+from agent.ratelimit import LIMITER
+from agent.tracing import span
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+API_ENDPOINT = "https://gmail.googleapis.com/"
+
+# Per-call timeout before run.deadline caps it (googleapiclient's default, as in GmailClient).
+REQUEST_TIMEOUT = 60
+
+class GmailRestClient(BlockingGmailClient):
+    """
+    GmailClient without googleapiclient, httplib2 or google-auth: the REST endpoints
+    are called directly on a pooled requests.Session, the access token comes from one
+    POST to the token endpoint, and responses are trimmed to the fields parse_message
+    reads. Selected with email.provider: gmail_rest.
+    """
+
+    def __init__(self, api_endpoint: Optional[str] = None, token_uri: Optional[str] = None,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, stop_phrases: Sequence[str] = (),
+                 exclude_label: Optional[str] = None, search_terms: str = "", fetch_threads: bool = False):
+        super().__init__(max_body_bytes, stop_phrases, exclude_label, search_terms, fetch_threads)
+        self.api_endpoint = (api_endpoint or os.getenv('GMAIL_API_ENDPOINT') or API_ENDPOINT).rstrip('/')
+        self.token_uri = token_uri or os.getenv('GMAIL_TOKEN_URI') or TOKEN_URI
+        self.session: Optional[requests.Session] = None
+        self.access_token: Optional[str] = None
+        self.expires_at = 0.0
+
+    def connect(self):
+        """Exchange the refresh token for an access token."""
+        creds = load_credentials()
+        if not creds:
+            raise Exception("Could not authenticate with Gmail. Check credentials.")
+
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.mount('https://', HTTPAdapter(pool_maxsize=4))
+            self.session.mount('http://', HTTPAdapter(pool_maxsize=4))
+        timeout = DEADLINE.timeout(REQUEST_TIMEOUT)
+        with span("gmail.oauth_refresh"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method="oauth_refresh"):
+            response = self.session.post(self.token_uri, data=oauth_refresh_form(creds), timeout=timeout)
+            response.raise_for_status()
+        token = response.json()
+        self.access_token = token['access_token']
+        self.expires_at = time.monotonic() + int(token.get('expires_in', 3600))
+        logger.info("Successfully connected to Gmail API.")
+
+    def _call(self, request: GmailRequest) -> Dict:
+        """Call users/me/<path>, recording latency and outcome like GmailClient._execute."""
+        if not self.access_token:
+            raise Exception("Client not connected. Call connect() first.")
+        if time.monotonic() >= self.expires_at - 60:
+            self.connect()
+
+        LIMITER.acquire('gmail', request.method)
+        url = f"{self.api_endpoint}/gmail/v1/users/me/{request.path}"
+        timeout = DEADLINE.timeout(REQUEST_TIMEOUT)
+        with span(f"gmail.{request.method}"), timed(GMAIL_REQUEST_SECONDS, GMAIL_REQUESTS, method=request.method):
+            response = self.session.request(
+                request.http_method, url, params=request.params, json=request.body,
+                headers={'Authorization': f"Bearer {self.access_token}"}, timeout=timeout)
+            check_rate_limited(request.method, response.status_code, response.content,
+                               response.headers.get('Retry-After'))
+            response.raise_for_status()
+        return response.json() if response.content else {}
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+            self.access_token = None
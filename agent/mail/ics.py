@@ -0,0 +1,109 @@
+"""
+Minimal iCalendar (RFC 5545) reading for Calendar invitation emails: the METHOD and
+the first VEVENT's UID, SEQUENCE, STATUS, DTSTART and DTEND. Enough to tell which
+emails describe the same event and which of them is the latest.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+@dataclass
+class CalendarEvent:
+    uid: str
+    sequence: int
+    start: Optional[datetime] # Timezone-aware
+    end: Optional[datetime]
+    method: str = "REQUEST" # REQUEST, CANCEL, ...
+    status: str = "CONFIRMED"
+
+    @property
+    def cancelled(self) -> bool:
+        return self.method == "CANCEL" or self.status == "CANCELLED"
+
+    def is_over(self, now: Optional[datetime] = None) -> bool:
+        """Whether the event has ended (has started, if it has no DTEND)."""
+        last = self.end or self.start
+        return last is not None and last < (now or datetime.now(timezone.utc))
+
+
+def unfold(text: str) -> List[str]:
+    """Content lines with RFC 5545 folding (CRLF followed by a space or tab) undone."""
+    lines: List[str] = []
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def _split(line: str) -> Tuple[str, Dict[str, str], str]:
+    """'DTSTART;TZID=Europe/Kyiv:20240101T100000' -> ('DTSTART', {'TZID': 'Europe/Kyiv'}, '20240101T100000')."""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), {k.upper(): v.strip('"') for k, _, v in (p.partition("=") for p in params)}, value
+
+
+def parse_datetime(value: str, params: Dict[str, str]) -> Optional[datetime]:
+    """DATE-TIME (UTC, TZID or floating) or DATE value as an aware datetime; None if malformed."""
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime.strptime(value[:8], "%Y%m%d").replace(tzinfo=timezone.utc)
+        if value.endswith("Z"):
+            return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+        local = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    except ValueError:
+        return None
+    if "TZID" in params:
+        try:
+            return local.replace(tzinfo=ZoneInfo(params["TZID"]))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    # Floating time: the reader's local time.
+    return local.astimezone()
+
+
+def _when(fields: Dict[str, Tuple[Dict[str, str], str]], name: str) -> Optional[datetime]:
+    if name not in fields:
+        return None
+    params, value = fields[name]
+    return parse_datetime(value.strip(), params)
+
+
+def parse_event(text: str) -> Optional[CalendarEvent]:
+    """The first VEVENT of an iCalendar object, or None if it has none with a UID."""
+    method = "REQUEST"
+    fields: Dict[str, Tuple[Dict[str, str], str]] = {}
+    depth = 0  # Nesting inside the VEVENT (VALARM etc. have properties of their own)
+    for line in unfold(text):
+        name, params, value = _split(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and not fields and depth == 0:
+                depth = 1
+            elif depth:
+                depth += 1
+        elif name == "END" and depth:
+            depth -= 1
+            if depth == 0:
+                break
+        elif depth == 1:
+            fields.setdefault(name, (params, value))
+        elif name == "METHOD" and not depth:
+            method = value.strip().upper()
+
+    if "UID" not in fields:
+        return None
+    try:
+        sequence = int(fields.get("SEQUENCE", ({}, "0"))[1])
+    except ValueError:
+        sequence = 0
+    return CalendarEvent(
+        uid=fields["UID"][1].strip(),
+        sequence=sequence,
+        start=_when(fields, "DTSTART"),
+        end=_when(fields, "DTEND"),
+        method=method,
+        status=fields.get("STATUS", ({}, "CONFIRMED"))[1].strip().upper(),
+    )
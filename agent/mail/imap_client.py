@@ -0,0 +1,429 @@
+import email
+import email.policy
+import imaplib
+import logging
+import re
+import select
+import ssl
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from agent.config.schema import ImapConfig
+from agent.deadline import DEADLINE
+from agent.mail.client import EmailClient, EmailMessage
+from agent.mail.gmail_payload import DEFAULT_MAX_BODY_BYTES
+from agent.metrics.registry import REGISTRY, timed
+from agent.state.store import StateStore
+from agent.tracing import span
+
+logger = logging.getLogger(__name__)
+
+IMAP_REQUEST_SECONDS = REGISTRY.histogram(
+    "agent_imap_request_duration_seconds", "Latency of IMAP commands.", ["method"])
+IMAP_REQUESTS = REGISTRY.counter(
+    "agent_imap_requests_total", "IMAP commands by outcome.", ["method", "outcome"])
+
+HEADER_FIELDS = "(FROM SUBJECT DATE MESSAGE-ID)"
+
+# StateStore section holding the scan watermark between one-shot runs.
+IMAP_SECTION = "imap"
+
+# IMAP dates use English month names whatever the locale (RFC 3501 date-month).
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+_UID_RE = re.compile(rb"UID (\d+)")
+_FLAGS_RE = re.compile(rb"FLAGS \(([^)]*)\)")
+
+# Errors after which the connection is re-established. Plain IMAP4.error (NO/BAD,
+# e.g. a failed LOGIN) is not retried.
+_CONNECTION_ERRORS = (OSError, imaplib.IMAP4.abort)
+
+
+class ImapClient(EmailClient):
+    """
+    EmailClient backed by one long-lived IMAP connection.
+
+    Only UIDs that were not seen before are fetched, and only their headers;
+    bodies are downloaded on demand for emails that pass `header_filter`.
+    `wait_for_changes` uses IDLE (RFC 2177) so new mail is noticed within seconds.
+    The connection is re-established with exponential backoff and resynchronized
+    with UIDVALIDITY/UIDNEXT.
+
+    With `state`, the scan survives the process: the next UID to scan and the headers of
+    the emails that passed `header_filter` are kept in its "imap" section, so a one-shot
+    run only fetches headers above the last scanned UID. They are dropped when UIDVALIDITY
+    or `scope` (the filter settings) change. An email that was already scanned and is
+    marked unread again is not refetched.
+    `since_days` limits every search to mail received in the last that many days.
+    """
+
+    def __init__(self, config: ImapConfig,
+                 header_filter: Optional[Callable[[EmailMessage], bool]] = None,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, state: Optional[StateStore] = None,
+                 scope: str = "", since_days: Optional[int] = None):
+        self.config = config
+        self.header_filter = header_filter
+        self.max_body_bytes = max_body_bytes
+        self.state = state
+        self.scope = scope
+        self.since_days = since_days
+        self.conn: Optional[imaplib.IMAP4] = None
+        self.uidvalidity: Optional[int] = None
+        self.uidnext: Optional[int] = None
+        # uid -> message for everything fetched in this session
+        self._cache: Dict[int, EmailMessage] = {}
+        # Start of an untagged response line cut short while draining the socket during IDLE.
+        self._partial = b''
+
+    # --- connection -----------------------------------------------------
+
+    def connect(self):
+        """Connect, log in and select the mailbox, retrying with exponential backoff."""
+        delay = self.config.reconnect_initial_delay
+        attempt = 0
+        while True:
+            try:
+                self._open()
+                return
+            except _CONNECTION_ERRORS as e:
+                attempt += 1
+                if attempt >= self.config.max_reconnect_attempts:
+                    raise
+                DEADLINE.check(delay)
+                logger.warning("IMAP connection failed (%s). Retrying in %.1fs...", e, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self.config.reconnect_max_delay)
+
+    def _open(self):
+        if not self.config.username or not self.config.password:
+            raise Exception("IMAP credentials (username/password) missing.")
+
+        self._drop_connection()
+        self._partial = b''
+        cls = imaplib.IMAP4_SSL if self.config.use_ssl else imaplib.IMAP4
+        with span("imap.connect"), timed(IMAP_REQUEST_SECONDS, IMAP_REQUESTS, method="connect"):
+            conn = cls(self.config.host, self.config.port, timeout=DEADLINE.timeout(self.config.timeout))
+        with span("imap.login"), timed(IMAP_REQUEST_SECONDS, IMAP_REQUESTS, method="login"):
+            conn.login(self.config.username, self.config.password)
+        with span("imap.select"), timed(IMAP_REQUEST_SECONDS, IMAP_REQUESTS, method="select"):
+            typ, _ = conn.select(self._quote(self.config.mailbox))
+        if typ != 'OK':
+            raise Exception(f"Could not select mailbox {self.config.mailbox}.")
+
+        uidvalidity = self._response_int(conn, 'UIDVALIDITY')
+        uidnext = self._response_int(conn, 'UIDNEXT')
+        if uidvalidity is None or uidnext is None:
+            # Server did not report them on SELECT; ask explicitly.
+            typ, data = conn.status(self._quote(self.config.mailbox), '(UIDNEXT UIDVALIDITY)')
+            status = data[0] or b''
+            uidnext = self._int_from(rb"UIDNEXT (\d+)", status)
+            uidvalidity = self._int_from(rb"UIDVALIDITY (\d+)", status)
+
+        if self.uidvalidity is not None and uidvalidity != self.uidvalidity:
+            # UIDs from before are meaningless now; refetch headers.
+            logger.warning("IMAP UIDVALIDITY changed (%s -> %s). Dropping cached messages.", self.uidvalidity, uidvalidity)
+            self._cache.clear()
+        elif self.uidnext is not None and uidnext is not None and uidnext > self.uidnext:
+            logger.info("IMAP resync: %d new UID(s) arrived while disconnected.", uidnext - self.uidnext)
+
+        self.conn = conn
+        self.uidvalidity = uidvalidity
+        self.uidnext = uidnext
+        logger.info("Connected to IMAP %s (%s, UIDNEXT=%s).", self.config.host, self.config.mailbox, uidnext)
+
+    def _drop_connection(self):
+        if self.conn is not None:
+            try:
+                self.conn.shutdown()
+            except Exception:
+                pass
+            self.conn = None
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.logout()
+            except Exception:
+                pass
+            self.conn = None
+
+    def _call(self, method: str, fn):
+        """
+        Run an IMAP operation, reconnecting once if the connection was lost.
+        The socket timeout is capped by what is left of run.deadline.
+        """
+        if self.conn is None:
+            raise Exception("Client not connected. Call connect() first.")
+        self.conn.sock.settimeout(DEADLINE.timeout(self.config.timeout))
+        try:
+            with span(f"imap.{method}"), timed(IMAP_REQUEST_SECONDS, IMAP_REQUESTS, method=method):
+                return fn()
+        except _CONNECTION_ERRORS as e:
+            logger.warning("IMAP connection lost during %s (%s). Reconnecting...", method, e)
+            self.connect()
+            with span(f"imap.{method}"), timed(IMAP_REQUEST_SECONDS, IMAP_REQUESTS, method=method):
+                return fn()
+
+    # --- EmailClient ----------------------------------------------------
+
+    def get_emails(self, sender_filter: Optional[str] = None, only_unread: bool = False) -> List[EmailMessage]:
+        criteria = []
+        if only_unread:
+            criteria.append('UNSEEN')
+        if sender_filter:
+            criteria.extend(['FROM', self._quote(sender_filter)])
+        if self.since_days:
+            criteria.extend(['SINCE', self._imap_date(datetime.now() - timedelta(days=self.since_days))])
+
+        uids = self._search(*(criteria or ['ALL']))
+        if uids and (self.uidnext is None or max(uids) >= self.uidnext):
+            self.uidnext = max(uids) + 1
+        scanned = self._restore_scan()
+        new_uids = [uid for uid in uids if uid not in self._cache and uid >= scanned]
+        logger.info("IMAP search matched %d message(s), %d new.", len(uids), len(new_uids))
+        if new_uids:
+            self._fetch_headers(new_uids)
+
+        emails = []
+        for uid in uids:
+            message = self._cache.get(uid)
+            if message is None:
+                continue
+            if not message.body and self.header_filter and self.header_filter(message):
+                message = self._cache[uid] = message.with_body(self.fetch_body(uid))
+            emails.append(message)
+
+        # Keep the cache bounded to what the mailbox still matches.
+        self._cache = {uid: self._cache[uid] for uid in uids if uid in self._cache}
+        self._save_scan(max([scanned - 1, *uids]) + 1, emails)
+        return emails
+
+    # --- persisted scan -------------------------------------------------
+
+    def _restore_scan(self) -> int:
+        """
+        Seed the cache from the persisted scan and return the first UID it has not seen
+        (1 without one, or if it belongs to another UIDVALIDITY or scope).
+        """
+        section: Optional[Dict[str, Any]] = self.state.get(IMAP_SECTION) if self.state is not None else None
+        if (not section or section.get('uidvalidity') != self.uidvalidity
+                or section.get('mailbox') != self.config.mailbox or section.get('scope') != self.scope):
+            return 1
+        for uid, fields in section.get('candidates', {}).items():
+            self._cache.setdefault(int(uid), EmailMessage(
+                id=uid, sender=fields['sender'], subject=fields['subject'], snippet='', body='',
+                timestamp=datetime.fromtimestamp(fields['timestamp']), is_read=fields['is_read']))
+        return section.get('scanned', 1)
+
+    def _save_scan(self, scanned: int, emails: List[EmailMessage]):
+        """Persist the scan watermark and the headers of `emails` passing header_filter."""
+        if self.state is None:
+            return
+        candidates = {
+            e.id: {'sender': e.sender, 'subject': e.subject, 'timestamp': e.timestamp.timestamp(), 'is_read': e.is_read}
+            for e in emails if self.header_filter is None or self.header_filter(e)
+        }
+        self.state.set(IMAP_SECTION, {'uidvalidity': self.uidvalidity, 'mailbox': self.config.mailbox,
+                                      'scope': self.scope, 'scanned': scanned, 'candidates': candidates})
+
+    def mark_as_read(self, email_ids: List[str]):
+        if not email_ids:
+            return
+        uid_set = ",".join(email_ids)
+        self._call('uid.store', lambda: self.conn.uid('STORE', uid_set, '+FLAGS.SILENT', r'(\Seen)'))
+        logger.info("Marked %d emails as read.", len(email_ids))
+
+    # --- fetching -------------------------------------------------------
+
+    def _search(self, *criteria: str) -> List[int]:
+        typ, data = self._call('uid.search', lambda: self.conn.uid('SEARCH', *criteria))
+        if typ != 'OK':
+            raise Exception(f"IMAP search failed: {data}")
+        return [int(uid) for uid in (data[0] or b'').split()]
+
+    def _fetch_headers(self, uids: List[int]):
+        uid_set = ",".join(str(uid) for uid in uids)
+        query = f'(UID FLAGS INTERNALDATE BODY.PEEK[HEADER.FIELDS {HEADER_FIELDS}])'
+        typ, data = self._call('uid.fetch_headers', lambda: self.conn.uid('FETCH', uid_set, query))
+        if typ != 'OK':
+            raise Exception(f"IMAP fetch failed: {data}")
+
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+            meta, raw_headers = item
+            uid = self._int_from(_UID_RE.pattern, meta)
+            if uid is None:
+                continue
+            headers = email.message_from_bytes(raw_headers, policy=email.policy.default)
+            flags = _FLAGS_RE.search(meta)
+            internal = imaplib.Internaldate2tuple(meta)
+            timestamp = datetime.fromtimestamp(time.mktime(internal)) if internal else datetime.now()
+            self._cache[uid] = EmailMessage(
+                id=str(uid),
+                sender=str(headers.get('From', '(Unknown)')),
+                subject=str(headers.get('Subject', '(No Subject)')),
+                snippet='',
+                body='',
+                timestamp=timestamp,
+                is_read=bool(flags and b'\\Seen' in flags.group(1)),
+            )
+
+    def fetch_body(self, uid: int) -> str:
+        """Download (at most max_body_bytes of) one message and return its text."""
+        query = f'(BODY.PEEK[]<0.{self.max_body_bytes}>)'
+        typ, data = self._call('uid.fetch_body', lambda: self.conn.uid('FETCH', str(uid), query))
+        raw = next((item[1] for item in data if isinstance(item, tuple)), b'') if typ == 'OK' else b''
+        if not raw:
+            return ''
+
+        message = email.message_from_bytes(raw, policy=email.policy.default)
+        for preference in ('plain', 'html'):
+            part = message.get_body(preferencelist=(preference,))
+            if part is None:
+                continue
+            try:
+                return part.get_content()
+            except (LookupError, ValueError, AttributeError):
+                # Truncated or oddly encoded part; fall back to the raw payload.
+                payload = part.get_payload(decode=True) or b''
+                return payload.decode('utf-8', errors='replace')
+        return ''
+
+    # --- push -----------------------------------------------------------
+
+    def wait_for_changes(self, timeout: float) -> bool:
+        """
+        Block in IMAP IDLE until the server reports new mail or `timeout` seconds pass.
+        Returns True if the mailbox changed. Falls back to sleeping if the server lacks IDLE,
+        which reports no change: the next check finds new mail as usual.
+        """
+        if self.conn is None:
+            self.connect()
+        if 'IDLE' not in self.conn.capabilities:
+            time.sleep(timeout)
+            return False
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                if self._idle(min(remaining, self.config.idle_timeout)):
+                    return True
+            except _CONNECTION_ERRORS as e:
+                logger.warning("IMAP IDLE interrupted (%s). Reconnecting...", e)
+                previous_uidnext = self.uidnext
+                self.connect()
+                if previous_uidnext is not None and self.uidnext != previous_uidnext:
+                    return True
+
+    def _idle(self, timeout: float) -> bool:
+        conn = self.conn
+        tag = conn._new_tag()
+        conn.send(tag + b' IDLE\r\n')
+        self._partial = b''
+
+        changed = False
+        while True:
+            line = conn.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("EOF while starting IDLE")
+            if line.startswith(b'+'):
+                break
+            if line.startswith(tag):
+                raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+            changed |= self._is_change(line)
+
+        if not changed:
+            changed = self._wait_readable(timeout)
+
+        conn.send(b'DONE\r\n')
+        while True:
+            # Completes a line _drain_lines only got the start of.
+            line, self._partial = self._partial + conn.readline(), b''
+            if not line:
+                raise imaplib.IMAP4.abort("EOF while ending IDLE")
+            if line.startswith(tag):
+                break
+            changed |= self._is_change(line)
+        return changed
+
+    def _wait_readable(self, timeout: float) -> bool:
+        """Wait for untagged responses during IDLE without blocking in readline."""
+        conn = self.conn
+        sock = conn.sock
+        deadline = time.monotonic() + timeout
+        sock.setblocking(False)
+        try:
+            while True:
+                got_data, changed = self._drain_lines()
+                if changed:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                pending = isinstance(sock, ssl.SSLSocket) and sock.pending()
+                if not pending:
+                    ready, _, _ = select.select([sock], [], [], remaining)
+                    if not ready:
+                        return False
+                    got_data, changed = self._drain_lines()
+                    if changed:
+                        return True
+                    if not got_data:
+                        raise imaplib.IMAP4.abort("EOF during IDLE")
+        finally:
+            sock.settimeout(self.config.timeout)
+
+    def _drain_lines(self):
+        """
+        Read whatever lines are available on the non-blocking socket. readline() returns
+        what has arrived so far when the socket runs dry, so a line without its CRLF is
+        kept and completed by the next read before it is looked at.
+        """
+        got_data = changed = False
+        while True:
+            try:
+                data = self.conn.readline()
+            except (ssl.SSLWantReadError, BlockingIOError):
+                return True, changed
+            if not data:
+                return got_data, changed
+            got_data = True
+            line = self._partial + data
+            if not line.endswith(b'\n'):
+                self._partial = line
+                continue
+            self._partial = b''
+            changed |= self._is_change(line)
+
+    @staticmethod
+    def _is_change(line: bytes) -> bool:
+        return line.startswith(b'*') and line.rstrip().endswith(b'EXISTS')
+
+    # --- helpers --------------------------------------------------------
+
+    @staticmethod
+    def _imap_date(value: datetime) -> str:
+        """`value` as an IMAP search date, e.g. 1-Jan-2024."""
+        return f"{value.day}-{_MONTHS[value.month - 1]}-{value.year}"
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    @staticmethod
+    def _int_from(pattern: bytes, data: bytes) -> Optional[int]:
+        match = re.search(pattern, data or b'')
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _response_int(conn: imaplib.IMAP4, code: str) -> Optional[int]:
+        _, data = conn.response(code)
+        try:
+            return int(data[-1]) if data and data[-1] is not None else None
+        except (TypeError, ValueError):
+            return None
@@ -1,22 +1,683 @@
+import argparse
+import asyncio
 import logging
 import sys
 import os
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import List, Optional
 
 # Add project root to sys.path to allow running directly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agent.config.loader import load_config
+from agent.config.schema import AppConfig
+from agent.deadline import DEADLINE
+from agent.errors import DeadlineExceeded, RateLimitedError, SourceCheckFailed
 from agent.time.window import TimeWindow
-from agent.mail.gmail_client import GmailClient
-from agent.mail.filters import MeetFilter
+from agent.mail.client import EmailClient, EmailMessage
+from agent.mail.factory import create_email_client, only_unread
+from agent.mail.filters import MeetFilter, MeetNotification
+from agent.memo import ResultMemo
+from agent.reminders import ReminderQueue, format_reminder
 from agent.notifier.manager import NotificationManager
+from agent.polling import PollController
+from agent.profiling import DEFAULT_PROFILE_DIR, PROFILE_ENV, profile_dir, profiled
+from agent.ratelimit import LIMITER
+from agent.tracing import TRACER, span
+from agent.state.history import RunRecorder, append_run
+from agent.state.lease import Lease
 from agent.state.store import StateStore
 from agent.logs.setup import setup_logging
-from agent.slack.client import SlackSessionClient
+from agent.slack.cache import TTLCache
+from agent.slack.client import SlackMention, SlackSessionClient
+from agent.metrics.registry import REGISTRY
+from agent.metrics.server import start_metrics_server
 
 logger = logging.getLogger(__name__)
 
-def main():
+RUN_SECONDS = REGISTRY.histogram(
+    "agent_run_duration_seconds", "Wall time of a full check cycle (sources + notify).")
+SOURCE_SECONDS = REGISTRY.histogram(
+    "agent_source_duration_seconds", "Wall time of a single source check.", ["source"])
+RUNS = REGISTRY.counter(
+    "agent_runs_total", "Check cycles by outcome.", ["outcome"])
+LAST_RUN = REGISTRY.gauge(
+    "agent_last_run_timestamp_seconds", "Unix time at which the last check cycle finished.")
+SOURCES_CANCELLED = REGISTRY.counter(
+    "agent_sources_cancelled_total", "Source checks cut off by run.deadline.", ["source"])
+SOURCES_FAILED = REGISTRY.counter(
+    "agent_source_failures_total", "Source checks that failed with an error.", ["source"])
+MEET_PRECHECKS = REGISTRY.counter(
+    "agent_meet_prechecks_total", "Mailbox fingerprint checks before a Meet scan by result.", ["result"])
+
+# StateStore section with the last Meet scan: {"fingerprint", "scope", "alerts", "matched", "valid_until"}.
+MEET_SECTION = "meet"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Slack Alert Agent")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and check every run.interval seconds instead of exiting after one check.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run sources and notifiers concurrently on an asyncio event loop (see agent/async_main.py).")
+    parser.add_argument("--trace", nargs="?", const="trace.json", metavar="FILE",
+                        help="Record spans of each run and write them as Chrome trace JSON to FILE "
+                             "(default: tracing.output_file). Open in ui.perfetto.dev or chrome://tracing.")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help=f"Profile the run and write reports to DIR (default: {DEFAULT_PROFILE_DIR}/). "
+                             f"Also enabled by {PROFILE_ENV}=DIR. See agent/profiling.py.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Classify the whole mailbox history and seed state.json, resuming an interrupted "
+                             "backfill (see agent/backfill.py and the backfill config section).")
+    return parser.parse_args(argv)
+
+
+def slack_name_cache(config: AppConfig, state: Optional[StateStore]) -> TTLCache:
+    """Channel/user name cache, seeded from the previous run's state."""
+    cache = TTLCache(config.slack.name_cache_ttl)
+    if state is not None:
+        cache.load(state.get("slack", {}).get("names"))
+    return cache
+
+
+def save_slack_state(state: Optional[StateStore], seen: dict, cache: TTLCache):
+    if state is not None:
+        state.set("slack", {"seen": seen, "names": cache.to_dict()})
+
+
+def format_slack_alert(config: AppConfig, unread_count: int, mentions: List[SlackMention]) -> str:
+    alert = f"You have {unread_count} unread Slack messages."
+    shown = mentions[-config.slack.max_mentions:] if config.slack.max_mentions > 0 else []
+    lines = [alert] + [str(m) for m in shown]
+    if len(mentions) > len(shown):
+        lines.append(f"(+{len(mentions) - len(shown)} more)")
+    return "\n".join(lines)
+
+
+def slack_client_options(config: AppConfig, cache: TTLCache) -> dict:
+    """Constructor arguments shared by SlackSessionClient and AsyncSlackSessionClient."""
+    return dict(token=config.slack.token, cookie=config.slack.cookie, workspace_url=config.slack.workspace_url,
+                name_cache=cache, max_concurrency=config.slack.mention_concurrency)
+
+
+def slack_seen(state: Optional[StateStore]) -> dict:
+    """Mentions already reported, as saved by save_slack_state."""
+    return state.get("slack", {}).get("seen", {}) if state is not None else {}
+
+
+def slack_alerts(config: AppConfig, unread_count: int, mentions: List[SlackMention]) -> List[str]:
+    logger.info("Unread Slack messages: %d", unread_count)
+    if unread_count > 0:
+        return [format_slack_alert(config, unread_count, mentions)]
+    return []
+
+
+def raise_check_error(source: str, error: Exception):
+    """
+    Re-raise a check's exception for poll_source: rate limits and the run deadline as
+    they are, anything else as SourceCheckFailed.
+    """
+    if isinstance(error, (RateLimitedError, DeadlineExceeded)):
+        raise error
+    raise SourceCheckFailed(f"{source} check failed: {error}") from error
+
+
+def slack_check_error(error: Exception) -> List[str]:
+    """An expired Slack session is an alert of its own; anything else goes to raise_check_error."""
+    if isinstance(error, PermissionError):
+        logger.critical("Slack session token expired!")
+        return ["CRITICAL: Slack session token expired."]
+    raise_check_error("Slack", error)
+
+
+def check_slack(config: AppConfig, state: Optional[StateStore] = None) -> List[str]:
+    """
+    Query the Slack session API and return alert messages (if any).
+    With slack.fetch_mentions, the alert also lists new mentions; which ones were
+    already reported is kept in `state` so only new activity costs extra calls.
+    """
+    logger.info("Checking Slack API...")
+    try:
+        cache = slack_name_cache(config, state)
+        slack_client = SlackSessionClient(**slack_client_options(config, cache))
+        result = slack_client.get_unread_count()
+
+        mentions = []
+        if config.slack.fetch_mentions:
+            try:
+                mentions, seen = slack_client.get_mentions(result['raw_data'], slack_seen(state))
+                save_slack_state(state, seen, cache)
+            except Exception as e:
+                logger.error("Fetching Slack mentions failed: %s", e)
+        return slack_alerts(config, result['unread_count'], mentions)
+    except Exception as e:
+        return slack_check_error(e)
+
+
+def format_meet_alert(notifications: List[MeetNotification]) -> List[str]:
+    if not notifications:
+        logger.info("No Meet notifications found.")
+        return []
+    count = len(notifications)
+    logger.info("Found %d Meet notifications.", count)
+    # Create a summary message
+    titles = [n.title for n in notifications[:3]] # First 3
+    return [f"Found {count} Google Meet events: " + ", ".join(titles)]
+
+
+def cached_meet_scan(config: AppConfig, state: Optional[StateStore], fingerprint: Optional[str]) -> Optional[dict]:
+    """
+    The last scan's result if the mailbox fingerprint and the meet settings are unchanged
+    and none of its alerts has expired since; None if the mailbox must be scanned.
+    """
+    if fingerprint is None:
+        return None
+    scan = state.get(MEET_SECTION)
+    if not scan or scan.get("fingerprint") != fingerprint or scan.get("scope") != config.meet.model_dump_json():
+        MEET_PRECHECKS.inc(result="changed")
+        return None
+    if scan.get("valid_until") is not None and time.time() >= scan["valid_until"]:
+        MEET_PRECHECKS.inc(result="expired")
+        return None
+    MEET_PRECHECKS.inc(result="unchanged")
+    logger.info("Mailbox unchanged since the last check (historyId %s); skipping the scan.", fingerprint)
+    return scan
+
+
+def remember_meet_scan(config: AppConfig, state: Optional[StateStore], fingerprint: Optional[str],
+                       notifications: List[MeetNotification], alerts: List[str]):
+    if fingerprint is None:
+        return
+    state.set(MEET_SECTION, {
+        "fingerprint": fingerprint,
+        "scope": config.meet.model_dump_json(),
+        "alerts": alerts,
+        "matched": [email_id for n in notifications for email_id in n.email_ids],
+        "valid_until": MeetFilter(config.meet).valid_until(notifications),
+    })
+
+
+def reminder_queue(config: AppConfig, state: Optional[StateStore]) -> Optional[ReminderQueue]:
+    """Pending Meet event reminders kept in state; None without state or meet.remind_before."""
+    if state is None or config.meet.remind_before is None:
+        return None
+    reminders = state.get("reminders")
+    if reminders is None:
+        reminders = {}
+        state.set("reminders", reminders)
+    return ReminderQueue(config.meet.remind_before * 60, reminders)
+
+
+def schedule_reminders(config: AppConfig, state: Optional[StateStore], notifications: List[MeetNotification]):
+    reminders = reminder_queue(config, state)
+    if reminders is not None:
+        reminders.schedule(notifications)
+
+
+def recall_meet_scan(config: AppConfig, state: Optional[StateStore], fingerprint: Optional[str],
+                     matched: Optional[List[str]]) -> Optional[List[str]]:
+    """The alerts of cached_meet_scan, its email IDs added to `matched`; None if the mailbox must be scanned."""
+    scan = cached_meet_scan(config, state, fingerprint)
+    if scan is None:
+        return None
+    if matched is not None:
+        matched.extend(scan["matched"])
+    return scan["alerts"]
+
+
+def meet_alerts(config: AppConfig, state: Optional[StateStore], fingerprint: Optional[str],
+                emails: List[EmailMessage], matched: Optional[List[str]]) -> List[str]:
+    """Filter a scan's emails into alerts, schedule their reminders and remember the scan."""
+    notifications = MeetFilter(config.meet).filter_and_parse(emails)
+    schedule_reminders(config, state, notifications)
+    alerts = format_meet_alert(notifications)
+    remember_meet_scan(config, state, fingerprint, notifications, alerts)
+    if matched is not None:
+        matched.extend(email_id for n in notifications for email_id in n.email_ids)
+    return alerts
+
+
+def check_meet(config: AppConfig, email_client: Optional[EmailClient] = None,
+               matched: Optional[List[str]] = None, state: Optional[StateStore] = None) -> List[str]:
+    """
+    Scan the mailbox for Google Meet notifications and return alert messages (if any).
+    Uses `email_client` if given (daemon mode keeps one open), otherwise connects for this check only.
+    IDs of the matched emails are appended to `matched`, for acknowledging them once the alert is delivered.
+    With `state` and meet.precheck, an unchanged mailbox fingerprint reuses the last scan's result.
+    """
+    logger.info("Checking mail for Meet invitations...")
+    owned = email_client is None
+    try:
+        if owned:
+            email_client = create_email_client(config, state)
+            email_client.connect()
+
+        # Taken before the scan: a change while it runs makes the next check scan again.
+        fingerprint = email_client.fingerprint() if config.meet.precheck and state is not None else None
+        alerts = recall_meet_scan(config, state, fingerprint, matched)
+        if alerts is None:
+            # Fetching ALL emails from the configured sender (persistent alert mode), minus
+            # acknowledged ones: labeled/archived mail drops out of the query, read mail via is:unread.
+            emails = email_client.get_emails(sender_filter=config.meet.sender, only_unread=only_unread(config))
+            alerts = meet_alerts(config, state, fingerprint, emails, matched)
+        return alerts
+    except Exception as e:
+        raise_check_error("Meet", e)
+    finally:
+        if owned and email_client is not None:
+            email_client.close()
+
+
+def acknowledge_meet(config: AppConfig, email_client: Optional[EmailClient], email_ids: List[str]):
+    """Apply meet.acknowledge to emails whose alert was delivered, so later checks skip them."""
+    if not email_ids or config.meet.acknowledge == "none":
+        return
+    owned = email_client is None
+    try:
+        if owned:
+            email_client = create_email_client(config)
+            email_client.connect()
+        email_client.acknowledge(email_ids, config.meet.acknowledge, config.meet.ack_label)
+    except Exception as e:
+        logger.error("Acknowledging Meet emails failed: %s", e)
+    finally:
+        if owned and email_client is not None:
+            email_client.close()
+
+
+def enabled_sources(config: AppConfig) -> List[str]:
+    sources = []
+    if config.slack and config.slack.token:
+        sources.append("slack")
+    if config.meet and config.meet.enabled:
+        sources.append("meet")
+    return sources
+
+
+def all_clear(config: AppConfig, checked: List[str]) -> bool:
+    """True if every enabled source was checked this run (none skipped or cancelled)."""
+    return set(checked) == set(enabled_sources(config))
+
+
+def poll_controller(config: AppConfig, state: Optional[StateStore]) -> Optional[PollController]:
+    """The per-source schedule lives in state; without state every source is checked every run."""
+    if state is None:
+        return None
+    schedule = state.get("polling")
+    if schedule is None:
+        schedule = {}
+        state.set("polling", schedule)
+    return PollController(config.polling, schedule)
+
+
+def result_memo(config: AppConfig, state: Optional[StateStore]) -> Optional[ResultMemo]:
+    """Recent results kept in state for duplicate triggers; None without state or with run.memo_ttl 0."""
+    if state is None or config.run.memo_ttl <= 0:
+        return None
+    memo = state.get("memo")
+    if memo is None:
+        memo = {}
+        state.set("memo", memo)
+    return ResultMemo(config, memo)
+
+
+def wake_source(config: AppConfig, state: Optional[StateStore], source: str):
+    """Check `source` on the next run (e.g. IMAP IDLE saw new mail): due now, nothing memoized."""
+    poll_controller(config, state).wake(source)
+    memo = result_memo(config, state)
+    if memo is not None:
+        memo.forget(source)
+
+
+def leader_lease(config: AppConfig) -> Optional[Lease]:
+    """The lease shared with other replicas, with lease.enabled."""
+    if not config.lease.enabled:
+        return None
+    return Lease(config.lease.path, config.lease.holder, config.lease.ttl)
+
+
+def take_lease(lease: Optional[Lease], state: Optional[StateStore]) -> bool:
+    """
+    Take or renew the leader lease at the start of a run; False on a standby replica.
+    A replica that just became leader reloads state, which the last leader wrote.
+    """
+    if lease is None:
+        return True
+    token = lease.token
+    if not lease.acquire():
+        return False
+    if state is not None:
+        if lease.token != token:
+            state.load()
+        state.fencing_token = lease.token
+    return True
+
+
+def still_leader(lease: Optional[Lease]) -> bool:
+    """Fencing check before notifying: the lease may have expired while sources ran."""
+    return lease is None or lease.held()
+
+
+def source_cancelled(source: str, error: Exception):
+    logger.warning("%s check cancelled at the run deadline: %s", source, error or 'timed out')
+    SOURCES_CANCELLED.inc(source=source)
+
+
+def record_quota_usage(state: StateStore):
+    """Store the quota units charged since the last run (and today's running total) in state."""
+    usage = LIMITER.take_usage()
+    quota = state.get("quota", {})
+    today = date.today().isoformat()
+    daily = quota.get("daily", {}) if quota.get("date") == today else {}
+    for provider, methods in usage.items():
+        daily[provider] = daily.get(provider, 0) + sum(methods.values())
+    state.set("quota", {"last_run": usage, "date": today, "daily": daily})
+
+
+# What poll_source hands to CheckCycle.failed instead of raising.
+CHECK_ERRORS = (RateLimitedError, TimeoutError, SourceCheckFailed)
+
+
+class CheckCycle:
+    """
+    Bookkeeping of one check cycle, shared by run_once and its async counterpart
+    (agent.async_main): the poll schedule, recent results (run.memo_ttl), the leader
+    lease, due reminders, what to notify and acknowledge, and the run history. Only
+    the source, notifier and mail calls differ between the two.
+    """
+
+    def __init__(self, config: AppConfig, state: Optional[StateStore] = None, lease: Optional[Lease] = None):
+        self.config = config
+        self.state = state
+        self.lease = lease
+        self.recorder = RunRecorder()
+        self.leader = take_lease(lease, state)
+        self.controller = poll_controller(config, state)
+        self.memo = result_memo(config, state)
+        self.reminders: Optional[ReminderQueue] = None
+        self.due: List[dict] = []
+        self.meet_ids: List[str] = []
+        self.checked: List[str] = []
+        self.alerts: List[str] = []
+        self.delivered = True
+
+    def _matched(self, source: str) -> Optional[List[str]]:
+        """The list `source`'s check appends email IDs to."""
+        return self.meet_ids if source == "meet" else None
+
+    def recall(self, source: str) -> Optional[List[str]]:
+        """
+        `source`'s alerts without checking it: a recent run's result, or none while the
+        source isn't due. None if the check has to run.
+        """
+        entry = self.memo.recall(source) if self.memo is not None else None
+        if entry is not None:
+            matched = self._matched(source)
+            if matched is not None:
+                matched.extend(entry["matched"])
+            self.checked.append(source)
+            return entry["messages"]
+        if self.controller is not None and not self.controller.is_due(source):
+            return []
+        return None
+
+    @contextmanager
+    def checking(self, source: str):
+        """Span and timing of `source`'s check; raises DeadlineExceeded if the run has no time left."""
+        DEADLINE.check()
+        with span(f"source.{source}"), SOURCE_SECONDS.time(source=source):
+            yield
+
+    def record(self, source: str, messages: List[str]) -> List[str]:
+        """Feed a completed check into the schedule and the memo; it counts towards the all-clear."""
+        if self.controller is not None:
+            self.controller.record(source, active=bool(messages))
+        if self.memo is not None:
+            self.memo.remember(source, messages, self._matched(source))
+        self.checked.append(source)
+        return messages
+
+    def failed(self, source: str, error: Exception) -> List[str]:
+        """
+        A check that did not complete (one of CHECK_ERRORS). It is neither memoized nor
+        counted as checked, and only a rate limit changes its schedule.
+        """
+        if isinstance(error, RateLimitedError):
+            if self.controller is not None:
+                self.controller.record_rate_limited(source, error.retry_after)
+            else:
+                logger.warning("%s check rate limited: %s", source, error)
+        elif isinstance(error, TimeoutError):
+            # DeadlineExceeded from a call, or asyncio.timeout cancelling the check:
+            # the source is still due on the next run.
+            source_cancelled(source, error)
+        else:
+            logger.error("%s", error)
+            SOURCES_FAILED.inc(source=source)
+        return []
+
+    def collect(self, results: List[List[str]]) -> Optional[str]:
+        """
+        Join the sources' alerts (in source order) and the due reminders into the message
+        to send. None if there is nothing to send: no alerts, a standby replica, or the
+        same alert a run within run.memo_ttl already sent.
+        """
+        self.alerts = [m for messages in results for m in messages]
+        self.reminders = reminder_queue(self.config, self.state)
+        self.due = self.reminders.pop_due() if self.reminders is not None else []
+        now = time.time()
+        self.alerts.extend(format_reminder(r, now) for r in self.due)
+
+        self.leader = self.leader and still_leader(self.lease)
+        if not self.leader:
+            logger.info("Standby: leaving %d alerts to the lease holder.", len(self.alerts))
+            return None
+        if not self.alerts:
+            logger.info("No alerts needed.")
+            return None
+        logger.info("Alerts triggered. Sending notifications...")
+        message = "\n".join(self.alerts)
+        if self.memo is not None and self.memo.already_sent(message):
+            # Duplicate trigger: the run that sent it also acknowledged the emails.
+            self.meet_ids.clear()
+            return None
+        return message
+
+    @property
+    def all_clear(self) -> bool:
+        """Nothing to alert about and every enabled source checked: ringing alerts can be resolved."""
+        return self.leader and not self.alerts and all_clear(self.config, self.checked)
+
+    def sent(self, message: str, delivered: bool):
+        if delivered:
+            logger.info("Notifications sent successfully.")
+            if self.memo is not None:
+                self.memo.sent(message)
+        else:
+            logger.error("Failed to notify.")
+            self.delivered = False
+
+    def to_acknowledge(self) -> List[str]:
+        """Matched Meet emails for meet.acknowledge, once the leader delivered their alert."""
+        return self.meet_ids if self.delivered and self.leader else []
+
+    def finish(self) -> bool:
+        """Settle due reminders and save state and the run history. Returns whether the alerts were delivered."""
+        if self.due:
+            (self.reminders.sent if self.delivered and self.leader else self.reminders.requeue)(self.due)
+        if self.state is not None and self.leader:
+            record_quota_usage(self.state)
+            append_run(self.state, self.recorder.finish(self.delivered, len(self.alerts)), self.config.run.history_size)
+            self.state.save()
+        RUNS.inc(outcome="ok" if self.delivered else "notify_failed")
+        LAST_RUN.set(time.time())
+        return self.delivered
+
+
+def poll_source(cycle: CheckCycle, source: str, check) -> List[str]:
+    """
+    Run `check` if `source` is due and feed the outcome back into `cycle`: a completed
+    check is scheduled, memoized and counted as checked; one that failed, was rate limited
+    or ran out of time is not (CheckCycle.failed). A recent result is reused instead.
+    """
+    messages = cycle.recall(source)
+    if messages is not None:
+        return messages
+    try:
+        with cycle.checking(source):
+            messages = check()
+    except CHECK_ERRORS as e:
+        return cycle.failed(source, e)
+    return cycle.record(source, messages)
+
+
+def run_once(config: AppConfig, notifier_manager: NotificationManager,
+             email_client: Optional[EmailClient] = None, state: Optional[StateStore] = None,
+             lease: Optional[Lease] = None) -> bool:
+    """
+    Run a single check cycle over all enabled sources and notify if needed.
+    Returns False if alerts were triggered but could not be delivered.
+    `state`, if given, is saved at the end of the cycle and drives the adaptive
+    per-source schedule (sources that are not due are skipped).
+    With run.deadline, sources must finish run.notify_reserve seconds before it; the
+    ones that could not are cancelled and the others' alerts are still sent.
+    With a `lease`, a replica that doesn't hold it checks the sources but leaves
+    notifying, acknowledging and saving state to the leader.
+    Runs within run.memo_ttl of the last check reuse its results and don't resend its alert.
+    Meet event reminders that are due (meet.remind_before) go out with the alerts.
+    Each saved run also adds its timings to the run history (agent.stats).
+    """
+    with span("run"), RUN_SECONDS.time(), DEADLINE.run(config.run.deadline):
+        cycle = CheckCycle(config, state, lease)
+        checks = {
+            "slack": lambda: check_slack(config, state),
+            "meet": lambda: check_meet(config, email_client, cycle.meet_ids, state),
+        }
+        with DEADLINE.hold_back(config.run.notify_reserve):
+            results = [poll_source(cycle, source, checks[source]) for source in enabled_sources(config)]
+
+        message = cycle.collect(results)
+        if message is not None:
+            # The NotificationManager.notify(message) signature accepts a string,
+            # so the dynamic summary is passed through instead of the static config message.
+            cycle.sent(message, notifier_manager.notify(message))
+        elif cycle.all_clear:
+            notifier_manager.resolve()
+        acknowledge_meet(config, email_client, cycle.to_acknowledge())
+        return cycle.finish()
+
+
+def write_trace(config: AppConfig):
+    """Export the spans recorded since the last call to tracing.output_file and start a new trace."""
+    if not TRACER.enabled:
+        return
+    try:
+        TRACER.write(config.tracing.output_file.format(timestamp=time.strftime("%Y%m%d-%H%M%S")))
+    except Exception as e:
+        logger.error("Failed to write trace file: %s", e)
+    TRACER.reset()
+
+
+def send_critical(notifier_manager: Optional[NotificationManager], error: Exception):
+    """Best-effort alert about an agent crash."""
+    if notifier_manager is None:
+        # Config is loaded but the notifiers failed to initialize; rely on logs.
+        return
+    try:
+        notifier_manager.notify(f"CRITICAL AGENT ERROR: {error}")
+    except Exception:
+        pass
+
+
+def next_check_delay(config: AppConfig, state: Optional[StateStore]) -> float:
+    """Seconds until the next source (run.interval without adaptive polling) or reminder is due."""
+    controller = poll_controller(config, state)
+    sources = enabled_sources(config)
+    if controller is None or not config.polling.enabled or not sources:
+        delay = config.run.interval
+    else:
+        delay = max(1.0, controller.seconds_until_next(sources))
+    reminders = reminder_queue(config, state)
+    if reminders is not None:
+        delay = min(delay, max(1.0, reminders.seconds_until_next()))
+    return delay
+
+
+def wait_for_next_check(config: AppConfig, email_client: Optional[EmailClient],
+                        timeout: Optional[float] = None) -> bool:
+    """
+    Sleep until the next check is due (`timeout`, default run.interval). Push-capable
+    clients (IMAP IDLE) wake up early when new mail arrives; returns True in that case.
+    """
+    timeout = config.run.interval if timeout is None else timeout
+    wait = getattr(email_client, "wait_for_changes", None)
+    if wait is None:
+        time.sleep(timeout)
+        return False
+    try:
+        if wait(timeout):
+            logger.info("New mail arrived. Checking now.")
+            return True
+    except Exception as e:
+        logger.error("Waiting for mail failed: %s", e)
+        time.sleep(timeout)
+    return False
+
+
+def run_daemon(config: AppConfig):
+    """
+    Long-running mode: check each source when the adaptive schedule says it is due
+    (every run.interval seconds with polling disabled) and serve metrics over HTTP.
+    """
+    if config.metrics.enabled:
+        start_metrics_server(config.metrics.port, host=config.metrics.host)
+
+    state = StateStore()
+    notifier_manager = NotificationManager(config.notifications, state)
+    lease = leader_lease(config)
+
+    # Keep one mail connection for the lifetime of the daemon.
+    email_client = None
+    if config.meet and config.meet.enabled:
+        try:
+            email_client = create_email_client(config, state)
+            email_client.connect()
+        except Exception as e:
+            logger.error("Email client connection failed: %s. Connecting per check instead.", e)
+            email_client = None
+
+    if config.polling.enabled:
+        logger.info("Daemon mode: adaptive polling every %s-%ss.", config.polling.min_interval, config.polling.max_interval)
+    else:
+        logger.info("Daemon mode: checking every %ss.", config.run.interval)
+    try:
+        while True:
+            delay = config.run.interval
+            if TimeWindow.is_working_hours(config.working_hours):
+                try:
+                    run_once(config, notifier_manager, email_client, state, lease)
+                except Exception as e:
+                    logger.exception("Unexpected error: %s", e)
+                    RUNS.inc(outcome="error")
+                    send_critical(notifier_manager, e)
+                write_trace(config)
+                delay = next_check_delay(config, state)
+            if wait_for_next_check(config, email_client, delay):
+                wake_source(config, state, "meet")
+    except KeyboardInterrupt:
+        logger.info("Interrupted. Shutting down.")
+    finally:
+        if email_client is not None:
+            email_client.close()
+        if lease is not None:
+            lease.release()
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
     # 1. Load Config
     try:
         config = load_config()
@@ -28,107 +689,77 @@ def main():
 
     # 2. Setup Logging
     setup_logging(config.logging)
+    LIMITER.configure(config.quota)
+    if args.trace:
+        config.tracing.enabled = True
+        config.tracing.output_file = args.trace
+    if config.tracing.enabled:
+        TRACER.enable()
     logger.info("Agent starting...")
 
-    # 3. Check Time Window
-    if not TimeWindow.is_working_hours(config.working_hours):
-        logger.info("Outside working hours. Exiting.")
-        sys.exit(0)
+    # Profiling wraps everything after config and logging; without --profile/AGENT_PROFILE it is a no-op.
+    with profiled(profile_dir(args.profile)):
+        run_agent(config, args)
 
-    # 4. Initialize Components
-    try:
-        notifier_manager = NotificationManager(config.notifications)
-        state = StateStore() # State might not be needed for API mode if we just want current status, but useful for dedup logic if we want to add it later.
-                             # For now, API mode alerts on count > 0.
-        
-        messages_to_notify = []
-        
-        # --- 4a. Slack API Check ---
-        if config.slack and config.slack.token:
-            logger.info("Checking Slack API...")
-            try:
-                slack_client = SlackSessionClient(
-                    token=config.slack.token, 
-                    cookie=config.slack.cookie, 
-                    workspace_url=config.slack.workspace_url
-                )
-                
-                result = slack_client.get_unread_count()
-                unread_count = result['unread_count']
-                logger.info(f"Unread Slack messages: {unread_count}")
-                
-                if unread_count > 0:
-                     messages_to_notify.append(f"You have {unread_count} unread Slack messages.")
-            except PermissionError:
-                 logger.critical("Slack session token expired!")
-                 messages_to_notify.append("CRITICAL: Slack session token expired.")
-            except Exception as e:
-                logger.error(f"Slack check failed: {e}")
 
-        # --- 4b. Google Meet Check ---
-        if config.meet and config.meet.enabled:
-            logger.info("Checking Gmail for Meet invitations...")
+def run_agent(config: AppConfig, args: argparse.Namespace):
+    """Backfill, daemon or one-shot run, as selected by the command line and config."""
+    if args.backfill:
+        # Imported lazily: backfill runs on the async Gmail client, which needs httpx.
+        from agent.backfill import run_backfill
+        run_backfill(config)
+        return
+
+    use_async = args.use_async or config.run.use_async
+    if args.daemon or config.run.daemon:
+        if use_async:
+            from agent.async_main import run
             try:
-                gmail = GmailClient()
-                gmail.connect()
-                
-                meet_filter = MeetFilter(config.meet)
-                
-                # Fetching ALL emails from the configured sender (persistent alert mode)
-                emails = gmail.get_emails(sender_filter=config.meet.sender, only_unread=False)
-                meet_notifications = meet_filter.filter_and_parse(emails)
-
-                if meet_notifications:
-                    count = len(meet_notifications)
-                    logger.info(f"Found {count} Meet notifications.")
-                    # Create a summary message
-                    titles = [n.title for n in meet_notifications[:3]] # First 3
-                    msg = f"Found {count} Google Meet events: " + ", ".join(titles)
-                    messages_to_notify.append(msg)
-                else:
-                    logger.info("No Meet notifications found.")
-            except Exception as e:
-                logger.error(f"Meet check failed: {e}")
-
-        # --- 5. Notify ---
-        if messages_to_notify:
-            logger.info("Alerts triggered. Sending notifications...")
-            full_message = "\n".join(messages_to_notify)
-            
-            # If we utilize the configured message from config, we might override it or append to it.
-            # config.notifications.telegram.call.message is usually static. 
-            # Let's try to use the dynamic message if the notifier supports it, 
-            # but for safety (CallMeBot limitation might be length), we keep it short or combine.
-            
-            # Note: The original code used config.notifications.telegram.call.message. 
-            # We should probably pass the specific message to the notifier if possible.
-            # The NotificationManager.notify(message) signature accepts a string.
-            
-            if notifier_manager.notify(full_message):
-                logger.info("Notifications sent successfully.")
-            else:
-                logger.error("Failed to notify.")
-                sys.exit(1)
+                asyncio.run(run(config, daemon=True))
+            except KeyboardInterrupt:
+                logger.info("Interrupted. Shutting down.")
         else:
-            logger.info("No alerts needed.")
+            run_daemon(config)
+        return
 
-    except Exception as e:
-        logger.exception(f"Unexpected error: {e}")
-        # Attempt to send a critical alert via Pushover if possible
+    try:
+        # 3. Check Time Window
+        if not TimeWindow.is_working_hours(config.working_hours):
+            logger.info("Outside working hours. Exiting.")
+            sys.exit(0)
+
+        # 4. Initialize Components & run
+        notifier_manager = None
+        lease = leader_lease(config)
         try:
-            # We need to initialize notifier just for this if not already done, 
-            # but usually it dies before loop. If it dies inside loop, notifier_manager exists.
-            # Safety check:
-            if 'notifier_manager' in locals():
-                notifier_manager.notify(f"CRITICAL AGENT ERROR: {e}")
+            state = StateStore() # Slack mention bookkeeping, name cache and Pushover receipts between runs
+            notifier_manager = NotificationManager(config.notifications, state)
+
+            if use_async:
+                # Imported lazily: the async path needs httpx, the default one does not.
+                from agent.async_main import run
+                delivered = asyncio.run(run(config, state=state, lease=lease))
             else:
-                # Try to load minimal config to send alert? 
-                # Or just rely on logs. For now, let's try to reuse if available.
-                pass
-        except:
-            pass
-            
-        sys.exit(1)
+                delivered = run_once(config, notifier_manager, state=state, lease=lease)
+            if not delivered:
+                sys.exit(1)
+        except Exception as e:
+            logger.exception("Unexpected error: %s", e)
+            RUNS.inc(outcome="error")
+            # Attempt to send a critical alert via the configured notifiers if possible
+            send_critical(notifier_manager, e)
+            sys.exit(1)
+        finally:
+            # The next scheduled run (a new process) may take over right away.
+            if lease is not None:
+                lease.release()
+    finally:
+        write_trace(config)
+        if config.metrics.enabled and config.metrics.output_file:
+            try:
+                REGISTRY.write(config.metrics.output_file)
+            except Exception as e:
+                logger.error("Failed to write metrics file: %s", e)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+"""
+Short-lived memo of each source's check result, for duplicate triggers.
+
+External schedulers sometimes start the workflow twice within seconds (cron-job.org
+retries, a manual workflow_dispatch next to the scheduled run). For `run.memo_ttl`
+seconds after a check, later runs reuse its alerts instead of querying Slack and
+Gmail again, and an alert identical to one already delivered in that window is not
+sent a second time. Entries are keyed by a fingerprint of the source's settings, so
+a config change always checks again. The memo is kept in state.json.
+"""
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from agent.config.schema import AppConfig
+from agent.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MEMO_HITS = REGISTRY.counter(
+    "agent_memo_hits_total", "Source checks answered from a recent run's result.", ["source"])
+DUPLICATE_ALERTS = REGISTRY.counter(
+    "agent_duplicate_alerts_total", "Alerts not sent again because a recent run delivered the same one.")
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class ResultMemo:
+    """
+    Recent check results per source and the last delivered alert.
+    `state` is the dict persisted under the "memo" state section; it is updated in place:
+    {source: {"at", "scope", "messages", "matched"}, "sent": {"at", "digest"}}.
+    """
+
+    def __init__(self, config: AppConfig, state: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.config = config
+        self.ttl = config.run.memo_ttl
+        self.state: Dict[str, Dict[str, Any]] = state if state is not None else {}
+        self.clock = clock
+
+    def _scope(self, source: str) -> str:
+        # Settings that decide what the source reports (config.slack, config.meet).
+        return fingerprint(getattr(self.config, source).model_dump_json())
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and 0 <= self.clock() - entry["at"] < self.ttl
+
+    def recall(self, source: str) -> Optional[Dict[str, Any]]:
+        """The result of a check of `source` less than ttl seconds ago with the same settings, or None."""
+        entry = self.state.get(source)
+        if not self._fresh(entry) or entry["scope"] != self._scope(source):
+            return None
+        MEMO_HITS.inc(source=source)
+        logger.info("Reusing the %s check from %.0fs ago.", source, self.clock() - entry["at"])
+        return entry
+
+    def remember(self, source: str, messages: List[str], matched: Optional[List[str]] = None):
+        self.state[source] = {"at": self.clock(), "scope": self._scope(source),
+                              "messages": messages, "matched": list(matched or [])}
+
+    def forget(self, source: str):
+        """Check `source` again on the next run (e.g. IMAP IDLE saw new mail)."""
+        self.state.pop(source, None)
+
+    def already_sent(self, message: str) -> bool:
+        """Whether the same alert was delivered less than ttl seconds ago."""
+        sent = self.state.get("sent")
+        if not self._fresh(sent) or sent["digest"] != fingerprint(message):
+            return False
+        DUPLICATE_ALERTS.inc()
+        logger.info("The same alert was sent %.0fs ago; not sending it again.", self.clock() - sent["at"])
+        return True
+
+    def sent(self, message: str):
+        self.state["sent"] = {"at": self.clock(), "digest": fingerprint(message)}
@@ -8,3 +8,23 @@ class Notifier(ABC):
         Returns True if successful, False otherwise.
         """
         pass
+
+    def resolve(self):
+        """
+        Called after a run in which every source was checked and nothing needed an alert.
+        Notifiers whose alerts keep going on their own (Pushover emergency retries) stop them here.
+        """
+        pass
+
+class AsyncNotifier(ABC):
+    @abstractmethod
+    async def notify(self, message: str) -> bool:
+        """
+        Send a notification without blocking the event loop.
+        Returns True if successful, False otherwise.
+        """
+        pass
+
+    async def resolve(self):
+        """Async counterpart of Notifier.resolve."""
+        pass
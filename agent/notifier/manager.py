@@ -1,20 +1,28 @@
+import asyncio
 import logging
 from typing import Dict
-from agent.notifier.base import Notifier
-from agent.notifier.telegram_call import TelegramCallNotifier
-from agent.notifier.pushover import PushoverNotifier
+from agent.notifier.base import AsyncNotifier, Notifier
+from agent.notifier.telegram_call import AsyncTelegramCallNotifier, TelegramCallNotifier
+from agent.notifier.pushover import AsyncPushoverNotifier, PushoverNotifier
 from agent.config.schema import NotificationConfig
+from agent.metrics.registry import REGISTRY
+from agent.tracing import span
 
 logger = logging.getLogger(__name__)
 
+NOTIFIER_SECONDS = REGISTRY.histogram(
+    "agent_notifier_duration_seconds", "Latency of a single notifier send.", ["notifier"])
+NOTIFIER_ATTEMPTS = REGISTRY.counter(
+    "agent_notifier_attempts_total", "Notification attempts by notifier and outcome.", ["notifier", "outcome"])
+
 class NotificationManager:
-    def __init__(self, config: NotificationConfig):
+    def __init__(self, config: NotificationConfig, state=None):
         self.config = config
         self.notifiers: Dict[str, Notifier] = {}
         
-        # Initialize supported notifiers
+        # Initialize supported notifiers. `state` (StateStore) keeps Pushover emergency receipts between runs.
         self.notifiers['telegram_call'] = TelegramCallNotifier(config.telegram.call)
-        self.notifiers['pushover'] = PushoverNotifier(config.pushover)
+        self.notifiers['pushover'] = PushoverNotifier(config.pushover, state)
 
     def notify(self, message: str) -> bool:
         """
@@ -30,23 +38,103 @@ class NotificationManager:
 
         success = False
         
-        logger.info(f"Starting notification strategy: Order={ordered_notifiers}, StopAfterSuccess={strategy.stop_after_success}")
+        logger.info("Starting notification strategy: Order=%s, StopAfterSuccess=%s", ordered_notifiers, strategy.stop_after_success)
 
         for name in ordered_notifiers:
             notifier = self.notifiers[name]
-            logger.info(f"Attempting notification via {name}...")
+            logger.info("Attempting notification via %s...", name)
             
-            if notifier.notify(message):
+            with span(f"notify.{name}"), NOTIFIER_SECONDS.time(notifier=name):
+                try:
+                    sent = notifier.notify(message)
+                except Exception:
+                    NOTIFIER_ATTEMPTS.inc(notifier=name, outcome="error")
+                    raise
+            NOTIFIER_ATTEMPTS.inc(notifier=name, outcome="ok" if sent else "failed")
+
+            if sent:
                 success = True
-                logger.info(f"Notification via {name} succeeded.")
+                logger.info("Notification via %s succeeded.", name)
                 
                 if strategy.stop_after_success:
                     logger.info("Stop after success is enabled. Stopping strategy.")
                     return True
             else:
-                logger.warning(f"Notification via {name} failed.")
+                logger.warning("Notification via %s failed.", name)
         
         if not success:
             logger.error("All notification attempts failed.")
             
         return success
+
+    def resolve(self):
+        """Tell every notifier that the conditions behind earlier alerts have cleared."""
+        for name, notifier in self.notifiers.items():
+            try:
+                notifier.resolve()
+            except Exception as e:
+                logger.error("Resolving %s failed: %s", name, e)
+
+
+class AsyncNotificationManager:
+    """
+    Asyncio counterpart of NotificationManager. With stop_after_success the notifiers
+    are still tried one after another (the order is a fallback chain); otherwise all
+    of them are sent concurrently, at most `max_concurrency` at a time.
+    """
+    def __init__(self, config: NotificationConfig, http, max_concurrency: int = 4, state=None):
+        self.config = config
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.notifiers: Dict[str, AsyncNotifier] = {}
+
+        self.notifiers['telegram_call'] = AsyncTelegramCallNotifier(config.telegram.call, http)
+        self.notifiers['pushover'] = AsyncPushoverNotifier(config.pushover, http, state)
+
+    async def _send(self, name: str, message: str) -> bool:
+        logger.info("Attempting notification via %s...", name)
+        async with self.semaphore:
+            with span(f"notify.{name}"), NOTIFIER_SECONDS.time(notifier=name):
+                try:
+                    sent = await self.notifiers[name].notify(message)
+                except Exception:
+                    NOTIFIER_ATTEMPTS.inc(notifier=name, outcome="error")
+                    raise
+        NOTIFIER_ATTEMPTS.inc(notifier=name, outcome="ok" if sent else "failed")
+        if sent:
+            logger.info("Notification via %s succeeded.", name)
+        else:
+            logger.warning("Notification via %s failed.", name)
+        return sent
+
+    async def notify(self, message: str) -> bool:
+        """Same contract as NotificationManager.notify."""
+        strategy = self.config.strategy
+        ordered_notifiers = [n for n in strategy.order if n in self.notifiers]
+
+        if not ordered_notifiers:
+            logger.warning("No valid notifiers found in strategy order.")
+            return False
+
+        logger.info("Starting notification strategy: Order=%s, StopAfterSuccess=%s", ordered_notifiers, strategy.stop_after_success)
+
+        if strategy.stop_after_success:
+            for name in ordered_notifiers:
+                if await self._send(name, message):
+                    logger.info("Stop after success is enabled. Stopping strategy.")
+                    return True
+            success = False
+        else:
+            results = await asyncio.gather(*(self._send(name, message) for name in ordered_notifiers))
+            success = any(results)
+
+        if not success:
+            logger.error("All notification attempts failed.")
+
+        return success
+
+    async def resolve(self):
+        """Same contract as NotificationManager.resolve."""
+        results = await asyncio.gather(*(n.resolve() for n in self.notifiers.values()), return_exceptions=True)
+        for name, result in zip(self.notifiers, results):
+            if isinstance(result, Exception):
+                logger.error("Resolving %s failed: %s", name, result)
@@ -1,45 +1,229 @@
+import hashlib
 import requests
 import logging
-from typing import Optional
-from agent.notifier.base import Notifier
+import time
+from typing import Any, Dict, Optional
+from agent.deadline import DEADLINE
+from agent.notifier.base import AsyncNotifier, Notifier
 from agent.config.schema import PushoverConfig
+from agent.metrics.registry import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+EMERGENCY_PRIORITY = 2
+
+# StateStore section holding the receipt of the last emergency alert: {"receipt", "expires_at", "digest"}.
+RECEIPT_SECTION = "pushover"
+
+PUSHOVER_RECEIPTS = REGISTRY.counter(
+    "agent_pushover_receipts_total", "Emergency alert receipt handling by result.", ["result"])
+
+def _payload(config: PushoverConfig, message: str) -> Optional[dict]:
+    """Build the request form, or None if credentials are missing."""
+    if not config.user_key or not config.api_token:
+         logger.error("Pushover credentials (user_key or api_token) missing.")
+         return None
+
+    return {
+        "token": config.api_token,
+        "user": config.user_key,
+        "message": message,
+        "priority": config.priority,
+        "retry": config.retry,
+        "expire": config.expire,
+        "sound": config.sound
+    }
+
+def _check_response(status_code: int, text: str) -> bool:
+    if status_code == 200:
+        logger.info("Pushover notification sent successfully.")
+        return True
+    logger.error("Failed to send Pushover. Status: %s, Body: %s", status_code, text)
+    return False
+
+def _receipt_url(config: PushoverConfig, receipt: str, cancel: bool = False) -> str:
+    """receipts/<receipt>.json (or .../cancel.json) next to the configured messages endpoint."""
+    base = config.api_url.rsplit('/', 1)[0]
+    return f"{base}/receipts/{receipt}/cancel.json" if cancel else f"{base}/receipts/{receipt}.json"
+
+def _suppression(status: Dict[str, Any], config: PushoverConfig, now: float) -> Optional[str]:
+    """Why the last emergency alert makes a new one redundant ('active', 'acknowledged'), or None."""
+    if status.get("acknowledged"):
+        if now - status.get("acknowledged_at", 0) < config.ack_quiet_period:
+            return "acknowledged"
+        return None
+    if not status.get("expired"):
+        return "active"
+    return None
+
+def _digest(message: str) -> str:
+    return hashlib.sha256(message.encode()).hexdigest()[:16]
+
+def _tracking(config: PushoverConfig, state) -> bool:
+    """
+    Emergency (priority 2) alerts keep paging until acknowledged or expired. With a
+    StateStore the receipt of the last one is kept: while it still rings, or was
+    acknowledged within ack_quiet_period, later runs do not page again with the same
+    alert text (a different alert always pages), and once a run finds nothing it is cancelled.
+    """
+    return state is not None and config.track_receipts and config.priority == EMERGENCY_PRIORITY
+
+def _last_receipt(state) -> Optional[Dict[str, Any]]:
+    record = state.get(RECEIPT_SECTION)
+    return record if record and record.get("receipt") else None
+
+def _needs_poll(record: Optional[Dict[str, Any]], config: PushoverConfig, now: float, message: str) -> bool:
+    """Whether the last receipt could suppress `message`: same alert text and not long expired."""
+    if record is None or record.get("digest") != _digest(message):
+        return False
+    # Past expires_at + ack_quiet_period neither outcome can suppress, so don't ask.
+    return now < record["expires_at"] + config.ack_quiet_period
+
+def _suppressed(record: Dict[str, Any], status: Optional[Dict[str, Any]], config: PushoverConfig, now: float) -> bool:
+    reason = _suppression(status, config, now) if status is not None else None
+    if reason is None:
+        return False
+    PUSHOVER_RECEIPTS.inc(result=f"suppressed_{reason}")
+    logger.info("Pushover emergency alert %s with the same text is %s; not paging again.", record["receipt"], reason)
+    return True
+
+def _store_receipt(state, config: PushoverConfig, data: Dict[str, Any], now: float, message: str):
+    receipt = data.get("receipt")
+    if receipt:
+        state.set(RECEIPT_SECTION, {"receipt": receipt, "expires_at": now + config.expire, "digest": _digest(message)})
+        PUSHOVER_RECEIPTS.inc(result="stored")
+
+def _cancellable(state, now: float) -> Optional[Dict[str, Any]]:
+    """
+    The stored receipt if it may still be ringing. An expired one is forgotten; a live one
+    is kept until its cancellation went through, so a failed cancel is retried next run.
+    """
+    record = _last_receipt(state)
+    if record is None:
+        return None
+    if now < record["expires_at"]:
+        return record
+    state.set(RECEIPT_SECTION, {})
+    return None
+
+def _cancelled(state, record: Dict[str, Any]):
+    state.set(RECEIPT_SECTION, {})
+    PUSHOVER_RECEIPTS.inc(result="cancelled")
+    logger.info("Cancelled Pushover emergency alert %s.", record["receipt"])
+
 class PushoverNotifier(Notifier):
-    def __init__(self, config: PushoverConfig):
+    def __init__(self, config: PushoverConfig, state=None):
         self.config = config
-        self.url = "https://api.pushover.net/1/messages.json"
+        self.url = config.api_url
+        # StateStore for emergency receipts; without one every alert pages anew.
+        self.state = state
+
+    def _receipt_status(self, receipt: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = requests.get(_receipt_url(self.config, receipt), params={"token": self.config.api_token},
+                                    timeout=DEADLINE.timeout(10))
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.warning("Could not poll Pushover receipt %s: %s", receipt, e)
+            return None
 
     def notify(self, message: str) -> bool:
+        """
+        True if `message` reached the user: sent now, or the same alert is still ringing
+        (or was just acknowledged) from an earlier run. A different alert always pages.
+        """
         if not self.config.enabled:
             logger.info("Pushover disabled by config.")
             return True # Not an failure, just skipped.
 
-        if not self.config.user_key or not self.config.api_token:
-             logger.error("Pushover credentials (user_key or api_token) missing.")
-             return False
+        payload = _payload(self.config, message)
+        if payload is None:
+            return False
 
-        payload = {
-            "token": self.config.api_token,
-            "user": self.config.user_key,
-            "message": message,
-            "priority": self.config.priority,
-            "retry": self.config.retry, 
-            "expire": self.config.expire,
-            "sound": self.config.sound
-        }
+        now = time.time()
+        tracking = _tracking(self.config, self.state)
+        record = _last_receipt(self.state) if tracking else None
+        if _needs_poll(record, self.config, now, message) and _suppressed(
+                record, self._receipt_status(record["receipt"]), self.config, now):
+            return True
 
         try:
-            logger.info(f"Sending Pushover notification (Priority: {self.config.priority})...")
-            response = requests.post(self.url, data=payload, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info("Pushover notification sent successfully.")
-                return True
-            else:
-                logger.error(f"Failed to send Pushover. Status: {response.status_code}, Body: {response.text}")
-                return False
+            logger.info("Sending Pushover notification (Priority: %s)...", self.config.priority)
+            response = requests.post(self.url, data=payload, timeout=DEADLINE.timeout(10))
+            sent = _check_response(response.status_code, response.text)
+            if sent and tracking:
+                _store_receipt(self.state, self.config, response.json(), now, message)
+            return sent
         except Exception as e:
-            logger.exception(f"Error making request to Pushover: {e}")
+            logger.exception("Error making request to Pushover: %s", e)
             return False
+
+    def resolve(self):
+        record = _cancellable(self.state, time.time()) if _tracking(self.config, self.state) else None
+        if record is None:
+            return
+        try:
+            response = requests.post(_receipt_url(self.config, record["receipt"], cancel=True),
+                                     data={"token": self.config.api_token}, timeout=DEADLINE.timeout(10))
+            response.raise_for_status()
+            _cancelled(self.state, record)
+        except Exception as e:
+            logger.error("Failed to cancel Pushover receipt %s: %s", record['receipt'], e)
+
+class AsyncPushoverNotifier(AsyncNotifier):
+    """PushoverNotifier counterpart sending through a shared httpx.AsyncClient."""
+    def __init__(self, config: PushoverConfig, http, state=None):
+        self.config = config
+        self.url = config.api_url
+        self.http = http
+        self.state = state
+
+    async def _receipt_status(self, receipt: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await self.http.get(_receipt_url(self.config, receipt), params={"token": self.config.api_token},
+                                           timeout=DEADLINE.timeout(10))
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.warning("Could not poll Pushover receipt %s: %s", receipt, e)
+            return None
+
+    async def notify(self, message: str) -> bool:
+        if not self.config.enabled:
+            logger.info("Pushover disabled by config.")
+            return True
+
+        payload = _payload(self.config, message)
+        if payload is None:
+            return False
+
+        now = time.time()
+        tracking = _tracking(self.config, self.state)
+        record = _last_receipt(self.state) if tracking else None
+        if _needs_poll(record, self.config, now, message) and _suppressed(
+                record, await self._receipt_status(record["receipt"]), self.config, now):
+            return True
+
+        try:
+            logger.info("Sending Pushover notification (Priority: %s)...", self.config.priority)
+            response = await self.http.post(self.url, data=payload, timeout=DEADLINE.timeout(10))
+            sent = _check_response(response.status_code, response.text)
+            if sent and tracking:
+                _store_receipt(self.state, self.config, response.json(), now, message)
+            return sent
+        except Exception as e:
+            logger.exception("Error making request to Pushover: %s", e)
+            return False
+
+    async def resolve(self):
+        record = _cancellable(self.state, time.time()) if _tracking(self.config, self.state) else None
+        if record is None:
+            return
+        try:
+            response = await self.http.post(_receipt_url(self.config, record["receipt"], cancel=True),
+                                            data={"token": self.config.api_token}, timeout=DEADLINE.timeout(10))
+            response.raise_for_status()
+            _cancelled(self.state, record)
+        except Exception as e:
+            logger.error("Failed to cancel Pushover receipt %s: %s", record['receipt'], e)
@@ -2,11 +2,34 @@ import requests
 import urllib.parse
 import logging
 import os
-from agent.notifier.base import Notifier
+from typing import Optional
+from agent.deadline import DEADLINE
+from agent.notifier.base import AsyncNotifier, Notifier
 from agent.config.schema import CallMeBotConfig
 
 logger = logging.getLogger(__name__)
 
+def _call_url(config: CallMeBotConfig, message: str) -> Optional[str]:
+    """Build the CallMeBot request URL, or None if no username is configured."""
+    username = config.username
+    if not username:
+         logger.error("Telegram username not configured. Cannot make call.")
+         return None
+
+    # Encode message
+    encoded_msg = urllib.parse.quote(message)
+    
+    # Construct URL
+    # Using the standard endpoint for Telegram CallMeBot
+    return f"{config.api_url}?user={username}&text={encoded_msg}&lang=en-US-Standard-B&rpt=2"
+
+def _check_response(status_code: int, text: str) -> bool:
+    if status_code == 200:
+        logger.info("Call initiated successfully.")
+        return True
+    logger.error("Failed to initiate call. Status: %s, Body: %s", status_code, text)
+    return False
+
 class TelegramCallNotifier(Notifier):
     def __init__(self, config: CallMeBotConfig):
         self.config = config
@@ -24,27 +47,37 @@ class TelegramCallNotifier(Notifier):
             logger.info("Telegram call disabled by config.")
             return True
 
-        username = self.config.username
-        if not username:
-             logger.error("Telegram username not configured. Cannot make call.")
-             return False
+        url = _call_url(self.config, message)
+        if url is None:
+            return False
+
+        try:
+            logger.info("Initiating call to %s...", self.config.username)
+            response = requests.get(url, timeout=DEADLINE.timeout(10))
+            return _check_response(response.status_code, response.text)
+        except Exception as e:
+            logger.exception("Error making request to CallMeBot: %s", e)
+            return False
 
-        # Encode message
-        encoded_msg = urllib.parse.quote(message)
-        
-        # Construct URL
-        # Using the standard endpoint for Telegram CallMeBot
-        url = f"http://api.callmebot.com/start.php?user={username}&text={encoded_msg}&lang=en-US-Standard-B&rpt=2"
+class AsyncTelegramCallNotifier(AsyncNotifier):
+    """TelegramCallNotifier counterpart sending through a shared httpx.AsyncClient."""
+    def __init__(self, config: CallMeBotConfig, http):
+        self.config = config
+        self.http = http
+
+    async def notify(self, message: str) -> bool:
+        if not self.config.enabled:
+            logger.info("Telegram call disabled by config.")
+            return True
+
+        url = _call_url(self.config, message)
+        if url is None:
+            return False
 
         try:
-            logger.info(f"Initiating call to {username}...")
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                logger.info("Call initiated successfully.")
-                return True
-            else:
-                logger.error(f"Failed to initiate call. Status: {response.status_code}, Body: {response.text}")
-                return False
+            logger.info("Initiating call to %s...", self.config.username)
+            response = await self.http.get(url, timeout=DEADLINE.timeout(10))
+            return _check_response(response.status_code, response.text)
         except Exception as e:
-            logger.exception(f"Error making request to CallMeBot: {e}")
+            logger.exception("Error making request to CallMeBot: %s", e)
             return False
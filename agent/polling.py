@@ -0,0 +1,96 @@
+"""
+Adaptive per-source poll scheduling.
+
+Each source (slack, meet) gets its own interval: it drops to `min_interval` after a
+check that found something, grows by `backoff` after every idle check up to
+`max_interval`, and a rate-limited source is not polled again before the server's
+Retry-After has passed. The schedule is kept in state.json, so one-shot runs
+triggered by an external cron skip sources that are not due yet.
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from agent.config.schema import PollingConfig
+from agent.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = REGISTRY.gauge(
+    "agent_poll_interval_seconds", "Current adaptive poll interval per source.", ["source"])
+POLL_SKIPPED = REGISTRY.counter(
+    "agent_poll_skipped_total", "Checks skipped because the source was not due yet.", ["source", "reason"])
+RATE_LIMITED = REGISTRY.counter(
+    "agent_rate_limited_total", "Checks rejected by a provider's rate limit.", ["source"])
+
+
+class PollController:
+    """
+    Decides which sources are due and updates their schedule from each check's outcome.
+    `state` is the dict persisted under the "polling" state section; it is updated in place.
+    """
+
+    def __init__(self, config: PollingConfig, state: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.config = config
+        self.state: Dict[str, Dict[str, float]] = state if state is not None else {}
+        self.clock = clock
+
+    def _source(self, source: str) -> Dict[str, float]:
+        entry = self.state.setdefault(source, {})
+        entry.setdefault("interval", float(self.config.min_interval))
+        entry.setdefault("next_due", 0.0)
+        entry.setdefault("blocked_until", 0.0)
+        return entry
+
+    def is_due(self, source: str) -> bool:
+        """Whether `source` should be checked now. Always True when polling control is disabled."""
+        if not self.config.enabled:
+            return True
+        entry = self._source(source)
+        now = self.clock()
+        if now < entry["blocked_until"]:
+            POLL_SKIPPED.inc(source=source, reason="rate_limited")
+            logger.info("Skipping %s: rate limited for another %.0fs.", source, entry["blocked_until"] - now)
+            return False
+        # External schedulers (cron) fire a little early or late; don't skip a source over jitter.
+        if now < entry["next_due"] - self.config.tolerance:
+            POLL_SKIPPED.inc(source=source, reason="not_due")
+            logger.info("Skipping %s: next poll in %.0fs.", source, entry["next_due"] - now)
+            return False
+        return True
+
+    def record(self, source: str, active: bool):
+        """Update the schedule after a completed check; `active` means it found something."""
+        entry = self._source(source)
+        if active:
+            entry["interval"] = float(self.config.min_interval)
+        else:
+            entry["interval"] = min(entry["interval"] * self.config.backoff, float(self.config.max_interval))
+        entry["next_due"] = self.clock() + entry["interval"]
+        POLL_INTERVAL.set(entry["interval"], source=source)
+
+    def record_rate_limited(self, source: str, retry_after: Optional[float]):
+        """Don't poll `source` again before the server-requested delay (or a backed-off interval)."""
+        entry = self._source(source)
+        RATE_LIMITED.inc(source=source)
+        if retry_after is None:
+            entry["interval"] = min(max(entry["interval"], float(self.config.min_interval)) * self.config.backoff,
+                                    float(self.config.max_interval))
+            delay = entry["interval"]
+        else:
+            delay = retry_after
+        entry["blocked_until"] = self.clock() + delay
+        entry["next_due"] = max(entry["next_due"], entry["blocked_until"])
+        POLL_INTERVAL.set(entry["interval"], source=source)
+        logger.warning("%s is rate limited; next poll in %.0fs.", source, delay)
+
+    def wake(self, source: str):
+        """Make `source` due immediately (e.g. IMAP IDLE saw new mail). Rate limits still apply."""
+        self._source(source)["next_due"] = 0.0
+
+    def seconds_until_next(self, sources) -> float:
+        """Seconds until the earliest of `sources` is due (0 if one already is)."""
+        now = self.clock()
+        due = [max(self._source(s)["next_due"], self._source(s)["blocked_until"]) for s in sources]
+        return max(0.0, min(due) - now) if due else float(self.config.max_interval)
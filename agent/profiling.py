@@ -0,0 +1,161 @@
+"""
+Opt-in profiling of a whole agent run: `python agent/main.py --profile [DIR]` or
+AGENT_PROFILE=DIR. Nothing here is started unless one of them is set.
+
+Writes to DIR:
+- profile.pstats: cProfile data of the main thread (`python -m pstats`, snakeviz).
+- profile.folded: collapsed stacks of all threads, sampled every few milliseconds,
+  for flamegraph.pl / speedscope. Unlike cProfile this includes worker threads and
+  time spent waiting on the network.
+- allocations.txt: the top allocation sites (tracemalloc) still alive at the end, plus peak memory.
+- summary.txt: wall time per source and run, and the functions with the most cumulative time.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from typing import List, Optional
+
+from agent.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "AGENT_PROFILE"
+DEFAULT_PROFILE_DIR = "profile"
+
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 20
+
+# Wall-time histograms summarized at exit, by metric name.
+SUMMARIZED = ("agent_run_duration_seconds", "agent_source_duration_seconds",
+              "agent_gmail_request_duration_seconds", "agent_notifier_duration_seconds")
+
+
+def _collapse(thread_name: str, frame) -> str:
+    """One sampled stack as 'thread;module.py:func;...' (root first)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    names.append(thread_name.replace(";", "_"))
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of all other threads every `interval` seconds."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[_collapse(names.get(ident, str(ident)), frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class Profiler:
+    """Context manager running cProfile, tracemalloc and a StackSampler, writing reports on exit."""
+
+    def __init__(self, output_dir: str, top_allocations: int = TOP_ALLOCATIONS,
+                 sample_interval: float = SAMPLE_INTERVAL):
+        self.output_dir = output_dir
+        self.top_allocations = top_allocations
+        self.sampler = StackSampler(sample_interval)
+        self.profile = cProfile.Profile()
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Profiler":
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info("Profiling enabled; reports go to %s/.", self.output_dir)
+        tracemalloc.start()
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.elapsed = time.perf_counter() - self.started
+        self.sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        try:
+            self.profile.dump_stats(self._path("profile.pstats"))
+            self._write("profile.folded", [f"{stack} {count}" for stack, count in self.sampler.stacks.most_common()])
+            self._write("allocations.txt", self.allocation_report(snapshot, peak))
+            summary = self.summary()
+            self._write("summary.txt", summary + ["", self.top_functions()])
+            for line in summary:
+                logger.info(line)
+        except Exception as e:
+            # A failed report must not turn a good run into a failed one.
+            logger.error("Writing profile reports failed: %s", e)
+        return False
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _write(self, name: str, lines: List[str]):
+        with open(self._path(name), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def allocation_report(self, snapshot: tracemalloc.Snapshot, peak: int) -> List[str]:
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        stats = snapshot.statistics("lineno")
+        lines = [f"Peak traced memory: {peak / 1024:.1f} KiB",
+                 f"Live at exit: {sum(s.size for s in stats) / 1024:.1f} KiB in {sum(s.count for s in stats)} blocks", ""]
+        for rank, stat in enumerate(stats[:self.top_allocations], 1):
+            frame = stat.traceback[0]
+            lines.append(f"{rank:>3}. {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        return lines
+
+    def summary(self) -> List[str]:
+        """Wall time of the profiled block and of every timed source, request and notifier."""
+        lines = [f"Profiled wall time: {self.elapsed:.3f}s"]
+        for name in SUMMARIZED:
+            metric = REGISTRY.get(name)
+            for labels, count, total in metric.series() if metric is not None else []:
+                label = ",".join(f"{k}={v}" for k, v in labels.items())
+                what = f"{name}{{{label}}}" if label else name
+                lines.append(f"{what}: {count} x, {total:.3f}s total, {total / count:.3f}s avg")
+        return lines
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> str:
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+def profile_dir(option: Optional[str] = None) -> Optional[str]:
+    """Output directory from --profile, else AGENT_PROFILE; None when profiling is off."""
+    return option or os.getenv(PROFILE_ENV) or None
+
+
+def profiled(output_dir: Optional[str]):
+    """Profiler(output_dir), or a no-op context when `output_dir` is None."""
+    return Profiler(output_dir) if output_dir else nullcontext()
@@ -0,0 +1,181 @@
+"""
+Client-side quota accounting: one token bucket per provider, charged with the unit
+cost of each API method, so bursts (e.g. a messages.get per message of a large
+inbox) are paced to the provider's quota instead of running into 429s.
+
+Gmail publishes per-method quota units (250 units/user/second). Slack rate limits
+by method tier; the tiers are mapped onto one bucket by weighting each method with
+100 / (its tier's calls per minute) units, against a 100 units/minute budget.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from agent.config.schema import QuotaConfig
+from agent.deadline import DEADLINE
+from agent.errors import DeadlineExceeded, RateLimitedError
+from agent.metrics.registry import REGISTRY
+from agent.tracing import span
+
+logger = logging.getLogger(__name__)
+
+QUOTA_UNITS = REGISTRY.counter(
+    "agent_quota_units_total", "Quota units consumed by provider and method.", ["provider", "method"])
+QUOTA_WAIT_SECONDS = REGISTRY.histogram(
+    "agent_quota_wait_seconds", "Time spent waiting for quota before a call.", ["provider"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+
+# https://developers.google.com/gmail/api/reference/quota
+GMAIL_COSTS: Dict[str, float] = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "messages.modify": 5,
+    "messages.batchModify": 50,
+    "threads.list": 10,
+    "threads.get": 10,
+    "history.list": 2,
+    "labels.get": 1,
+    "labels.list": 1,
+    "labels.create": 5,
+    "users.getProfile": 1,
+}
+
+# Tier 2 (20+/min) = 5, Tier 3 (50+/min) = 2, Tier 4 (100+/min) = 1.
+SLACK_COSTS: Dict[str, float] = {
+    "client.counts": 2,
+    "conversations.history": 2,
+    "conversations.info": 2,
+    "users.info": 1,
+    "auth.test": 1,
+}
+
+COSTS: Dict[str, Dict[str, float]] = {"gmail": GMAIL_COSTS, "slack": SLACK_COSTS}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` units/second up to `capacity`. Callers reserve
+    units up front (the balance may go negative) and then wait out the deficit, so
+    concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, units: float, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Take `units` and return how long the caller must wait before using them.
+        Returns None (taking nothing) if that wait would exceed `max_wait`.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            wait = max(0.0, (units - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= units
+            return wait
+
+    def refund(self, units: float):
+        """Give back units reserved for a call that was not made."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + units)
+
+
+class QuotaLimiter:
+    """Token bucket per provider plus per-run accounting of the units spent."""
+
+    def __init__(self, config: Optional[QuotaConfig] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self._usage: Dict[str, Dict[str, float]] = {}
+        self._usage_lock = threading.Lock()
+        self.configure(config or QuotaConfig())
+
+    def configure(self, config: QuotaConfig):
+        self.config = config
+        self.buckets = {
+            "gmail": TokenBucket(config.gmail.rate, config.gmail.burst, self.clock),
+            "slack": TokenBucket(config.slack.rate, config.slack.burst, self.clock),
+        }
+
+    def cost(self, provider: str, method: str) -> float:
+        return COSTS.get(provider, {}).get(method, 1)
+
+    def _reserve(self, provider: str, method: str) -> float:
+        """
+        Take `method`'s units from the provider's bucket and return the wait before using
+        them. Nothing is taken if the call would exceed max_wait or the run deadline.
+        """
+        DEADLINE.check()
+        bucket = self.buckets.get(provider)
+        if not self.config.enabled or bucket is None:
+            return 0.0
+        units = self.cost(provider, method)
+        wait = bucket.reserve(units, self.config.max_wait)
+        if wait is None:
+            # Waiting this long would stall the run; let the poll controller reschedule instead.
+            retry_after = (units - bucket.tokens) / bucket.rate
+            raise RateLimitedError(f"{provider} quota exhausted ({method}); retry in {retry_after:.1f}s", retry_after)
+        if wait > 0:
+            try:
+                DEADLINE.check(wait)
+            except DeadlineExceeded:
+                bucket.refund(units)
+                raise
+            logger.debug("Waiting %.3fs for %s quota (%s).", wait, provider, method)
+        QUOTA_WAIT_SECONDS.observe(wait, provider=provider)
+        return wait
+
+    def _refund(self, provider: str, method: str):
+        bucket = self.buckets.get(provider)
+        if self.config.enabled and bucket is not None:
+            bucket.refund(self.cost(provider, method))
+
+    def _charge(self, provider: str, method: str):
+        """Account `method`'s units once the call is about to be made."""
+        units = self.cost(provider, method)
+        with self._usage_lock:
+            methods = self._usage.setdefault(provider, {})
+            methods[method] = methods.get(method, 0) + units
+        QUOTA_UNITS.inc(units, provider=provider, method=method)
+
+    def acquire(self, provider: str, method: str):
+        """Block until `method`'s units are available. Raises RateLimitedError past max_wait, DeadlineExceeded past run.deadline."""
+        wait = self._reserve(provider, method)
+        if wait > 0:
+            with span("quota.wait", provider=provider, method=method):
+                self.sleep(wait)
+        self._charge(provider, method)
+
+    async def acquire_async(self, provider: str, method: str):
+        """Async counterpart of acquire(). A wait cancelled at the deadline gives its units back."""
+        wait = self._reserve(provider, method)
+        if wait > 0:
+            try:
+                with span("quota.wait", provider=provider, method=method):
+                    await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(provider, method)
+                raise
+        self._charge(provider, method)
+
+    def take_usage(self) -> Dict[str, Dict[str, float]]:
+        """Units charged per provider and method since the last call."""
+        with self._usage_lock:
+            usage, self._usage = self._usage, {}
+        return usage
+
+
+LIMITER = QuotaLimiter()
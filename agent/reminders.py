@@ -0,0 +1,116 @@
+"""
+Reminders shortly before Meet events start.
+
+Every Meet scan schedules a reminder `meet.remind_before` minutes before the start
+(invite DTSTART) of each event it found; later scans move it when the event is
+rescheduled and drop it when the event is cancelled. Reminders sit in a min-heap by
+fire time, persisted in state.json, so the page goes out at the first run after the
+fire time, whatever the poll interval, and without the invitation being scanned
+again. The daemon sleeps until the next reminder is due; one-shot runs fire it on
+the first scheduled run after it (so within the cron interval, and within working
+hours, since runs outside them exit early). A reminder for an event that has already
+ended is dropped.
+"""
+import heapq
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from agent.mail.filters import MeetNotification
+from agent.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REMINDERS = REGISTRY.counter(
+    "agent_meet_reminders_total", "Meet event reminders by outcome.", ["result"])
+
+
+def format_reminder(reminder: Dict[str, Any], now: float) -> str:
+    minutes = round((reminder["start"] - now) / 60)
+    if minutes > 0:
+        return f"Google Meet event in {minutes} min: {reminder['title']}"
+    return f"Google Meet event started: {reminder['title']}"
+
+
+class ReminderQueue:
+    """
+    Pending reminders, updated in place in the dict persisted under the "reminders" state
+    section: {"heap": [[fire_at, uid], ...], "events": {uid: {"title", "start", "end",
+    "fire_at", "fired"}}}. Moving or cancelling an event leaves its old heap entry behind;
+    entries that no longer match events[uid]["fire_at"] are skipped when popped.
+    """
+
+    def __init__(self, lead: float, state: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.lead = lead
+        self.state = state if state is not None else {}
+        self.heap: List[List] = self.state.setdefault("heap", [])
+        self.events: Dict[str, Dict[str, Any]] = self.state.setdefault("events", {})
+        self.clock = clock
+
+    def schedule(self, notifications: List[MeetNotification]):
+        """Add, move or cancel the reminders of the events among `notifications`."""
+        for notification in notifications:
+            event = notification.event
+            if event is None or event.start is None:
+                continue
+            if event.cancelled:
+                if self.events.pop(event.uid, None) is not None:
+                    logger.info("Cancelled the reminder for %s.", notification.title)
+                continue
+            start = event.start.timestamp()
+            current = self.events.get(event.uid)
+            if current is not None and current["start"] == start:
+                continue
+            fire_at = start - self.lead
+            self.events[event.uid] = {
+                "title": notification.title, "start": start, "fire_at": fire_at, "fired": False,
+                "end": event.end.timestamp() if event.end is not None else start + self.lead,
+            }
+            heapq.heappush(self.heap, [fire_at, event.uid])
+            logger.info("Reminder for %s scheduled at %s.", notification.title, time.ctime(fire_at))
+
+    def _live(self, entry: List) -> Optional[Dict[str, Any]]:
+        reminder = self.events.get(entry[1])
+        if reminder is None or reminder["fired"] or reminder["fire_at"] != entry[0]:
+            return None
+        return reminder
+
+    def pop_due(self) -> List[Dict[str, Any]]:
+        """Remove and return the reminders due now (with their "uid"), soonest first."""
+        now = self.clock()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            reminder = self._live(entry)
+            if reminder is None:
+                continue
+            reminder["fired"] = True
+            if now >= reminder["end"]:
+                REMINDERS.inc(result="missed")
+                logger.info("Missed the reminder for %s: the event is over.", reminder["title"])
+                continue
+            due.append({**reminder, "uid": entry[1]})
+        # Fired reminders are kept until the event is over, so rescans don't schedule them again.
+        for uid in [uid for uid, r in self.events.items() if r["fired"] and now >= r["end"]]:
+            del self.events[uid]
+        return due
+
+    def sent(self, reminders: List[Dict[str, Any]]):
+        REMINDERS.inc(len(reminders), result="sent")
+
+    def requeue(self, reminders: List[Dict[str, Any]]):
+        """Put back reminders from pop_due() whose page could not be delivered."""
+        for reminder in reminders:
+            current = self.events.get(reminder["uid"])
+            if current is not None and current["fire_at"] == reminder["fire_at"]:
+                current["fired"] = False
+                heapq.heappush(self.heap, [reminder["fire_at"], reminder["uid"]])
+
+    def seconds_until_next(self) -> float:
+        """Seconds until the next reminder is due (0 if one is, inf if none is pending)."""
+        while self.heap and self._live(self.heap[0]) is None:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return float("inf")
+        return max(0.0, self.heap[0][0] - self.clock())
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+class TTLCache:
+    """
+    Thread-safe key/value cache whose entries expire `ttl` seconds after they were set.
+    Expiry uses wall-clock time so the contents can be persisted (to_dict/load) and
+    reused by the next run.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 5000, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_dict(self) -> Dict[str, list]:
+        """Unexpired entries as {key: [value, expires_at]} (JSON-serializable values assumed)."""
+        now = self.clock()
+        with self._lock:
+            return {k: [v, exp] for k, (v, exp) in self._entries.items() if exp > now}
+
+    def load(self, data: Optional[Dict[str, list]]):
+        """Merge entries saved with to_dict(), skipping expired ones."""
+        now = self.clock()
+        with self._lock:
+            for key, (value, expires_at) in (data or {}).items():
+                if expires_at > now:
+                    self._entries[key] = (value, expires_at)
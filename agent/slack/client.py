@@ -1,27 +1,201 @@
+import asyncio
+import json
 import logging
 import requests
 import time
-from typing import Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+
+from agent.deadline import DEADLINE
+from agent.errors import RateLimitedError, parse_retry_after
+from agent.metrics.registry import REGISTRY, timed
+from agent.ratelimit import LIMITER
+from agent.tracing import span
+from agent.slack.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+SLACK_REQUEST_SECONDS = REGISTRY.histogram(
+    "agent_slack_request_duration_seconds", "Latency of Slack API calls.", ["method"])
+SLACK_REQUESTS = REGISTRY.counter(
+    "agent_slack_requests_total", "Slack API calls by outcome.", ["method", "outcome"])
+SLACK_UNREAD = REGISTRY.gauge(
+    "agent_slack_unread_count", "Unread mentions/DMs reported by the last client.counts call.")
+SLACK_NAME_LOOKUPS = REGISTRY.counter(
+    "agent_slack_name_lookups_total", "Channel/user name lookups by cache result.", ["result"])
+
+# Channel and user names rarely change; one day keeps repeat lookups off the API.
+NAME_CACHE_TTL = 24 * 3600
+
+# Broadcasts that notify everyone in a channel count as mentions too.
+_BROADCASTS = ("<!here", "<!channel", "<!everyone")
+
+@dataclass
+class SlackMention:
+    """A new message that mentions the user (or any new DM message)."""
+    channel_id: str
+    channel: str # '#name', or 'DM' for direct/group messages
+    sender: str
+    text: str # First line only
+    ts: str
+
+    def __str__(self) -> str:
+        return f"{self.channel} - {self.sender}: {self.text}"
+
+def _session_headers(cookie: str) -> Dict[str, str]:
+    return {
+        "Cookie": f"d={cookie}",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+
+def _counts_params(token: str) -> Dict[str, Any]:
+    return {
+        "token": token,
+        "include_archived_channels_on_client_counts": 1
+    }
+
+def _check_workspace_url(workspace_url: str):
+    if "app.slack.com" in workspace_url:
+        logger.warning("Your workspace_url '%s' looks like the web interface.", workspace_url)
+        logger.warning("You should likely use your workspace domain, e.g., 'https://your-company.slack.com'.")
+
+def _check_rate_limit(status_code: int, headers):
+    """Slack answers rate-limited calls with HTTP 429 and a Retry-After header."""
+    if status_code == 429:
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        raise RateLimitedError(f"Slack rate limited the request (Retry-After: {retry_after})", retry_after)
+
+def _decode_json(status_code: int, text: str) -> Dict[str, Any]:
+    """Parse a client.counts response body, explaining the usual HTML-instead-of-JSON misconfiguration."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        logger.error("Failed to decode JSON. Status: %s", status_code)
+        snippet = text[:500]
+        logger.error("Response text: %s", snippet)
+
+        if "<!DOCTYPE html>" in snippet or "<html" in snippet:
+            raise Exception(
+                f"Slack returned HTML instead of JSON. "
+                f"Please check your 'workspace_url'. It should be 'https://your-team.slack.com', "
+                f"not 'https://app.slack.com/client/...'"
+            )
+
+        raise Exception(f"Invalid response from Slack (Status {status_code})")
+
+def _check_ok(data: Dict[str, Any]):
+    if not data.get("ok"):
+        error = data.get("error")
+        logger.error("Slack API error: %s", error)
+        if error == 'invalid_auth':
+            raise PermissionError("Slack session token/cookie is invalid or expired.")
+        raise Exception(f"Slack API returned error: {error}")
+
+def _unread_from_counts(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a decoded client.counts payload into {'unread_count', 'raw_data'}."""
+    _check_ok(data)
+
+    # 'unread_count_display' might be missing in newer API versions.
+    # Use 'channel_badges' or sum up unreads manually.
+    unread_count = data.get("unread_count_display")
+
+    if unread_count is None:
+        # Fallback: Sum up badges which represent "Red Dot" notifications (Mentions)
+        badges = data.get("channel_badges")
+
+        if badges is None:
+            # If both unread_count_display AND channel_badges are missing, the API has changed.
+            # We must raise an error to alert the user via the global exception handler.
+            raise Exception("Slack API response missing 'unread_count_display' and 'channel_badges'. API structure may have changed.")
+
+        # We interpret the user's request for "only channel mentions" as:
+        # 1. Channel Mentions (badges['channels']) - This is the red badge count.
+        # 2. DMs (badges['dms']) - Direct messages from people.
+        # 3. Thread Mentions (badges['thread_mentions']) - Replies effectively mentioning you.
+        # We EXCLUDE 'app_dms' (Bots) and 'thread_unreads' (unless mentioned).
+
+        unread_count = (
+            badges.get("channels", 0) +
+            badges.get("dms", 0) +
+            badges.get("thread_mentions", 0)
+        )
+
+    SLACK_UNREAD.set(unread_count)
+    return {
+        "unread_count": unread_count,
+        "raw_data": data
+    }
+
+def _changed_conversations(counts: Dict[str, Any], seen: Dict[str, str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Pick the conversations from a client.counts payload whose badge has new activity.
+
+    `seen` maps conversation ID -> the `latest` ts already processed. Returns the
+    conversations to fetch (with the `oldest` ts to fetch from) and the updated map,
+    which only keeps conversations that are still unread.
+    """
+    changed = []
+    new_seen = {}
+    for kind in ("channels", "mpims", "ims"):
+        for conv in counts.get(kind) or []:
+            is_dm = kind != "channels"
+            # Channels only alert on mentions; any unread DM is a mention.
+            unread = conv.get("mention_count", 0) > 0 or (is_dm and conv.get("has_unreads"))
+            latest = conv.get("latest")
+            if not unread or not latest:
+                continue
+            conv_id = conv["id"]
+            new_seen[conv_id] = latest
+            if seen.get(conv_id) == latest:
+                continue
+            # Only messages after both the read marker and what earlier runs already reported.
+            oldest = max(conv.get("last_read") or "0", seen.get(conv_id) or "0", key=float)
+            changed.append({"id": conv_id, "is_dm": is_dm, "oldest": oldest})
+    return changed, new_seen
+
+def _new_mentions(messages: List[Dict[str, Any]], oldest: str, self_id: Optional[str], is_dm: bool) -> List[Dict[str, Any]]:
+    """Filter conversations.history results to other people's messages mentioning `self_id`, oldest first."""
+    result = []
+    for message in reversed(messages):
+        if float(message.get("ts", 0)) <= float(oldest) or message.get("subtype") == "channel_join":
+            continue
+        if self_id and message.get("user") == self_id:
+            continue
+        text = message.get("text", "")
+        if is_dm or (self_id and f"<@{self_id}>" in text) or any(b in text for b in _BROADCASTS):
+            result.append(message)
+    return result
+
+def _restore_seen(new_seen: Dict[str, str], seen: Dict[str, str], conv_id: str):
+    if conv_id in seen:
+        new_seen[conv_id] = seen[conv_id]
+    else:
+        new_seen.pop(conv_id, None)
+
+def _first_line(text: str, limit: int = 120) -> str:
+    line = text.strip().split("\n", 1)[0]
+    return line if len(line) <= limit else line[:limit - 1] + "\u2026"
+
+def _display_name(user: Dict[str, Any]) -> str:
+    profile = user.get("profile") or {}
+    return profile.get("display_name") or profile.get("real_name") or user.get("real_name") or user.get("name") or user.get("id", "?")
+
 class SlackSessionClient:
     """
     Client to interact with Slack's internal API using session token and cookie.
     """
-    def __init__(self, token: str, cookie: str, workspace_url: str):
+    def __init__(self, token: str, cookie: str, workspace_url: str,
+                 name_cache: Optional[TTLCache] = None, max_concurrency: int = 4, history_limit: int = 20):
         self.token = token
         self.cookie = cookie
         self.workspace_url = workspace_url.rstrip('/')
-        
-        if "app.slack.com" in self.workspace_url:
-            logger.warning(f"Your workspace_url '{self.workspace_url}' looks like the web interface.")
-            logger.warning("You should likely use your workspace domain, e.g., 'https://your-company.slack.com'.")
-            
-        self.headers = {
-            "Cookie": f"d={self.cookie}",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        _check_workspace_url(self.workspace_url)
+        self.headers = _session_headers(self.cookie)
+        # Mention lookups: channel/user names are cached, history fetches run in parallel.
+        self.name_cache = name_cache if name_cache is not None else TTLCache(NAME_CACHE_TTL)
+        self.max_concurrency = max_concurrency
+        self.history_limit = history_limit
 
     def get_unread_count(self) -> Dict[str, Any]:
         """
@@ -30,75 +204,102 @@ class SlackSessionClient:
         Raises exception if auth fails.
         """
         url = f"{self.workspace_url}/api/client.counts"
-        
-        params = {
-            "token": self.token,
-            "include_archived_channels_on_client_counts": 1
-        }
 
         try:
+            LIMITER.acquire("slack", "client.counts")
             # Note: client.counts usually expects form-data for 'token', not query params.
-            response = requests.post(url, data=params, headers=self.headers, timeout=10)
-            
-            try:
-                data = response.json()
-            except requests.exceptions.JSONDecodeError:
-                logger.error(f"Failed to decode JSON. Status: {response.status_code}")
-                snippet = response.text[:500]
-                logger.error(f"Response text: {snippet}") 
-                
-                if "<!DOCTYPE html>" in snippet or "<html" in snippet:
-                    raise Exception(
-                        f"Slack returned HTML instead of JSON. "
-                        f"Please check your 'workspace_url'. It should be 'https://your-team.slack.com', "
-                        f"not 'https://app.slack.com/client/...'"
-                    )
-                    
-                raise Exception(f"Invalid response from Slack (Status {response.status_code})")
+            timeout = DEADLINE.timeout(10)
+            with span("slack.client.counts"), timed(SLACK_REQUEST_SECONDS, SLACK_REQUESTS, method="client.counts"):
+                response = requests.post(url, data=_counts_params(self.token), headers=self.headers, timeout=timeout)
+
+            _check_rate_limit(response.status_code, response.headers)
+            data = _decode_json(response.status_code, response.text)
 
             if not response.ok: # Check for HTTP errors after attempting to parse JSON (or use raise_for_status before)
                  response.raise_for_status()
 
-            if not data.get("ok"):
-                error = data.get("error")
-                logger.error(f"Slack API error: {error}")
-                if error == 'invalid_auth':
-                    raise PermissionError("Slack session token/cookie is invalid or expired.")
-                raise Exception(f"Slack API returned error: {error}")
-
-            # 'unread_count_display' might be missing in newer API versions.
-            # Use 'channel_badges' or sum up unreads manually.
-            unread_count = data.get("unread_count_display")
-            
-            if unread_count is None:
-                # Fallback: Sum up badges which represent "Red Dot" notifications (Mentions)
-                badges = data.get("channel_badges")
-                
-                if badges is None:
-                    # If both unread_count_display AND channel_badges are missing, the API has changed.
-                    # We must raise an error to alert the user via the global exception handler.
-                    raise Exception("Slack API response missing 'unread_count_display' and 'channel_badges'. API structure may have changed.")
-                
-                # We interpret the user's request for "only channel mentions" as:
-                # 1. Channel Mentions (badges['channels']) - This is the red badge count.
-                # 2. DMs (badges['dms']) - Direct messages from people.
-                # 3. Thread Mentions (badges['thread_mentions']) - Replies effectively mentioning you.
-                # We EXCLUDE 'app_dms' (Bots) and 'thread_unreads' (unless mentioned).
-                
-                unread_count = (
-                    badges.get("channels", 0) + 
-                    badges.get("dms", 0) + 
-                    badges.get("thread_mentions", 0)
-                )
-
-            return {
-                "unread_count": unread_count,
-                "raw_data": data
-            }
+            return _unread_from_counts(data)
 
         except requests.RequestException as e:
-            logger.error(f"Failed to connect to Slack: {e}")
+            logger.error("Failed to connect to Slack: %s", e)
+            raise
+
+    def _call(self, method: str, **params) -> Dict[str, Any]:
+        """POST a Web API method with the session token and return the decoded, ok-checked payload."""
+        url = f"{self.workspace_url}/api/{method}"
+        LIMITER.acquire("slack", method)
+        timeout = DEADLINE.timeout(10)
+        with span(f"slack.{method}"), timed(SLACK_REQUEST_SECONDS, SLACK_REQUESTS, method=method):
+            response = requests.post(url, data={"token": self.token, **params}, headers=self.headers, timeout=timeout)
+        _check_rate_limit(response.status_code, response.headers)
+        data = _decode_json(response.status_code, response.text)
+        response.raise_for_status()
+        _check_ok(data)
+        return data
+
+    def _cached(self, key: str, fetch) -> Optional[str]:
+        value = self.name_cache.get(key)
+        SLACK_NAME_LOOKUPS.inc(result="hit" if value is not None else "miss")
+        if value is None:
+            value = fetch()
+            self.name_cache.set(key, value)
+        return value
+
+    def _self_id(self) -> str:
+        return self._cached("self", lambda: self._call("auth.test")["user_id"])
+
+    def _channel_name(self, conv: Dict[str, Any]) -> str:
+        if conv["is_dm"]:
+            return "DM"
+        return self._cached(f"channel:{conv['id']}",
+                            lambda: "#" + self._call("conversations.info", channel=conv["id"])["channel"]["name"])
+
+    def _user_name(self, message: Dict[str, Any]) -> str:
+        user_id = message.get("user")
+        if not user_id:
+            return message.get("username") or "bot"
+        return self._cached(f"user:{user_id}", lambda: _display_name(self._call("users.info", user=user_id)["user"]))
+
+    def _conversation_mentions(self, conv: Dict[str, Any]) -> Optional[List[SlackMention]]:
+        """New mentions in one conversation, or None if it could not be fetched."""
+        try:
+            history = self._call("conversations.history", channel=conv["id"], oldest=conv["oldest"], limit=self.history_limit)
+            messages = _new_mentions(history.get("messages", []), conv["oldest"], self._self_id(), conv["is_dm"])
+            if not messages:
+                return []
+            channel = self._channel_name(conv)
+            return [SlackMention(conv["id"], channel, self._user_name(m), _first_line(m.get("text", "")), m["ts"])
+                    for m in messages]
+        except PermissionError:
             raise
+        except Exception as e:
+            logger.error("Failed to fetch Slack history for %s: %s", conv['id'], e)
+            return None
+
+    def get_mentions(self, counts: Dict[str, Any], seen: Dict[str, str]) -> Tuple[List[SlackMention], Dict[str, str]]:
+        """
+        Fetch the text of new mentions, given a client.counts payload (`raw_data`) and the
+        `seen` map returned by the previous call. Only conversations whose `latest` moved
+        since then are fetched, at most `max_concurrency` at a time.
+        Returns the mentions (oldest first per conversation) and the map to pass next time.
+        """
+        changed, new_seen = _changed_conversations(counts, seen)
+        if not changed:
+            return [], new_seen
+
+        # auth.test once up front instead of racing it from every worker.
+        self._self_id()
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(changed))) as pool:
+            results = list(pool.map(self._conversation_mentions, changed))
+
+        mentions = []
+        for conv, result in zip(changed, results):
+            if result is None:
+                # Retry on the next run.
+                _restore_seen(new_seen, seen, conv["id"])
+            else:
+                mentions.extend(result)
+        return mentions, new_seen
 
     def validate_session(self) -> bool:
         """
@@ -115,6 +316,109 @@ class SlackSessionClient:
             return False
 
 
+class AsyncSlackSessionClient:
+    """Asyncio counterpart of SlackSessionClient on a shared httpx.AsyncClient."""
+    def __init__(self, token: str, cookie: str, workspace_url: str, http,
+                 name_cache: Optional[TTLCache] = None, max_concurrency: int = 4, history_limit: int = 20):
+        self.token = token
+        self.cookie = cookie
+        self.workspace_url = workspace_url.rstrip('/')
+        _check_workspace_url(self.workspace_url)
+        self.headers = _session_headers(self.cookie)
+        self.http = http
+        self.name_cache = name_cache if name_cache is not None else TTLCache(NAME_CACHE_TTL)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.history_limit = history_limit
+
+    async def get_unread_count(self) -> Dict[str, Any]:
+        """Same contract as SlackSessionClient.get_unread_count."""
+        url = f"{self.workspace_url}/api/client.counts"
+
+        await LIMITER.acquire_async("slack", "client.counts")
+        timeout = DEADLINE.timeout(10)
+        with span("slack.client.counts"), timed(SLACK_REQUEST_SECONDS, SLACK_REQUESTS, method="client.counts"):
+            response = await self.http.post(url, data=_counts_params(self.token), headers=self.headers, timeout=timeout)
+
+        _check_rate_limit(response.status_code, response.headers)
+        data = _decode_json(response.status_code, response.text)
+        response.raise_for_status()
+        return _unread_from_counts(data)
+
+    async def _call(self, method: str, **params) -> Dict[str, Any]:
+        url = f"{self.workspace_url}/api/{method}"
+        await LIMITER.acquire_async("slack", method)
+        timeout = DEADLINE.timeout(10)
+        with span(f"slack.{method}"), timed(SLACK_REQUEST_SECONDS, SLACK_REQUESTS, method=method):
+            response = await self.http.post(url, data={"token": self.token, **params}, headers=self.headers, timeout=timeout)
+        _check_rate_limit(response.status_code, response.headers)
+        data = _decode_json(response.status_code, response.text)
+        response.raise_for_status()
+        _check_ok(data)
+        return data
+
+    async def _cached(self, key: str, fetch) -> str:
+        value = self.name_cache.get(key)
+        SLACK_NAME_LOOKUPS.inc(result="hit" if value is not None else "miss")
+        if value is None:
+            value = await fetch()
+            self.name_cache.set(key, value)
+        return value
+
+    async def _self_id(self) -> str:
+        async def fetch():
+            return (await self._call("auth.test"))["user_id"]
+        return await self._cached("self", fetch)
+
+    async def _channel_name(self, conv: Dict[str, Any]) -> str:
+        if conv["is_dm"]:
+            return "DM"
+        async def fetch():
+            return "#" + (await self._call("conversations.info", channel=conv["id"]))["channel"]["name"]
+        return await self._cached(f"channel:{conv['id']}", fetch)
+
+    async def _user_name(self, message: Dict[str, Any]) -> str:
+        user_id = message.get("user")
+        if not user_id:
+            return message.get("username") or "bot"
+        async def fetch():
+            return _display_name((await self._call("users.info", user=user_id))["user"])
+        return await self._cached(f"user:{user_id}", fetch)
+
+    async def _conversation_mentions(self, conv: Dict[str, Any]) -> Optional[List[SlackMention]]:
+        async with self.semaphore:
+            try:
+                history = await self._call("conversations.history", channel=conv["id"], oldest=conv["oldest"], limit=self.history_limit)
+                messages = _new_mentions(history.get("messages", []), conv["oldest"], await self._self_id(), conv["is_dm"])
+                if not messages:
+                    return []
+                channel = await self._channel_name(conv)
+                return [SlackMention(conv["id"], channel, await self._user_name(m), _first_line(m.get("text", "")), m["ts"])
+                        for m in messages]
+            except PermissionError:
+                raise
+            except Exception as e:
+                logger.error("Failed to fetch Slack history for %s: %s", conv['id'], e)
+                return None
+
+    async def get_mentions(self, counts: Dict[str, Any], seen: Dict[str, str]) -> Tuple[List[SlackMention], Dict[str, str]]:
+        """Same contract as SlackSessionClient.get_mentions."""
+        changed, new_seen = _changed_conversations(counts, seen)
+        if not changed:
+            return [], new_seen
+
+        # auth.test once up front instead of racing it from every conversation.
+        await self._self_id()
+        results = await asyncio.gather(*(self._conversation_mentions(conv) for conv in changed))
+
+        mentions = []
+        for conv, result in zip(changed, results):
+            if result is None:
+                _restore_seen(new_seen, seen, conv["id"])
+            else:
+                mentions.extend(result)
+        return mentions, new_seen
+
+
 if __name__ == "__main__":
     import os
     from dotenv import load_dotenv
@@ -0,0 +1,77 @@
+import time
+from typing import Any, Dict, List
+
+from agent.metrics.registry import REGISTRY, MetricsRegistry
+
+# StateStore section with the last run.history_size run records, oldest first.
+HISTORY_SECTION = "history"
+
+# (latency histogram, counter of the same calls with an `outcome` label, stage prefix).
+# A stage is the prefix plus the histogram's label value: source.meet, gmail.messages.get, notify.pushover.
+STAGES = (
+    ("agent_source_duration_seconds", None, "source"),
+    ("agent_gmail_request_duration_seconds", "agent_gmail_requests_total", "gmail"),
+    ("agent_slack_request_duration_seconds", "agent_slack_requests_total", "slack"),
+    ("agent_imap_request_duration_seconds", "agent_imap_requests_total", "imap"),
+    ("agent_notifier_duration_seconds", "agent_notifier_attempts_total", "notify"),
+)
+# Failed source checks: rate limited, cancelled at the deadline, errors.
+SOURCE_ERRORS = ("agent_rate_limited_total", "agent_sources_cancelled_total", "agent_source_failures_total")
+
+
+class RunRecorder:
+    """
+    Turns what the metrics registry recorded during one run into a run-history record:
+    {"at", "alerts", "delivered", "stages": {stage: [seconds, calls, errors]}}. Created
+    at the start of the run; finish() takes the difference to the registry at that point,
+    so daemon runs sharing the process-wide registry only see their own calls.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.registry = registry
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._before = self._totals()
+
+    def _totals(self) -> Dict[str, List[float]]:
+        """[seconds, calls, errors] per stage since the process started."""
+        totals: Dict[str, List[float]] = {}
+
+        def entry(stage: str) -> List[float]:
+            return totals.setdefault(stage, [0.0, 0, 0])
+
+        for histogram, counter, prefix in STAGES:
+            metric = self.registry.get(histogram)
+            for labels, count, total in metric.series() if metric is not None else []:
+                stage = entry(".".join([prefix, *labels.values()]))
+                stage[0] += total
+                stage[1] += count
+            metric = self.registry.get(counter) if counter else None
+            for labels, value in metric.series() if metric is not None else []:
+                if labels.pop("outcome") != "ok":
+                    entry(".".join([prefix, *labels.values()]))[2] += value
+        for name in SOURCE_ERRORS:
+            metric = self.registry.get(name)
+            for labels, value in metric.series() if metric is not None else []:
+                entry(f"source.{labels['source']}")[2] += value
+        return totals
+
+    def finish(self, delivered: bool, alerts: int) -> Dict[str, Any]:
+        """The record of the run so far: every stage that was called (or failed) since __init__."""
+        stages = {"run": [round(time.perf_counter() - self._start, 4), 1, 0 if delivered else 1]}
+        for stage, (seconds, calls, errors) in self._totals().items():
+            before = self._before.get(stage, (0.0, 0, 0))
+            calls, errors = int(calls - before[1]), int(errors - before[2])
+            if calls or errors:
+                # A source cancelled before it started still counts as a failed check.
+                stages[stage] = [round(seconds - before[0], 4), max(calls, errors), errors]
+        return {"at": round(self.started_at, 3), "alerts": alerts, "delivered": delivered, "stages": stages}
+
+
+def append_run(state, record: Dict[str, Any], size: int):
+    """Add `record` to the run history in `state` (StateStore), dropping the oldest beyond `size`."""
+    if size <= 0:
+        return
+    runs = state.get(HISTORY_SECTION, [])
+    runs.append(record)
+    state.set(HISTORY_SECTION, runs[-size:])
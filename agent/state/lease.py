@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from agent.metrics.registry import REGISTRY
+from agent.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+LEASE_HELD = REGISTRY.gauge(
+    "agent_lease_held", "1 while this replica holds the leader lease, else 0.")
+LEASE_CHANGES = REGISTRY.counter(
+    "agent_lease_changes_total", "Leader lease transitions of this replica.", ["change"])
+
+
+def default_holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@contextmanager
+def _locked(path: str):
+    """The lease file, opened for reading and rewriting under an exclusive lock."""
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read(f) -> Dict[str, Any]:
+    f.seek(0)
+    try:
+        return json.loads(f.read() or "{}")
+    except ValueError:
+        logger.warning("Unreadable lease file %s; treating it as expired.", f.name)
+        return {}
+
+
+def _write(f, record: Dict[str, Any]):
+    f.seek(0)
+    f.truncate()
+    f.write(json.dumps(record))
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class Lease:
+    """
+    Leader lease shared by agent replicas through a locked file: {"holder", "token",
+    "expires_at"}. One replica at a time holds it, for `ttl` seconds per acquire().
+    Every change of holder increments the fencing token, so a replica that lost the
+    lease can tell (and StateStore refuses its writes over a newer leader's).
+    """
+
+    def __init__(self, path: str, holder: Optional[str] = None, ttl: float = 600,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.holder = holder or default_holder()
+        self.ttl = ttl
+        self.clock = clock
+        # Fencing token of the lease while held, else None.
+        self.token: Optional[int] = None
+
+    @traced("lease.acquire")
+    def acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it. False if another replica holds it."""
+        with _locked(self.path) as f:
+            record = _read(f)
+            now = self.clock()
+            if record.get("holder") != self.holder and record.get("expires_at", 0) > now:
+                self._lost(f"held by {record['holder']}")
+                return False
+            token = record.get("token", 0)
+            if record.get("holder") != self.holder:
+                token += 1
+            _write(f, {"holder": self.holder, "token": token, "expires_at": now + self.ttl})
+        if self.token != token:
+            LEASE_CHANGES.inc(change="acquired")
+            logger.info("Acquired the leader lease (token %d).", token)
+        self.token = token
+        LEASE_HELD.set(1)
+        return True
+
+    def held(self) -> bool:
+        """Whether the lease is still ours and unexpired (the fencing check before acting as leader)."""
+        if self.token is None:
+            return False
+        with _locked(self.path) as f:
+            record = _read(f)
+        if record.get("holder") == self.holder and record.get("token") == self.token \
+                and record.get("expires_at", 0) > self.clock():
+            return True
+        self._lost("expired or taken over")
+        return False
+
+    def release(self):
+        """Let the lease expire now, so a standby can take over without waiting out the ttl."""
+        if self.token is None:
+            return
+        with _locked(self.path) as f:
+            record = _read(f)
+            if record.get("holder") == self.holder and record.get("token") == self.token:
+                # The token stays, so the next holder's is still higher.
+                _write(f, {**record, "expires_at": 0})
+        logger.info("Released the leader lease (token %d).", self.token)
+        self.token = None
+        LEASE_HELD.set(0)
+
+    def _lost(self, reason: str):
+        if self.token is not None:
+            LEASE_CHANGES.inc(change="lost")
+            logger.warning("Lost the leader lease (token %d): %s.", self.token, reason)
+        else:
+            logger.info("Standing by: leader lease %s.", reason)
+        self.token = None
+        LEASE_HELD.set(0)
@@ -1,7 +1,10 @@
 import json
 import os
 import logging
-from typing import List, Set
+import tempfile
+from typing import Any, Dict, List, Optional, Set
+
+from agent.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +14,14 @@ class StateStore:
     def __init__(self, file_path: str = STATE_FILE):
         self.file_path = file_path
         self.processed_ids: Set[str] = set()
+        # Free-form per-feature state (e.g. "slack"), persisted alongside processed_ids.
+        self.sections: Dict[str, Any] = {}
+        # Fencing token of the leader lease this replica holds (agent.state.lease). Saves
+        # are refused once the file was written under a newer one.
+        self.fencing_token: Optional[int] = None
         self.load()
 
+    @traced("state.load")
     def load(self):
         """Load state from JSON file."""
         if not os.path.exists(self.file_path):
@@ -25,21 +34,51 @@ class StateStore:
                 # Keep only last 1000 IDs to prevent infinite growth if needed, 
                 # or just load all. For now simple load.
                 self.processed_ids = set(data.get("processed_ids", []))
-            logger.info(f"Loaded {len(self.processed_ids)} processed IDs from state.")
+                self.sections = data.get("sections", {})
+            logger.info("Loaded %d processed IDs from state.", len(self.processed_ids))
         except Exception as e:
-            logger.error(f"Failed to load state: {e}")
+            logger.error("Failed to load state: %s", e)
+
+    def _stored_token(self) -> Optional[int]:
+        try:
+            with open(self.file_path, 'r') as f:
+                return json.load(f).get("fencing_token")
+        except (OSError, ValueError):
+            return None
 
+    @traced("state.save")
     def save(self):
-        """Save state to JSON file."""
+        """
+        Save state to the JSON file. Written to a temporary file and renamed over the
+        old one, so readers (and other replicas) never see a partial file.
+        """
         try:
+            if self.fencing_token is not None:
+                stored = self._stored_token()
+                if stored is not None and stored > self.fencing_token:
+                    logger.warning("State was written by a newer leader (token %d > %d); not saving.",
+                                   stored, self.fencing_token)
+                    return
             data = {
-                "processed_ids": list(self.processed_ids)
+                "processed_ids": list(self.processed_ids),
+                "sections": self.sections
             }
-            with open(self.file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            if self.fencing_token is not None:
+                data["fencing_token"] = self.fencing_token
+            directory = os.path.dirname(os.path.abspath(self.file_path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".state-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.file_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
             logger.info("State saved.")
         except Exception as e:
-            logger.error(f"Failed to save state: {e}")
+            logger.error("Failed to save state: %s", e)
 
     def is_processed(self, email_id: str) -> bool:
         return email_id in self.processed_ids
@@ -49,3 +88,10 @@ class StateStore:
             return
         self.processed_ids.update(email_ids)
         self.save()
+
+    def get(self, section: str, default: Any = None) -> Any:
+        return self.sections.get(section, default)
+
+    def set(self, section: str, value: Any):
+        """Replace a section. Not written to disk until save()."""
+        self.sections[section] = value
@@ -0,0 +1,92 @@
+"""
+Latency and error summary of the recent runs kept in state.json (run.history_size):
+
+    python -m agent.stats                  # all recorded runs
+    python -m agent.stats --runs 50        # the last 50
+    python -m agent.stats --json           # machine-readable
+
+Per stage (the whole run, each source, each Gmail/Slack/IMAP method including the
+OAuth refresh, each notifier): p50/p95/p99 of its time per run, calls per run and
+the share of calls that failed. Compare two windows to spot drift, e.g. a slower
+OAuth refresh or notifier, without external monitoring.
+"""
+import argparse
+import json
+import math
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agent.state.history import HISTORY_SECTION
+from agent.state.store import STATE_FILE, StateStore
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per stage: runs it appeared in, p50/p95/p99 ms of its time per run, calls per run, error rate."""
+    seconds: Dict[str, List[float]] = {}
+    calls: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    for run in runs:
+        for stage, (elapsed, count, failed) in run["stages"].items():
+            seconds.setdefault(stage, []).append(elapsed)
+            calls[stage] = calls.get(stage, 0) + count
+            errors[stage] = errors.get(stage, 0) + failed
+
+    summary = {}
+    for stage in sorted(seconds, key=lambda s: (s != "run", s)):
+        values = seconds[stage]
+        summary[stage] = {
+            "runs": len(values),
+            **{f"p{p}_ms": round(percentile(values, p) * 1000, 1) for p in PERCENTILES},
+            "calls_per_run": round(calls[stage] / len(values), 2),
+            "error_rate": round(errors[stage] / calls[stage], 4) if calls[stage] else 0.0,
+        }
+    return summary
+
+
+def print_report(runs: List[Dict[str, Any]], summary: Dict[str, Dict[str, Any]]):
+    first, last = (datetime.fromtimestamp(runs[i]["at"]).strftime("%Y-%m-%d %H:%M") for i in (0, -1))
+    undelivered = sum(not r["delivered"] for r in runs)
+    print(f"{len(runs)} runs from {first} to {last}: {sum(r['alerts'] for r in runs)} alerts, "
+          f"{undelivered} not delivered")
+    print(f"{'stage':<32} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'calls/run':>10} {'errors':>7}")
+    for stage, s in summary.items():
+        print(f"{stage:<32} {s['runs']:>5} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} "
+              f"{s['calls_per_run']:>10} {s['error_rate']:>7.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--state", default=STATE_FILE, help="State file written by the agent.")
+    parser.add_argument("--runs", type=int, help="Only the last N runs (default: all recorded).")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args(argv)
+
+    runs = StateStore(args.state).get(HISTORY_SECTION, [])
+    if args.runs:
+        runs = runs[-args.runs:]
+    if not runs:
+        print(f"No runs recorded in {args.state} (see run.history_size).")
+        return 1
+
+    summary = summarize(runs)
+    if args.json:
+        print(json.dumps({"runs": len(runs), "from": runs[0]["at"], "to": runs[-1]["at"], "stages": summary}, indent=2))
+    else:
+        print_report(runs, summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
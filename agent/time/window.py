@@ -18,14 +18,14 @@ class TimeWindow:
         try:
             tz = pytz.timezone(config.timezone)
         except pytz.UnknownTimeZoneError:
-            logger.error(f"Unknown timezone: {config.timezone}. Blocking execution for safety.")
+            logger.error("Unknown timezone: %s. Blocking execution for safety.", config.timezone)
             return False
 
         now = datetime.now(tz)
         
         # Check day of week (0=Monday, 6=Sunday)
         if now.weekday() not in config.days:
-            logger.info(f"Today is {now.strftime('%A')} (day {now.weekday()}), not in allowed days {config.days}. Skipping.")
+            logger.info("Today is %s (day %s), not in allowed days %s. Skipping.", now.strftime('%A'), now.weekday(), config.days)
             return False
 
         # Parse start and end times
@@ -33,7 +33,7 @@ class TimeWindow:
             start_h, start_m = map(int, config.start.split(":"))
             end_h, end_m = map(int, config.end.split(":"))
         except ValueError:
-            logger.error(f"Invalid time format in config (Start: {config.start}, End: {config.end}). Expected HH:MM.")
+            logger.error("Invalid time format in config (Start: %s, End: %s). Expected HH:MM.", config.start, config.end)
             return False
 
         current_minutes = now.hour * 60 + now.minute
@@ -41,8 +41,8 @@ class TimeWindow:
         end_minutes = end_h * 60 + end_m
 
         if start_minutes <= current_minutes <= end_minutes:
-            logger.info(f"Current time {now.strftime('%H:%M')} is within working hours ({config.start}-{config.end}).")
+            logger.info("Current time %s is within working hours (%s-%s).", now.strftime('%H:%M'), config.start, config.end)
             return True
         else:
-            logger.info(f"Current time {now.strftime('%H:%M')} is OUTSIDE working hours ({config.start}-{config.end}). Skipping.")
+            logger.info("Current time %s is OUTSIDE working hours (%s-%s). Skipping.", now.strftime('%H:%M'), config.start, config.end)
             return False
@@ -0,0 +1,141 @@
+"""
+Lightweight span tracing exported as Chrome trace JSON (chrome://tracing, ui.perfetto.dev).
+
+    with span("gmail.messages.get", id=msg_id):
+        ...
+
+    @traced("meet.filter")
+    def filter_and_parse(...): ...
+
+Spans are complete ("X") events on one track per thread, or per asyncio task, so
+concurrent Gmail gets and notifier sends show up side by side. While tracing is
+disabled (the default) span() returns a shared no-op context and records nothing.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Collects spans in memory until write() exports them."""
+
+    def __init__(self):
+        self.enabled = False
+        self.pid = os.getpid()
+        self._events: List[Dict[str, Any]] = []
+        self._tracks: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """Drop collected spans, e.g. after a daemon cycle's trace was written."""
+        with self._lock:
+            self._events = []
+            self._tracks = {}
+            self._origin = time.perf_counter_ns()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin) / 1000
+
+    def _track(self) -> int:
+        """Track (Chrome 'tid') of the caller: its asyncio task if it has one, else its thread."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = ("task", id(task)) if task is not None else ("thread", threading.get_ident())
+        with self._lock:
+            tid = self._tracks.get(key)
+            if tid is None:
+                tid = self._tracks[key] = len(self._tracks) + 1
+                name = task.get_name() if task is not None else threading.current_thread().name
+                self._events.append({"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid,
+                                     "args": {"name": name}})
+        return tid
+
+    def span(self, name: str, **args: Any):
+        """Context manager recording the enclosed block as a span named `name`."""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: Dict[str, Any]):
+        tid = self._track()
+        start = self._now_us()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            event = {"ph": "X", "name": name, "cat": name.split(".", 1)[0], "pid": self.pid, "tid": tid,
+                     "ts": round(start, 3), "dur": round(self._now_us() - start, 3)}
+            if args:
+                event["args"] = {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()}
+            with self._lock:
+                self._events.append(event)
+
+    def events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def write(self, path: str):
+        """Export the collected spans as a Chrome trace JSON file."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        logger.info("Trace written to %s.", path)
+
+
+# Process-wide tracer used by the instrumented components.
+TRACER = Tracer()
+
+
+def span(name: str, **args: Any):
+    """Shortcut for TRACER.span()."""
+    return TRACER.span(name, **args)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator recording every call of the function (sync or async) as a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with TRACER.span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,217 @@
+"""
+End-to-end latency benchmark: runs the full agent pipeline (Slack check, Gmail scan,
+MeetFilter, notifiers) against local stand-ins at several mailbox sizes.
+
+    python -m benchmarks.e2e                      # run and compare with benchmarks/baseline.json
+    python -m benchmarks.e2e --update-baseline    # record a new baseline
+    python -m benchmarks.e2e --latency 0.02 --error-rate 0.05
+    python -m benchmarks.e2e --async              # agent.async_main instead of agent.main
+
+Reports p50/p95 run time, requests issued and bytes transferred per run.
+Exits with status 1 if a metric regressed beyond the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from agent.config.schema import (
+    AppConfig, CallMeBotConfig, LoggingConfig, MeetConfig, MetricsConfig, NotificationConfig,
+    NotificationStrategyConfig, PushoverConfig, QuotaConfig, SlackConfig, TelegramConfig, TimeWindowConfig,
+)
+from agent.logs.setup import setup_logging, stop_logging
+from agent.main import run_once
+from agent.ratelimit import LIMITER
+from agent.stats import percentile
+from agent.notifier.manager import NotificationManager
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import SERVICES, Behavior, StubServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = [10, 50, 200]
+
+# Metrics compared against the baseline, with whether they are timing-based
+# (noisy, compared with the relative tolerance) or deterministic counts.
+COMPARED = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "requests_per_run": False,
+    "bytes_per_run": False,
+}
+
+
+def build_config(base_url: str) -> AppConfig:
+    return AppConfig(
+        working_hours=TimeWindowConfig(enabled=False),
+        # The synthetic mailbox's events are in November 2023; keep them alertable.
+        meet=MeetConfig(enabled=True, sender=None, skip_past_events=False),
+        slack=SlackConfig(workspace_url=base_url, token="xoxc-bench", cookie="xoxd-bench"),
+        notifications=NotificationConfig(
+            strategy=NotificationStrategyConfig(order=["telegram_call", "pushover"], stop_after_success=False),
+            telegram=TelegramConfig(call=CallMeBotConfig(enabled=True, username="@bench", api_url=f"{base_url}/start.php")),
+            pushover=PushoverConfig(enabled=True, user_key="u", api_token="t", api_url=f"{base_url}/1/messages.json"),
+        ),
+        logging=LoggingConfig(level="WARNING"),
+        metrics=MetricsConfig(enabled=False),
+        # Back-to-back benchmark runs would drain the Slack bucket; measure the pipeline, not the pacing.
+        quota=QuotaConfig(enabled=False),
+    )
+
+
+def _time_sync(config: AppConfig, server: StubServer, iterations: int, warmup: int) -> List[float]:
+    manager = NotificationManager(config.notifications)
+    for _ in range(warmup):
+        run_once(config, manager)
+    server.reset_stats()
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run_once(config, manager)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def _time_async(config: AppConfig, server: StubServer, iterations: int, warmup: int) -> List[float]:
+    # Imported lazily: only the --async benchmark needs httpx.
+    from agent.async_main import create_http_client, run_once as run_once_async
+    from agent.notifier.manager import AsyncNotificationManager
+
+    async with create_http_client(config) as http:
+        manager = AsyncNotificationManager(config.notifications, http, max_concurrency=config.run.notify_concurrency)
+        for _ in range(warmup):
+            await run_once_async(config, http, manager)
+        server.reset_stats()
+
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await run_once_async(config, http, manager)
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run_scenario(server: StubServer, size: int, iterations: int, warmup: int = 1, use_async: bool = False) -> Dict:
+    server.set_mailbox(build_mailbox(size))
+    config = build_config(server.url)
+    LIMITER.configure(config.quota)
+    if use_async:
+        durations = asyncio.run(_time_async(config, server, iterations, warmup))
+    else:
+        durations = _time_sync(config, server, iterations, warmup)
+
+    stats = server.stub.stats
+    requests = sum(s.requests for s in stats.values())
+    transferred = sum(s.bytes_in + s.bytes_out for s in stats.values())
+    return {
+        "mailbox_size": size,
+        "iterations": iterations,
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 95) * 1000, 2),
+        "requests_per_run": round(requests / iterations, 2),
+        "bytes_per_run": round(transferred / iterations),
+        "errors_per_run": round(sum(s.errors for s in stats.values()) / iterations, 2),
+        "per_service": {
+            name: {"requests": s.requests, "errors": s.errors, "bytes_in": s.bytes_in, "bytes_out": s.bytes_out}
+            for name, s in stats.items() if s.requests
+        },
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Return a description of every metric that is worse than baseline * (1 + tolerance)."""
+    regressions = []
+    previous = {str(r["mailbox_size"]): r for r in baseline.get("results", [])}
+    for result in results:
+        base = previous.get(str(result["mailbox_size"]))
+        if not base:
+            continue
+        for metric, timing in COMPARED.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            allowed = old * (1 + tolerance) if timing else old * 1.01
+            if new > allowed:
+                regressions.append(f"size={result['mailbox_size']} {metric}: {old} -> {new}")
+    return regressions
+
+
+def print_table(results: List[Dict]):
+    print(f"{'size':>6} {'p50 ms':>9} {'p95 ms':>9} {'req/run':>9} {'bytes/run':>11} {'err/run':>8}")
+    for r in results:
+        print(f"{r['mailbox_size']:>6} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['requests_per_run']:>9} "
+              f"{r['bytes_per_run']:>11} {r['errors_per_run']:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated mailbox sizes.")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency (s) added by every stand-in.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    parser.add_argument("--service", action="append", default=[], metavar="NAME:LATENCY:ERROR_RATE",
+                        help=f"Per-service behavior override; services: {', '.join(SERVICES)}.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Benchmark the asyncio path (agent.async_main).")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative slowdown of timings.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    setup_logging(LoggingConfig(level="WARNING", queued=False))
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    with StubServer() as server:
+        for name in SERVICES:
+            server.stub.behaviors[name] = Behavior(latency=args.latency, error_rate=args.error_rate)
+        for override in args.service:
+            name, latency, error_rate = override.split(":")
+            server.stub.behaviors[name] = Behavior(latency=float(latency), error_rate=float(error_rate))
+
+        # The Gmail client reads its credentials and endpoints from the environment.
+        os.environ.update({
+            "GMAIL_CLIENT_ID": "bench-client",
+            "GMAIL_CLIENT_SECRET": "bench-secret",
+            "GMAIL_REFRESH_TOKEN": "bench-refresh",
+            "GMAIL_API_ENDPOINT": server.url + "/",
+            "GMAIL_TOKEN_URI": server.url + "/token",
+        })
+
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        results = [run_scenario(server, size, args.iterations, use_async=args.use_async) for size in sizes]
+
+    stop_logging()
+    print_table(results)
+    report = {"results": results, "latency": args.latency, "error_rate": args.error_rate, "async": args.use_async}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to record one.")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Synthetic mailbox generator producing Gmail-API-shaped message resources
+(users.messages.get, format=full): nested multipart bodies, base64url data,
+Google Calendar invitations with text/calendar parts and invite.ics attachments,
+and realistic noise (newsletters, Slack notifications, attachments).
+
+    python -m benchmarks.mailbox --count 100000 --out corpus.jsonl.gz
+    python -m benchmarks.mailbox --count 1000000 --out corpus.jsonl.gz --large-html-ratio 0.01
+
+Messages are generated lazily, so corpora of 1M+ messages are streamed to disk
+without holding them in memory.
+"""
+import argparse
+import base64
+import gzip
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+MEET_SENDER = "Google Calendar <calendar-notification@google.com>"
+SLACK_SENDER = "Slack <notification@slack.com>"
+
+# Relative frequency of each message kind in a generated mailbox.
+DEFAULT_MIX = {
+    "meet_invite": 0.05,
+    "meet_update": 0.02,
+    "meet_cancel": 0.01,
+    "plain": 0.22,
+    "newsletter": 0.40,
+    "slack": 0.20,
+    "attachment": 0.10,
+}
+
+BASE_TIME_MS = 1700000000000
+
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+          "incididunt ut labore et dolore magna aliqua meeting project update review").split()
+
+
+def b64url(text: str) -> str:
+    # Gmail returns padded base64url data.
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def _headers(sender: str, subject: str, **extra: str) -> List[Dict[str, str]]:
+    headers = [
+        {"name": "From", "value": sender},
+        {"name": "To", "value": "me@example.com"},
+        {"name": "Subject", "value": subject},
+    ]
+    headers.extend({"name": k.replace("_", "-"), "value": v} for k, v in extra.items())
+    return headers
+
+
+def _part(part_id: str, mime_type: str, text: Optional[str] = None, filename: str = "",
+          attachment_id: Optional[str] = None, size: int = 0, **extra) -> Dict:
+    body: Dict = {"size": len(text) if text is not None else size}
+    if text is not None:
+        body["data"] = b64url(text)
+    if attachment_id:
+        body["attachmentId"] = attachment_id
+    part = {"partId": part_id, "mimeType": mime_type, "filename": filename, "headers": [], "body": body}
+    part.update(extra)
+    return part
+
+
+def _multipart(part_id: str, mime_type: str, parts: List[Dict]) -> Dict:
+    return {"partId": part_id, "mimeType": mime_type, "filename": "", "headers": [], "body": {"size": 0}, "parts": parts}
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choices(_WORDS, k=count))
+
+
+def _ics(uid: str, sequence: int, start: datetime, title: str, method: str) -> str:
+    fmt = "%Y%m%dT%H%M%SZ"
+    status = "CANCELLED" if method == "CANCEL" else "CONFIRMED"
+    return "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "PRODID:-//Google Inc//Google Calendar 70.9054//EN",
+        "VERSION:2.0",
+        f"METHOD:{method}",
+        "BEGIN:VEVENT",
+        f"DTSTART:{start.strftime(fmt)}",
+        f"DTEND:{(start + timedelta(minutes=30)).strftime(fmt)}",
+        f"DTSTAMP:{start.strftime(fmt)}",
+        "ORGANIZER;CN=Organizer:mailto:organizer@example.com",
+        f"UID:{uid}",
+        f"SEQUENCE:{sequence}",
+        f"STATUS:{status}",
+        f"SUMMARY:{title}",
+        "DESCRIPTION:Join with Google Meet: https://meet.google.com/abc-defg-hij",
+        "END:VEVENT",
+        "END:VCALENDAR",
+        "",
+    ])
+
+
+def _meet(index: int, kind: str, rng: random.Random, sent: datetime) -> Dict:
+    event = rng.randint(0, max(1, index // 4))  # several emails share an event
+    uid = f"evt{event:08d}@google.com"
+    title = f"Sync #{event}"
+    start = sent + timedelta(hours=rng.randint(1, 72))
+    prefix, method, sequence = {
+        "meet_invite": ("Invitation", "REQUEST", 0),
+        "meet_update": ("Updated invitation", "REQUEST", rng.randint(1, 3)),
+        "meet_cancel": ("Canceled event", "CANCEL", rng.randint(1, 4)),
+    }[kind]
+    subject = f"{prefix}: {title} @ {start.strftime('%a %b %d, %Y %I%p')} (UTC)"
+
+    text = (f"{title}\n{start.strftime('%A %b %d, %Y')}\n\nJoin with Google Meet\n"
+            f"https://meet.google.com/abc-defg-hij\n\n{_words(rng, 40)}\n\n"
+            f"Invitation from Google Calendar\n")
+    html = "<html><body><table>" + "".join(f"<tr><td>{line}</td></tr>" for line in text.splitlines()) + "</table></body></html>"
+    ics = _ics(uid, sequence, start, title, method)
+
+    alternative = _multipart("0", "multipart/alternative", [
+        _part("0.0", "text/plain", text),
+        _part("0.1", "text/html", html),
+        _part("0.2", "text/calendar", ics),
+    ])
+    attachment = _part("1", "application/ics", filename="invite.ics", attachment_id=f"att-{index}", size=len(ics))
+    return {
+        # Gmail threads the invitation, updates and cancellation of an event together.
+        "thread": f"t{event:015x}",
+        "sender": MEET_SENDER,
+        "subject": subject,
+        "snippet": text[:150].replace("\n", " "),
+        "payload": _multipart("", "multipart/mixed", [alternative, attachment]),
+    }
+
+
+def _noise(index: int, kind: str, rng: random.Random, large_html_ratio: float, large_html_bytes: int) -> Dict:
+    if kind == "plain":
+        text = f"Hi,\n\n{_words(rng, rng.randint(20, 200))}\n\nThanks\n"
+        payload = _part("", "text/plain", text)
+        sender, subject = f"person{index % 97}@example.com", f"Re: {_words(rng, 4)}"
+    elif kind == "slack":
+        text = f"You have a new mention in #general\n\n{_words(rng, 30)}\n\nOpen Slack\n"
+        html = f"<html><body><p>{text}</p></body></html>"
+        payload = _multipart("", "multipart/alternative", [_part("0", "text/plain", text), _part("1", "text/html", html)])
+        sender, subject = SLACK_SENDER, f"[Slack] New message in #general"
+    elif kind == "attachment":
+        text = f"Please find the report attached.\n\n{_words(rng, 60)}\n"
+        payload = _multipart("", "multipart/mixed", [
+            _multipart("0", "multipart/alternative", [_part("0.0", "text/plain", text), _part("0.1", "text/html", f"<p>{text}</p>")]),
+            _part("1", "application/pdf", filename=f"report-{index}.pdf", attachment_id=f"att-{index}", size=rng.randint(10_000, 2_000_000)),
+        ])
+        sender, subject = f"reports{index % 13}@example.com", f"Report {index}"
+    else:  # newsletter: html-heavy, optionally huge
+        target = large_html_bytes if rng.random() < large_html_ratio else rng.randint(2_000, 30_000)
+        paragraph = f"<p style=\"font-family:Arial\">{_words(rng, 60)}</p>"
+        html = "<html><body>" + paragraph * max(1, target // len(paragraph)) + "</body></html>"
+        text = f"View this newsletter in your browser.\n{_words(rng, 80)}\n"
+        payload = _multipart("", "multipart/alternative", [_part("0", "text/plain", text), _part("1", "text/html", html)])
+        sender, subject = f"news{index % 17}@example.com", f"Weekly digest {index}: {_words(rng, 3)}"
+    return {"sender": sender, "subject": subject, "snippet": text[:150].replace("\n", " "), "payload": payload}
+
+
+def _size(part: Dict) -> int:
+    return part["body"].get("size", 0) + sum(_size(p) for p in part.get("parts", []))
+
+
+def build_message(index: int, kind: str, rng: random.Random,
+                  large_html_ratio: float = 0.0, large_html_bytes: int = 500_000) -> Dict:
+    """Build one message resource of the given kind."""
+    sent = datetime.fromtimestamp(BASE_TIME_MS / 1000 + index * 60, tz=timezone.utc)
+    if kind.startswith("meet_"):
+        content = _meet(index, kind, rng, sent)
+    else:
+        content = _noise(index, kind, rng, large_html_ratio, large_html_bytes)
+
+    payload = content["payload"]
+    payload["headers"] = _headers(content["sender"], content["subject"], Date=sent.strftime("%a, %d %b %Y %H:%M:%S +0000"))
+    msg_id = f"{index:016x}"
+    return {
+        "id": msg_id,
+        "threadId": content.get("thread", msg_id),
+        "labelIds": ["INBOX", "UNREAD"] if rng.random() < 0.3 else ["INBOX"],
+        "snippet": content["snippet"],
+        "sizeEstimate": _size(payload),
+        "internalDate": str(BASE_TIME_MS + index * 60000),
+        "payload": payload,
+    }
+
+
+def generate(count: int, seed: int = 0, mix: Optional[Dict[str, float]] = None,
+             large_html_ratio: float = 0.0, large_html_bytes: int = 500_000) -> Iterator[Dict]:
+    """Lazily yield `count` message resources drawn from `mix`."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = list(mix), list(mix.values())
+    for index in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        yield build_message(index, kind, rng, large_html_ratio, large_html_bytes)
+
+
+def build_mailbox(size: int, meet_ratio: float = 0.1, seed: int = 0) -> List[Dict]:
+    """In-memory mailbox where `meet_ratio` of the messages are Calendar emails."""
+    noise = {k: v for k, v in DEFAULT_MIX.items() if not k.startswith("meet_")}
+    meet = {k: v for k, v in DEFAULT_MIX.items() if k.startswith("meet_")}
+    scale_noise = (1 - meet_ratio) / sum(noise.values())
+    scale_meet = meet_ratio / sum(meet.values())
+    mix = {**{k: v * scale_noise for k, v in noise.items()}, **{k: v * scale_meet for k, v in meet.items()}}
+    return list(generate(size, seed=seed, mix=mix))
+
+
+def open_corpus(path: str, mode: str = "rt"):
+    """Open a JSONL corpus, transparently handling .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode.replace("t", ""), encoding="utf-8")
+
+
+def iter_corpus(path: str) -> Iterator[Dict]:
+    with open_corpus(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_corpus(path: str, messages: Iterator[Dict]) -> int:
+    written = 0
+    with open_corpus(path, "wt") as f:
+        for message in messages:
+            f.write(json.dumps(message, separators=(",", ":")))
+            f.write("\n")
+            written += 1
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000, help="Number of messages (1k to 1M+).")
+    parser.add_argument("--out", required=True, help="Output JSONL file (.gz to compress).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--large-html-ratio", type=float, default=0.0,
+                        help="Fraction of newsletters with a very large HTML body.")
+    parser.add_argument("--large-html-bytes", type=int, default=500_000)
+    args = parser.parse_args(argv)
+
+    written = write_corpus(args.out, generate(args.count, args.seed, large_html_ratio=args.large_html_ratio,
+                                              large_html_bytes=args.large_html_bytes))
+    print(f"Wrote {written} messages to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
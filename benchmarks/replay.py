@@ -0,0 +1,112 @@
+"""
+Offline replay: runs a saved (or freshly generated) corpus of Gmail message resources
+through the agent's payload parsing and MeetFilter, without any network access.
+
+    python -m benchmarks.replay corpus.jsonl.gz
+    python -m benchmarks.replay --synthetic 100000
+    python -m benchmarks.replay --synthetic 10000 --trace-memory
+
+Reports messages per second for parsing, filtering and end-to-end (including corpus
+loading), plus peak memory.
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from agent.config.schema import MeetConfig
+from agent.mail.filters import MEET_BODY_PHRASES, MeetFilter
+from agent.mail.gmail_payload import parse_message
+from benchmarks.mailbox import generate, iter_corpus
+
+
+def _chunks(messages: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(messages)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def replay(messages: Iterable[Dict], meet_config: Optional[MeetConfig] = None,
+           chunk_size: int = 1000, trace_memory: bool = False) -> Dict:
+    """
+    Parse and filter `messages` in chunks (the agent handles one result page at a time),
+    timing both stages separately.
+    """
+    meet_config = meet_config or MeetConfig()
+    meet_filter = MeetFilter(meet_config)
+    total = matched = 0
+    parse_seconds = filter_seconds = 0.0
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+
+    for chunk in _chunks(messages, chunk_size):
+        t0 = time.perf_counter()
+        emails = [parse_message(m, meet_config.max_body_bytes, MEET_BODY_PHRASES) for m in chunk]
+        t1 = time.perf_counter()
+        matched += len(meet_filter.filter_and_parse(emails))
+        t2 = time.perf_counter()
+        parse_seconds += t1 - t0
+        filter_seconds += t2 - t1
+        total += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "messages": total,
+        "matched": matched,
+        "elapsed_s": round(elapsed, 3),
+        # Reading/decoding the corpus (or generating it with --synthetic)
+        "load_s": round(elapsed - parse_seconds - filter_seconds, 3),
+        "parse_msgs_per_s": round(total / parse_seconds) if parse_seconds else None,
+        "filter_msgs_per_s": round(total / filter_seconds) if filter_seconds else None,
+        "total_msgs_per_s": round(total / elapsed) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["peak_traced_mb"] = round(peak / (1024 * 1024), 2)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("corpus", nargs="?", help="JSONL corpus written by benchmarks.mailbox (.gz supported).")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Generate N messages on the fly instead.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--sender", default=None, help="MeetConfig.sender to filter on.")
+    parser.add_argument("--max-body-bytes", type=int, default=MeetConfig().max_body_bytes)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Measure peak Python allocations with tracemalloc (slows the run).")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+
+    messages = generate(args.synthetic, seed=args.seed) if args.synthetic else iter_corpus(args.corpus)
+    report = replay(messages, MeetConfig(sender=args.sender, max_body_bytes=args.max_body_bytes), args.chunk_size, args.trace_memory)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>18}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
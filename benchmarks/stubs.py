@@ -0,0 +1,383 @@
+"""
+Local HTTP stand-ins for the services the agent talks to:
+Google OAuth token endpoint, Gmail REST API, Slack client.counts, Pushover and CallMeBot.
+
+Each service has configurable latency and error injection, and every request is
+counted together with the bytes received and sent.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+SERVICES = ("oauth", "gmail", "slack", "pushover", "callmebot")
+
+# Gmail's default page size for users.messages.list
+GMAIL_PAGE_SIZE = 100
+
+# One search term: a {...} OR-group, a quoted phrase or an operator with an optionally quoted value.
+_QUERY_TERM = re.compile(r'-?(?:\{[^}]*\}|"[^"]*"|[\w-]+:"[^"]*"|\S+)')
+
+# Pushover receipts API: /1/receipts/<receipt>.json and /1/receipts/<receipt>/cancel.json
+_RECEIPT_PATH = re.compile(r"/1/receipts/(\w+)(/cancel)?\.json")
+
+
+@dataclass
+class Behavior:
+    """How a stubbed service responds."""
+    latency: float = 0.0 # Seconds to sleep before answering
+    error_rate: float = 0.0 # Fraction of requests answered with `error_status`
+    error_status: int = 500
+    retry_after: Optional[int] = None # Sent as Retry-After on injected errors
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    errors: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    paths: Dict[str, int] = field(default_factory=dict) # Requests per URL path
+
+
+@dataclass
+class StubState:
+    mailbox: List[Dict] = field(default_factory=list)
+    slack_badges: Dict[str, int] = field(default_factory=lambda: {"channels": 1, "dms": 0, "thread_mentions": 0})
+    # Conversations reported by client.counts and served by conversations.history/info:
+    # {"id", "name", "kind": channels|mpims|ims, "last_read", "mention_count", "messages": [{"ts", "user", "text"}]}
+    slack_conversations: List[Dict] = field(default_factory=list)
+    slack_users: Dict[str, str] = field(default_factory=dict)
+    slack_self: str = "USELF"
+    gmail_labels: Dict[str, str] = field(default_factory=dict) # User label name -> id
+    gmail_history_id: int = 1 # Advanced by set_mailbox and batchModify, like Gmail's on every change
+    # Emergency (priority 2) alerts by receipt: {"acknowledged_at": 0 or unix time, "expires_at", "cancelled"}
+    pushover_receipts: Dict[str, Dict] = field(default_factory=dict)
+    behaviors: Dict[str, Behavior] = field(default_factory=lambda: {s: Behavior() for s in SERVICES})
+    stats: Dict[str, ServiceStats] = field(default_factory=lambda: {s: ServiceStats() for s in SERVICES})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; otherwise Nagle + delayed ACK add ~40ms per keep-alive request.
+    disable_nagle_algorithm = True
+    wbufsize = 1 << 16
+    server: "StubServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- plumbing -------------------------------------------------------
+
+    def _service(self, path: str) -> Optional[str]:
+        if path == "/token":
+            return "oauth"
+        if path.startswith("/gmail/v1/"):
+            return "gmail"
+        if path.startswith("/api/"):
+            return "slack"
+        if path.startswith("/1/"):
+            return "pushover"
+        if path.startswith("/start.php"):
+            return "callmebot"
+        return None
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        service = self._service(url.path)
+        if service is None:
+            self._send(404, {"error": "not_found"}, None)
+            return
+
+        stub = self.server.stub
+        behavior = stub.behaviors[service]
+        with self.server.lock:
+            stats = stub.stats[service]
+            stats.requests += 1
+            stats.paths[url.path] = stats.paths.get(url.path, 0) + 1
+            stats.bytes_in += len(self.requestline) + len(str(self.headers)) + len(body)
+            inject = self.server.rng.random() < behavior.error_rate
+
+        if behavior.latency:
+            time.sleep(behavior.latency)
+
+        if inject:
+            headers = {"Retry-After": str(behavior.retry_after)} if behavior.retry_after is not None else {}
+            with self.server.lock:
+                stats.errors += 1
+            self._send(behavior.error_status, {"error": "injected"}, service, headers)
+            return
+
+        status, payload = getattr(self, f"_{service}")(method, url, body)
+        self._send(status, payload, service)
+
+    def _send(self, status: int, payload, service: Optional[str], headers: Optional[Dict[str, str]] = None):
+        if isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain"
+        else:
+            data, content_type = json.dumps(payload).encode(), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if service:
+            with self.server.lock:
+                self.server.stub.stats[service].bytes_out += len(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    # --- services -------------------------------------------------------
+
+    def _oauth(self, method, url, body):
+        return 200, {"access_token": "stub-access-token", "expires_in": 3599, "token_type": "Bearer"}
+
+    def _text(self, message: Dict) -> str:
+        """Lower-cased subject and decoded text parts, which Gmail's free-text search covers."""
+        text = self.server.text.get(message["id"])
+        if text is None:
+            pieces = [h["value"] for h in message["payload"]["headers"] if h["name"] == "Subject"]
+            stack = [message["payload"]]
+            while stack:
+                part = stack.pop()
+                stack.extend(part.get("parts", []))
+                data = part["body"].get("data")
+                if data and part["mimeType"] in ("text/plain", "text/html"):
+                    pieces.append(base64.urlsafe_b64decode(data).decode("utf-8", "replace"))
+            text = self.server.text[message["id"]] = "\n".join(pieces).lower()
+        return text
+
+    def _term(self, message: Dict, term: str) -> bool:
+        """One Gmail search term. Unsupported operators (e.g. newer_than:) match everything."""
+        if term.startswith("{"):
+            return any(self._term(message, t) for t in _QUERY_TERM.findall(term[1:-1]))
+        if term.startswith('"'):
+            return term.strip('"').lower() in self._text(message)
+        key, _, value = term.partition(":")
+        value = value.strip('"').lower()
+        headers = {h["name"]: h["value"].lower() for h in message["payload"]["headers"]}
+        if key == "label":
+            names = {label.lower() for label in message.get("labelIds", [])}
+            names |= {name.replace("/", "-").replace(" ", "-").lower()
+                      for name, label_id in self.server.stub.gmail_labels.items() if label_id in message.get("labelIds", [])}
+            return value in names
+        if key == "is" and value == "unread":
+            return "UNREAD" in message.get("labelIds", [])
+        if key == "from":
+            return value in headers.get("From", "")
+        if key == "subject":
+            return value in headers.get("Subject", "")
+        if key == "filename":
+            stack = [message["payload"]]
+            while stack:
+                part = stack.pop()
+                stack.extend(part.get("parts", []))
+                if value in part.get("filename", "").lower():
+                    return True
+            return False
+        return True
+
+    def _matches(self, message: Dict, query: str) -> bool:
+        """Evaluate the subset of Gmail search syntax the agent uses against a message."""
+        for term in _QUERY_TERM.findall(query):
+            negate = term.startswith("-")
+            if self._term(message, term[1:] if negate else term) == negate:
+                return False
+        return True
+
+    def _gmail(self, method, url, body):
+        parts = url.path.strip("/").split("/")  # gmail/v1/users/me/messages[/id]
+        stub = self.server.stub
+        if parts[4:5] == ["labels"]:
+            if method == "POST":
+                label = json.loads(body)
+                with self.server.lock:
+                    label_id = stub.gmail_labels.setdefault(label["name"], f"Label_{len(stub.gmail_labels) + 1}")
+                return 200, {"id": label_id, "name": label["name"]}
+            return 200, {"labels": [{"id": "INBOX", "name": "INBOX"}, {"id": "UNREAD", "name": "UNREAD"}]
+                         + [{"id": i, "name": n} for n, i in stub.gmail_labels.items()]}
+        if parts[4:5] == ["profile"]:
+            return 200, {"emailAddress": "me@example.com", "messagesTotal": len(stub.mailbox),
+                         "threadsTotal": len(self.server.threads), "historyId": str(stub.gmail_history_id)}
+        if parts[4:5] == ["threads"]:
+            return self._gmail_threads(method, url, parts)
+        if parts[4:5] != ["messages"]:
+            return 404, {"error": {"code": 404, "message": "Not found"}}
+        if len(parts) == 5 and method == "GET":
+            query = parse_qs(url.query)
+            q = query.get("q", [""])[0]
+            mailbox = [m for m in stub.mailbox if self._matches(m, q)]
+            return 200, self._page(query, "messages", [{"id": m["id"], "threadId": m["threadId"]} for m in mailbox])
+        if len(parts) == 6 and parts[5] == "batchModify":
+            request = json.loads(body)
+            if len(request.get("ids", [])) > 1000:
+                return 400, {"error": {"code": 400, "message": "Too many ids"}}
+            with self.server.lock:
+                stub.gmail_history_id += 1
+                for message_id in request.get("ids", []):
+                    message = self.server.index.get(message_id)
+                    if message is None:
+                        continue
+                    labels = [l for l in message["labelIds"] if l not in request.get("removeLabelIds", [])]
+                    labels += [l for l in request.get("addLabelIds", []) if l not in labels]
+                    message["labelIds"] = labels
+            return 204, ""
+        if len(parts) == 6 and method == "GET":
+            message = self.server.index.get(parts[5])
+            if message is None:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            return 200, message
+        return 404, {"error": {"code": 404, "message": "Not found"}}
+
+    @staticmethod
+    def _page(query: Dict[str, List[str]], key: str, items: List[Dict]) -> Dict:
+        """One page of a list response, paginated like Gmail (pageToken/maxResults)."""
+        start = int(query.get("pageToken", ["0"])[0])
+        size = int(query.get("maxResults", [GMAIL_PAGE_SIZE])[0])
+        page = items[start:start + size]
+        if not page:
+            return {"resultSizeEstimate": 0}
+        payload = {key: page, "resultSizeEstimate": len(items)}
+        if start + size < len(items):
+            payload["nextPageToken"] = str(start + size)
+        return payload
+
+    def _gmail_threads(self, method, url, parts):
+        """threads.list (threads with at least one matching message) and threads.get (all of its messages)."""
+        if method != "GET":
+            return 404, {"error": {"code": 404, "message": "Not found"}}
+        if len(parts) == 5:
+            query = parse_qs(url.query)
+            q = query.get("q", [""])[0]
+            thread_ids = list(dict.fromkeys(m["threadId"] for m in self.server.stub.mailbox if self._matches(m, q)))
+            return 200, self._page(query, "threads", [{"id": t, "snippet": self.server.threads[t][-1]["snippet"]}
+                                                      for t in thread_ids])
+        messages = self.server.threads.get(parts[5])
+        if messages is None:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        return 200, {"id": parts[5], "messages": messages}
+
+    def _slack(self, method, url, body):
+        stub = self.server.stub
+        form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        conversations = {c["id"]: c for c in stub.slack_conversations}
+        api = url.path[len("/api/"):]
+        if api == "client.counts":
+            payload = {"ok": True, "channel_badges": dict(stub.slack_badges)}
+            for kind in ("channels", "mpims", "ims"):
+                payload[kind] = [{
+                    "id": c["id"],
+                    "last_read": c.get("last_read", "0"),
+                    "latest": max((m["ts"] for m in c["messages"]), key=float, default=None),
+                    "mention_count": c.get("mention_count", 0),
+                    "has_unreads": bool(c.get("mention_count")),
+                } for c in stub.slack_conversations if c.get("kind", "channels") == kind]
+            return 200, payload
+        if api == "auth.test":
+            return 200, {"ok": True, "user_id": stub.slack_self}
+        if api in ("conversations.history", "conversations.info"):
+            conv = conversations.get(form.get("channel"))
+            if conv is None:
+                return 200, {"ok": False, "error": "channel_not_found"}
+            if api == "conversations.info":
+                return 200, {"ok": True, "channel": {"id": conv["id"], "name": conv["name"]}}
+            oldest = float(form.get("oldest", 0))
+            newer = [m for m in conv["messages"] if float(m["ts"]) > oldest]
+            newer.sort(key=lambda m: float(m["ts"]), reverse=True)
+            return 200, {"ok": True, "messages": newer[:int(form.get("limit", 100))]}
+        if api == "users.info":
+            user_id = form.get("user")
+            if user_id not in stub.slack_users:
+                return 200, {"ok": False, "error": "user_not_found"}
+            return 200, {"ok": True, "user": {"id": user_id, "name": stub.slack_users[user_id]}}
+        return 200, {"ok": False, "error": "unknown_method"}
+
+    def _pushover(self, method, url, body):
+        stub = self.server.stub
+        match = _RECEIPT_PATH.fullmatch(url.path)
+        if match:
+            receipt = stub.pushover_receipts.get(match.group(1))
+            if receipt is None:
+                return 404, {"status": 0, "errors": ["receipt not found"]}
+            if match.group(2):
+                receipt["cancelled"] = True
+                return 200, {"status": 1, "request": "stub-request"}
+            return 200, {"status": 1, "request": "stub-request",
+                         "acknowledged": int(bool(receipt["acknowledged_at"])),
+                         "acknowledged_at": receipt["acknowledged_at"],
+                         "expired": int(receipt["cancelled"] or time.time() >= receipt["expires_at"]),
+                         "expires_at": int(receipt["expires_at"])}
+        form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        if form.get("priority") == "2":
+            with self.server.lock:
+                receipt_id = f"r{len(stub.pushover_receipts) + 1}"
+                stub.pushover_receipts[receipt_id] = {
+                    "acknowledged_at": 0, "expires_at": time.time() + int(form.get("expire", 3600)), "cancelled": False}
+            return 200, {"status": 1, "request": "stub-request", "receipt": receipt_id}
+        return 200, {"status": 1, "request": "stub-request"}
+
+    def _callmebot(self, method, url, body):
+        return 200, "Call queued"
+
+
+class StubServer(ThreadingHTTPServer):
+    """One threaded HTTP server that hosts all stand-ins on 127.0.0.1."""
+    daemon_threads = True
+
+    def __init__(self, stub: Optional[StubState] = None, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.stub = stub or StubState()
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.index: Dict[str, Dict] = {}
+        self.threads: Dict[str, List[Dict]] = {} # Thread id -> messages, oldest first
+        self.text: Dict[str, str] = {} # Message id -> searchable text, built on first search
+        self._thread: Optional[threading.Thread] = None
+        self.set_mailbox(self.stub.mailbox)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def set_mailbox(self, mailbox: List[Dict]):
+        self.stub.mailbox = mailbox
+        self.stub.gmail_history_id += 1
+        self.index = {m["id"]: m for m in mailbox}
+        self.threads = {}
+        for message in mailbox:
+            self.threads.setdefault(message["threadId"], []).append(message)
+        self.text = {}
+
+    def reset_stats(self):
+        with self.lock:
+            self.stub.stats = {s: ServiceStats() for s in SERVICES}
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
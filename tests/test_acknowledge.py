@@ -0,0 +1,108 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+from agent.async_main import create_http_client, run_once as run_once_async
+from agent.mail.gmail_client import GmailClient
+from agent.mail.gmail_requests import acknowledge, batch_modify_bodies, run_flow, search_query
+from agent.main import run_once
+from agent.notifier.manager import AsyncNotificationManager, NotificationManager
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+class TestGmailRequests(unittest.TestCase):
+    def test_batch_modify_is_chunked(self):
+        ids = [str(i) for i in range(2500)]
+        bodies = list(batch_modify_bodies(ids, add=["Label_1"]))
+        self.assertEqual([len(b["ids"]) for b in bodies], [1000, 1000, 500])
+        self.assertEqual(sum((b["ids"] for b in bodies), []), ids)
+        self.assertEqual(bodies[0]["addLabelIds"], ["Label_1"])
+        self.assertNotIn("removeLabelIds", bodies[0])
+
+    def test_query_excludes_label(self):
+        self.assertEqual(search_query("calendar@google.com", exclude_label="Alerts/Meet done"),
+                         "label:INBOX from:calendar@google.com -label:alerts-meet-done")
+
+    def test_label_is_created_once(self):
+        calls = []
+
+        def call(request):
+            calls.append((request.method, request.http_method, request.path))
+            return {"labels": []} if request.method == "labels.list" else {"id": "Label_7"}
+
+        label_ids = {}
+        for _ in range(2):
+            run_flow(acknowledge(label_ids, ["a", "b"], "label", "Meet done"), call)
+        self.assertEqual(label_ids, {"Meet done": "Label_7"})
+        self.assertEqual(calls, [("labels.list", "GET", "labels"), ("labels.create", "POST", "labels")]
+                         + [("messages.batchModify", "POST", "messages/batchModify")] * 2)
+
+class TestAcknowledge(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.set_mailbox(build_mailbox(40, meet_ratio=0.25))
+        self.config = build_config(self.server.url)
+        self.config.slack = None
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_labeled_emails_drop_out_of_next_query(self):
+        self.config.meet.acknowledge = "label"
+        manager = NotificationManager(self.config.notifications)
+        self.assertTrue(run_once(self.config, manager))
+        self.assertEqual(self.server.stub.stats["pushover"].requests, 1)
+        self.assertEqual(self.server.stub.gmail_labels, {"slack-alert-agent": "Label_1"})
+        labeled = [m for m in self.server.stub.mailbox if "Label_1" in m["labelIds"]]
+        self.assertTrue(labeled)
+        self.assertTrue(all(m["payload"]["headers"][0]["value"].startswith("Google Calendar") for m in labeled))
+
+        self.server.reset_stats()
+        self.assertTrue(run_once(self.config, manager))
+        stats = self.server.stub.stats
+        self.assertEqual(stats["pushover"].requests, 0)
+        # The labeled invitations no longer match the query, so nothing is fetched.
+        self.assertEqual(stats["gmail"].paths.get("/gmail/v1/users/me/threads"), 1)
+        self.assertEqual(stats["gmail"].requests, 1)
+
+    def test_nothing_is_acknowledged_when_delivery_fails(self):
+        self.config.meet.acknowledge = "archive"
+        for service in ("pushover", "callmebot"):
+            self.server.stub.behaviors[service] = Behavior(error_rate=1.0)
+        self.assertFalse(run_once(self.config, NotificationManager(self.config.notifications)))
+        self.assertNotIn("/gmail/v1/users/me/messages/batchModify", self.server.stub.stats["gmail"].paths)
+        self.assertTrue(all("INBOX" in m["labelIds"] for m in self.server.stub.mailbox))
+
+    def test_async_archive(self):
+        self.config.meet.acknowledge = "archive"
+
+        async def cycle():
+            async with create_http_client(self.config) as http:
+                manager = AsyncNotificationManager(self.config.notifications, http)
+                return await run_once_async(self.config, http, manager)
+
+        self.assertTrue(asyncio.run(cycle()))
+        archived = [m for m in self.server.stub.mailbox if "INBOX" not in m["labelIds"]]
+        self.assertTrue(archived)
+
+        self.server.reset_stats()
+        self.assertTrue(asyncio.run(cycle()))
+        self.assertEqual(self.server.stub.stats["pushover"].requests, 0)
+
+    def test_large_acknowledgement_is_split_into_batches(self):
+        self.server.set_mailbox(build_mailbox(2100, meet_ratio=0.0))
+        client = GmailClient()
+        client.connect()
+        client.acknowledge([m["id"] for m in self.server.stub.mailbox], "read")
+        self.assertEqual(self.server.stub.stats["gmail"].paths["/gmail/v1/users/me/messages/batchModify"], 3)
+        self.assertFalse(any("UNREAD" in m["labelIds"] for m in self.server.stub.mailbox))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+from agent.async_main import create_http_client, run_once
+from agent.mail.async_gmail_client import AsyncGmailClient
+from agent.notifier.manager import AsyncNotificationManager
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+GMAIL_ENV = {
+    "GMAIL_CLIENT_ID": "test-client",
+    "GMAIL_CLIENT_SECRET": "test-secret",
+    "GMAIL_REFRESH_TOKEN": "test-refresh",
+}
+
+class TestAsyncPath(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.set_mailbox(build_mailbox(40, meet_ratio=0.25))
+        self.config = build_config(self.server.url)
+        env = dict(GMAIL_ENV, GMAIL_API_ENDPOINT=self.server.url, GMAIL_TOKEN_URI=self.server.url + "/token")
+        patcher = mock.patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_gmail_gets_run_concurrently_within_bound(self):
+        self.server.stub.behaviors["gmail"] = Behavior(latency=0.05)
+
+        async def fetch():
+            async with create_http_client(self.config) as http:
+                client = AsyncGmailClient(http, max_concurrency=10)
+                await client.connect()
+                return await client.get_emails()
+
+        started = time.perf_counter()
+        emails = asyncio.run(fetch())
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual(len(emails), 40)
+        self.assertEqual([e.id for e in emails], [m["id"] for m in self.server.stub.mailbox])
+        # 1 list + 40 gets at 50ms each would take >2s sequentially; 10 at a time is ~0.25s.
+        self.assertEqual(self.server.stub.stats["gmail"].requests, 41)
+
+    def test_run_once_checks_sources_and_notifies(self):
+        async def cycle():
+            async with create_http_client(self.config) as http:
+                manager = AsyncNotificationManager(self.config.notifications, http)
+                return await run_once(self.config, http, manager)
+
+        self.assertTrue(asyncio.run(cycle()))
+        stats = self.server.stub.stats
+        self.assertEqual(stats["slack"].requests, 1)
+        self.assertEqual(stats["oauth"].requests, 1)
+        self.assertEqual(stats["pushover"].requests, 1)
+        self.assertEqual(stats["callmebot"].requests, 1)
+
+    def test_stop_after_success_keeps_fallback_order(self):
+        self.config.notifications.strategy.stop_after_success = True
+
+        async def send():
+            async with create_http_client(self.config) as http:
+                return await AsyncNotificationManager(self.config.notifications, http).notify("hi")
+
+        self.assertTrue(asyncio.run(send()))
+        self.assertEqual(self.server.stub.stats["callmebot"].requests, 1)
+        self.assertEqual(self.server.stub.stats["pushover"].requests, 0)
+
+    def test_failed_notifiers_are_reported(self):
+        self.server.stub.behaviors["pushover"] = Behavior(error_rate=1.0)
+        self.server.stub.behaviors["callmebot"] = Behavior(error_rate=1.0)
+
+        async def send():
+            async with create_http_client(self.config) as http:
+                return await AsyncNotificationManager(self.config.notifications, http).notify("hi")
+
+        self.assertFalse(asyncio.run(send()))
+
+if __name__ == '__main__':
+    unittest.main()
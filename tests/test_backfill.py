@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agent.backfill import BACKFILL_SECTION, backfill_meet_config, classify, run_backfill
+from agent.mail.async_gmail_client import AsyncGmailClient
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import StubServer
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.set_mailbox(build_mailbox(230, meet_ratio=0.3))
+        # Archived mail is part of the history too.
+        for message in self.server.stub.mailbox[::4]:
+            message["labelIds"] = [l for l in message["labelIds"] if l != "INBOX"]
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = build_config(self.server.url)
+        # Classify every message locally, so the 230 messages span five pages.
+        self.config.meet.server_filter = False
+        self.config.backfill.output_file = os.path.join(tmp.name, "backfill.jsonl")
+        self.config.backfill.page_size = 50
+        self.config.backfill.chunk_size = 20
+        self.config.backfill.workers = 2
+        self.state = StateStore(os.path.join(tmp.name, "state.json"))
+        self.expected = sorted(r["id"] for r in classify(self.server.stub.mailbox, backfill_meet_config(self.config.meet)))
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def written_ids(self):
+        with open(self.config.backfill.output_file) as f:
+            return sorted(json.loads(line)["id"] for line in f)
+
+    def list_calls(self):
+        return self.server.stub.stats["gmail"].paths.get("/gmail/v1/users/me/messages", 0)
+
+    def test_full_run(self):
+        checkpoint = run_backfill(self.config, self.state)
+        self.assertTrue(checkpoint["done"])
+        self.assertEqual((checkpoint["pages"], checkpoint["messages"]), (5, 230))
+        self.assertTrue(self.expected)
+        self.assertEqual(self.written_ids(), self.expected)
+        self.assertEqual(sorted(StateStore(self.state.file_path).processed_ids), self.expected)
+
+        # Done: a second run fetches nothing.
+        self.server.reset_stats()
+        run_backfill(self.config, self.state)
+        self.assertEqual(self.server.stub.stats["gmail"].requests, 0)
+
+    def test_resumes_after_interruption(self):
+        list_message_ids = AsyncGmailClient.list_message_ids
+        calls = []
+
+        async def interrupted(client, *args, **kwargs):
+            calls.append(args)
+            if len(calls) == 4:
+                raise ConnectionError("connection reset")
+            return await list_message_ids(client, *args, **kwargs)
+
+        with mock.patch.object(AsyncGmailClient, "list_message_ids", interrupted):
+            with self.assertRaises(ConnectionError):
+                run_backfill(self.config, self.state)
+        self.assertEqual(StateStore(self.state.file_path).get(BACKFILL_SECTION)["pages"], 2)
+
+        self.server.reset_stats()
+        checkpoint = run_backfill(self.config, self.state)
+        self.assertEqual(self.list_calls(), 3)
+        self.assertEqual((checkpoint["pages"], checkpoint["messages"]), (5, 230))
+        self.assertEqual(self.written_ids(), self.expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from agent.stats import percentile
+from benchmarks.e2e import compare
+from benchmarks.mailbox import build_mailbox, generate, iter_corpus, write_corpus
+from benchmarks.replay import replay
+from benchmarks.stubs import Behavior, StubServer
+
+class TestStubServer(unittest.TestCase):
+    def test_gmail_list_paginates_and_counts(self):
+        with StubServer() as server:
+            server.set_mailbox(build_mailbox(150))
+            with urllib.request.urlopen(f"{server.url}/gmail/v1/users/me/messages") as response:
+                page = json.load(response)
+            self.assertEqual(len(page["messages"]), 100)
+            self.assertEqual(page["nextPageToken"], "100")
+
+            stats = server.stub.stats["gmail"]
+            self.assertEqual(stats.requests, 1)
+            self.assertGreater(stats.bytes_out, 0)
+
+    def test_error_injection(self):
+        with StubServer() as server:
+            server.stub.behaviors["slack"] = Behavior(error_rate=1.0, error_status=429, retry_after=7)
+            request = urllib.request.Request(f"{server.url}/api/client.counts", data=b"token=x")
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(request)
+            self.assertEqual(ctx.exception.code, 429)
+            self.assertEqual(ctx.exception.headers["Retry-After"], "7")
+            self.assertEqual(server.stub.stats["slack"].errors, 1)
+
+class TestMailboxGenerator(unittest.TestCase):
+    def test_generate_is_deterministic_and_gmail_shaped(self):
+        first = list(generate(50, seed=3))
+        self.assertEqual(first, list(generate(50, seed=3)))
+        for message in first:
+            self.assertIn("id", message)
+            self.assertIn("internalDate", message)
+            self.assertIn("headers", message["payload"])
+
+    def test_meet_messages_carry_calendar_invite(self):
+        mailbox = build_mailbox(200, meet_ratio=1.0)
+        mixed = mailbox[0]["payload"]
+        self.assertEqual(mixed["mimeType"], "multipart/mixed")
+        alternative, attachment = mixed["parts"]
+        self.assertEqual([p["mimeType"] for p in alternative["parts"]], ["text/plain", "text/html", "text/calendar"])
+        self.assertEqual(attachment["filename"], "invite.ics")
+
+    def test_corpus_round_trip_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.jsonl.gz")
+            self.assertEqual(write_corpus(path, generate(100, seed=1)), 100)
+            report = replay(iter_corpus(path), chunk_size=30)
+        self.assertEqual(report["messages"], 100)
+        self.assertGreater(report["parse_msgs_per_s"], 0)
+        self.assertIn("peak_rss_mb", report)
+
+class TestCompare(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_regressions(self):
+        baseline = {"results": [{"mailbox_size": 10, "p50_ms": 10.0, "p95_ms": 20.0, "requests_per_run": 5, "bytes_per_run": 100}]}
+        same = [{"mailbox_size": 10, "p50_ms": 12.0, "p95_ms": 20.0, "requests_per_run": 5, "bytes_per_run": 100}]
+        worse = [{"mailbox_size": 10, "p50_ms": 10.0, "p95_ms": 20.0, "requests_per_run": 7, "bytes_per_run": 100}]
+        self.assertEqual(compare(same, baseline, tolerance=0.5), [])
+        self.assertEqual(len(compare(worse, baseline, tolerance=0.5)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+from agent.async_main import create_http_client, run_once as run_once_async
+from agent.deadline import DEADLINE, Deadline
+from agent.errors import DeadlineExceeded
+from agent.main import SOURCES_CANCELLED, run_once
+from agent.notifier.manager import AsyncNotificationManager, NotificationManager
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+class TestDeadline(unittest.TestCase):
+    def test_timeouts_capped_by_budget(self):
+        deadline = Deadline()
+        self.assertEqual(deadline.timeout(10), 10)
+        with deadline.run(5):
+            self.assertLessEqual(deadline.timeout(10), 5)
+            self.assertEqual(deadline.timeout(1), 1)
+            with deadline.hold_back(5):
+                self.assertTrue(deadline.expired())
+                with self.assertRaises(DeadlineExceeded):
+                    deadline.timeout(10)
+            self.assertGreater(deadline.remaining(), 4)
+            with self.assertRaises(DeadlineExceeded):
+                deadline.check(needed=6)
+        self.assertIsNone(deadline.remaining())
+
+class TestRunDeadline(unittest.TestCase):
+    """Slack answers at once, Gmail hangs: the run ends on time and still sends the Slack alert."""
+
+    def setUp(self):
+        self.server = StubServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.set_mailbox(build_mailbox(10, meet_ratio=0.5))
+        self.server.stub.behaviors["gmail"] = Behavior(latency=3.0)
+        self.config = build_config(self.server.url)
+        self.config.run.deadline = 1.5
+        self.config.run.notify_reserve = 0.5
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_slack_alert_only(self, notify):
+        notify.assert_called_once()
+        message = notify.call_args[0][0]
+        self.assertIn("unread Slack messages", message)
+        self.assertNotIn("Google Meet", message)
+        self.assertIsNone(DEADLINE.remaining())
+
+    def test_sync_run(self):
+        manager = NotificationManager(self.config.notifications)
+        with mock.patch.object(manager, "notify", wraps=manager.notify) as notify:
+            started = time.monotonic()
+            self.assertTrue(run_once(self.config, manager))
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 1.5)
+        self.assert_slack_alert_only(notify)
+
+    def test_async_run_cancels_source(self):
+        before = SOURCES_CANCELLED.value(source="meet")
+
+        async def cycle():
+            async with create_http_client(self.config) as http:
+                manager = AsyncNotificationManager(self.config.notifications, http)
+                with mock.patch.object(manager, "notify", wraps=manager.notify) as notify:
+                    return await run_once_async(self.config, http, manager), notify
+
+        started = time.monotonic()
+        delivered, notify = asyncio.run(cycle())
+        elapsed = time.monotonic() - started
+        self.assertTrue(delivered)
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(SOURCES_CANCELLED.value(source="meet"), before + 1)
+        self.assert_slack_alert_only(notify)
+
+if __name__ == '__main__':
+    unittest.main()
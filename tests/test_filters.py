@@ -1,6 +1,6 @@
 import unittest
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from agent.mail.client import EmailMessage
 from agent.mail.filters import MeetFilter
 from agent.config.schema import MeetConfig
@@ -143,5 +143,38 @@ class TestMeetFilter(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].email_id, "1")
 
+    def test_search_terms(self):
+        config = MeetConfig(subject_keywords=["invitation", "updated invitation"], max_age_days=14, require_invite=True)
+        self.assertEqual(
+            MeetFilter(config).search_terms(),
+            '{subject:invitation subject:"updated invitation"} '
+            '{"Invitation from Google Calendar" "Join with Google Meet" "meet.google.com"} '
+            'newer_than:14d filename:invite.ics')
+        self.assertNotIn("newer_than", self.filter.search_terms())
+
+    def test_max_age_backstop(self):
+        config = MeetConfig(sender=None, subject_keywords=["invitation"], max_age_days=7)
+        emails = [
+            EmailMessage(id=str(age), sender="calendar-notification@google.com", subject="Invitation: Sync",
+                         snippet="", body="Invitation from Google Calendar", is_read=False,
+                         timestamp=datetime.now() - timedelta(days=age))
+            for age in (1, 6, 8, 30)
+        ]
+        results = MeetFilter(config).filter_and_parse(emails)
+        self.assertEqual([r.email_id for r in results], ["1", "6"])
+
+class TestServerSideFilter(unittest.TestCase):
+    def test_whole_word_keywords_are_pushed(self):
+        terms = MeetFilter(MeetConfig(subject_keywords=["invitation", "updated invitation"])).search_terms()
+        self.assertIn('{subject:invitation subject:"updated invitation"}', terms)
+
+    def test_substring_keyword_is_checked_locally(self):
+        config = MeetConfig(sender=None, subject_keywords=["Invitation:", "canceled"])
+        meet_filter = MeetFilter(config)
+        self.assertNotIn("subject:", meet_filter.search_terms())
+        email = EmailMessage(id="1", sender="calendar-notification@google.com", subject="Invitation: Standup",
+                             snippet="", body="Join with Google Meet", timestamp=datetime.now(), is_read=False)
+        self.assertEqual(len(meet_filter.filter_and_parse([email])), 1)
+
 if __name__ == '__main__':
     unittest.main()
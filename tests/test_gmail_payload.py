@@ -0,0 +1,126 @@
+import base64
+import unittest
+from unittest import mock
+from agent.config.schema import MeetConfig
+from agent.mail import gmail_payload
+from agent.mail.client import EmailMessage
+from agent.mail.filters import MeetFilter
+from agent.mail.gmail_payload import BodyBuffer, decode_into, extract_body, parse_message
+
+def b64(text, pad=True, encoding="utf-8"):
+    data = base64.urlsafe_b64encode(text.encode(encoding)).decode()
+    return data if pad else data.rstrip("=")
+
+def part(mime_type, text, **extra):
+    return {"mimeType": mime_type, "body": {"data": b64(text)}, **extra}
+
+class TestExtractBody(unittest.TestCase):
+    def test_nested_multipart_alternative(self):
+        payload = {"mimeType": "multipart/mixed", "parts": [
+            {"mimeType": "multipart/alternative", "parts": [
+                part("text/plain", "Join with Google Meet"),
+                part("text/html", "<p>Join with Google Meet</p>"),
+            ]},
+            {"mimeType": "application/ics", "filename": "invite.ics", "body": {"attachmentId": "a1", "size": 10}},
+        ]}
+        self.assertEqual(extract_body(payload), "Join with Google Meet")
+
+    def test_single_part_and_unpadded_data(self):
+        payload = {"mimeType": "text/plain", "body": {"data": b64("hello!", pad=False)}}
+        self.assertEqual(extract_body(payload), "hello!")
+
+    def test_html_only_fallback(self):
+        payload = {"mimeType": "multipart/alternative", "parts": [part("text/html", "<b>meet.google.com</b>")]}
+        self.assertEqual(extract_body(payload), "<b>meet.google.com</b>")
+
+    def test_charset_from_part_headers(self):
+        payload = {"mimeType": "text/plain",
+                   "headers": [{"name": "Content-Type", "value": 'text/plain; charset="iso-8859-1"'}],
+                   "body": {"data": b64("café", encoding="iso-8859-1")}}
+        self.assertEqual(extract_body(payload), "café")
+
+    def test_byte_cap(self):
+        payload = part("text/plain", "x" * 100_000)
+        self.assertEqual(len(extract_body(payload, max_bytes=1000)), 1000)
+
+    def test_stops_after_phrase(self):
+        text = "a" * 40_000 + "Invitation from Google Calendar" + "b" * 200_000
+        body = extract_body(part("text/plain", text), max_bytes=10**6, stop_phrases=["Invitation from Google Calendar"])
+        self.assertIn("Invitation from Google Calendar", body)
+        self.assertLess(len(body), 100_000)
+
+    def test_phrase_straddling_chunks(self):
+        buffer = BodyBuffer(max_bytes=10**6, stop_phrases=["meet.google.com"])
+        buffer.feed("see meet.goo", 12)
+        self.assertFalse(buffer.done)
+        buffer.feed("gle.com/abc", 11)
+        self.assertTrue(buffer.done)
+
+    def test_multibyte_split_across_chunks(self):
+        buffer = BodyBuffer(max_bytes=10**6)
+        text = "ü" * 20_000  # 40KB of UTF-8, spans several decode chunks
+        decode_into(b64(text), buffer)
+        self.assertEqual(buffer.getvalue(), text)
+
+class TestParseMessage(unittest.TestCase):
+    def test_snippet_fallback_and_headers(self):
+        msg = {"id": "m1", "snippet": "snip", "internalDate": "1700000000000",
+               "payload": {"mimeType": "text/plain", "headers": [
+                   {"name": "From", "value": "a@example.com"}, {"name": "Subject", "value": "Hi"}], "body": {"size": 0}}}
+        email = parse_message(msg)
+        self.assertEqual(email.sender, "a@example.com")
+        self.assertEqual(email.subject, "Hi")
+        self.assertEqual(email.body, "snip")
+
+    def message(self, subject, text):
+        return {"id": "m1", "snippet": "", "internalDate": "1700000000000",
+                "payload": {"mimeType": "text/plain", "body": {"data": b64(text)}, "headers": [
+                    {"name": "From", "value": "calendar-notification@google.com"}, {"name": "Subject", "value": subject}]}}
+
+    def test_body_decoded_once_on_access(self):
+        with mock.patch.object(gmail_payload, "decode_parts", wraps=gmail_payload.decode_parts) as decode:
+            email = parse_message(self.message("Invitation: Sync", "Join with Google Meet"))
+            self.assertFalse(email.body_loaded)
+            self.assertEqual(decode.call_count, 0)
+            self.assertEqual(email.body, "Join with Google Meet")
+            self.assertEqual(email.body, "Join with Google Meet")
+            self.assertEqual(decode.call_count, 1)
+        self.assertTrue(email.body_loaded)
+
+    def test_header_rejected_messages_are_never_decoded(self):
+        emails = [parse_message(self.message("Invitation: Sync", "Join with Google Meet")),
+                  parse_message(self.message("Lunch?", "Join with Google Meet"))]
+        self.assertEqual(len(MeetFilter(MeetConfig()).filter_and_parse(emails)), 1)
+        self.assertEqual([e.body_loaded for e in emails], [True, False])
+
+    def test_calendar_part_decoded_on_access(self):
+        msg = self.message("Lunch?", "Join with Google Meet")
+        msg["payload"] = {"mimeType": "multipart/alternative", "headers": msg["payload"]["headers"], "parts": [
+            msg["payload"], part("text/calendar", "BEGIN:VCALENDAR\r\nUID:abc\r\nEND:VCALENDAR")]}
+        with mock.patch.object(gmail_payload, "decode_parts", wraps=gmail_payload.decode_parts) as decode:
+            email = parse_message(msg)
+            self.assertEqual(MeetFilter(MeetConfig()).filter_and_parse([email]), [])
+            self.assertEqual(decode.call_count, 0)
+            self.assertFalse(email.calendar_loaded)
+            self.assertIn("UID:abc", email.calendar)
+        self.assertIsNone(parse_message(self.message("Hi", "x")).calendar)
+
+    def test_retained_payload_is_capped(self):
+        email = parse_message(self.message("Big", "x" * 100_000), max_body_bytes=1000)
+        (data, _), = email._body_loader.args[0]
+        self.assertEqual(len(data), 1336)  # 4 base64 chars per 3 bytes
+        self.assertEqual(len(email.body), 1000)
+
+class TestEmailMessage(unittest.TestCase):
+    def test_immutable_and_slotted(self):
+        email = EmailMessage(id="1", sender="a", subject="s", snippet="", body="b", timestamp=None, is_read=False)
+        with self.assertRaises(AttributeError):
+            email.body = "other"
+        self.assertFalse(hasattr(email, "__dict__"))
+        copy = email.with_body("other")
+        self.assertEqual((email.body, copy.body, copy.id), ("b", "other", "1"))
+        self.assertEqual(email, EmailMessage(id="1", sender="a", subject="s", snippet="", body_loader=lambda: "b"))
+        self.assertNotEqual(email, copy)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+from agent.errors import RateLimitedError
+from agent.mail.factory import create_email_client
+from agent.mail.filters import MeetFilter
+from agent.mail.gmail_rest_client import GmailRestClient
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+class TestGmailRestClient(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.set_mailbox(build_mailbox(40, meet_ratio=0.4))
+        self.config = build_config(self.server.url)
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, provider, fetch_threads):
+        self.config.email.provider = provider
+        self.config.meet.fetch_threads = fetch_threads
+        client = create_email_client(self.config)
+        client.connect()
+        try:
+            return client, client.get_emails(sender_filter=self.config.meet.sender)
+        finally:
+            client.close()
+
+    def test_same_emails_as_discovery_client(self):
+        for fetch_threads in (False, True):
+            _, expected = self.fetch("gmail", fetch_threads)
+            client, emails = self.fetch("gmail_rest", fetch_threads)
+            self.assertIsInstance(client, GmailRestClient)
+            self.assertTrue(emails)
+            self.assertEqual(emails, expected)
+
+    def test_acknowledge_and_rate_limits(self):
+        self.config.email.provider = "gmail_rest"
+        client = create_email_client(self.config)
+        client.connect()
+        self.addCleanup(client.close)
+        ids = [m["id"] for m in self.server.stub.mailbox[:2]]
+        client.acknowledge(ids, "label", "slack-alert-agent")
+        self.assertEqual(self.server.stub.gmail_labels, {"slack-alert-agent": "Label_1"})
+        self.assertTrue(all("Label_1" in self.server.index[i]["labelIds"] for i in ids))
+
+        self.server.stub.behaviors["gmail"] = Behavior(error_rate=1.0, error_status=429, retry_after=3)
+        with self.assertRaises(RateLimitedError) as ctx:
+            client.get_emails()
+        self.assertEqual(ctx.exception.retry_after, 3)
+
+    def test_server_filter_downloads_only_candidates(self):
+        self.server.set_mailbox(build_mailbox(60, meet_ratio=0.2))
+        results, fetched = {}, {}
+        for server_filter in (False, True):
+            self.config.meet.server_filter = server_filter
+            self.server.reset_stats()
+            _, emails = self.fetch("gmail_rest", fetch_threads=True)
+            results[server_filter] = MeetFilter(self.config.meet).filter_and_parse(emails)
+            fetched[server_filter] = self.server.stub.stats["gmail"].requests - 1  # minus threads.list
+
+        self.assertLess(fetched[True], fetched[False])
+        # build_mailbox(60, 0.2, seed=0): 17 invitation emails for 9 events.
+        self.assertEqual(len(results[True]), 9)
+        self.assertEqual(sum(len(n.email_ids) for n in results[True]), 17)
+        # One threads.get per event, covering all of its invitation emails.
+        self.assertEqual(fetched[True], 9)
+        self.assertEqual([n.email_id for n in results[True]], [n.email_id for n in results[False]])
+
+    def test_does_not_import_discovery_stack(self):
+        code = "import sys, agent.mail.gmail_rest_client; print(any(m.split('.')[0] in " \
+               "('googleapiclient', 'httplib2', 'google_auth_oauthlib') for m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(output.stdout.strip(), "False")
+
+if __name__ == '__main__':
+    unittest.main()
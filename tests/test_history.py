@@ -0,0 +1,100 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agent.main import run_once
+from agent.metrics.registry import MetricsRegistry, timed
+from agent.notifier.manager import NotificationManager
+from agent.state.history import HISTORY_SECTION, RunRecorder, append_run
+from agent.state.store import StateStore
+from agent.stats import main as stats_main, summarize
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import StubServer
+
+class TestRunRecorder(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.gmail_seconds = self.registry.histogram("agent_gmail_request_duration_seconds", "Gmail.", ["method"])
+        self.gmail_requests = self.registry.counter("agent_gmail_requests_total", "Gmail.", ["method", "outcome"])
+        self.cancelled = self.registry.counter("agent_sources_cancelled_total", "Cancelled.", ["source"])
+
+    def call(self, method, fail=False):
+        with contextlib.suppress(RuntimeError), timed(self.gmail_seconds, self.gmail_requests, method=method):
+            if fail:
+                raise RuntimeError(method)
+
+    def test_only_this_runs_calls(self):
+        self.call("oauth_refresh")  # Before the run, e.g. an earlier daemon cycle
+        recorder = RunRecorder(self.registry)
+        self.call("messages.get")
+        self.call("messages.get", fail=True)
+        self.cancelled.inc(source="slack")
+        record = recorder.finish(delivered=False, alerts=2)
+
+        stages = record["stages"]
+        self.assertEqual(sorted(stages), ["gmail.messages.get", "run", "source.slack"])
+        self.assertEqual(stages["gmail.messages.get"][1:], [2, 1])
+        self.assertEqual(stages["source.slack"], [0.0, 1, 1])
+        self.assertEqual(stages["run"][1:], [1, 1])
+        self.assertEqual((record["alerts"], record["delivered"]), (2, False))
+
+    def test_ring_buffer_and_percentiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state = StateStore(os.path.join(tmp, "state.json"))
+            for i in range(1, 101):
+                append_run(state, {"at": i, "alerts": 0, "delivered": True,
+                                   "stages": {"run": [i / 1000, 1, 0], "notify.pushover": [0.1, 1, int(i % 10 == 0)]}},
+                           size=50)
+            runs = state.get(HISTORY_SECTION)
+            self.assertEqual([r["at"] for r in runs], list(range(51, 101)))
+
+            summary = summarize(runs)
+            self.assertEqual(list(summary), ["run", "notify.pushover"])
+            self.assertEqual((summary["run"]["p50_ms"], summary["run"]["p95_ms"], summary["run"]["p99_ms"]),
+                             (75.0, 98.0, 100.0))
+            self.assertEqual(summary["notify.pushover"]["error_rate"], 0.1)
+
+            append_run(state, runs[0], size=0)
+            self.assertEqual(len(state.get(HISTORY_SECTION)), 50)
+
+class TestRunHistory(unittest.TestCase):
+    def test_runs_are_recorded_and_summarized(self):
+        with StubServer() as server, tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": server.url + "/", "GMAIL_TOKEN_URI": server.url + "/token",
+        }):
+            server.set_mailbox(build_mailbox(10, meet_ratio=0.5))
+            config = build_config(server.url)
+            config.polling.enabled = False
+            config.run.history_size = 2
+            config.run.memo_ttl = 0  # Runs minutes apart
+            path = os.path.join(tmp, "state.json")
+            state = StateStore(path)
+            manager = NotificationManager(config.notifications, state)
+            for _ in range(3):
+                self.assertTrue(run_once(config, manager, state=state))
+
+            runs = StateStore(path).get(HISTORY_SECTION)
+            self.assertEqual(len(runs), 2)
+            stages = runs[-1]["stages"]
+            for stage in ("run", "source.slack", "source.meet", "gmail.oauth_refresh", "notify.pushover"):
+                self.assertIn(stage, stages)
+            self.assertTrue(runs[-1]["alerts"])
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(stats_main(["--state", path, "--json"]), 0)
+            report = json.loads(output.getvalue())
+            self.assertEqual(report["runs"], 2)
+            self.assertEqual(report["stages"]["notify.pushover"]["error_rate"], 0.0)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(stats_main(["--state", os.path.join(tmp, "missing.json")]), 1)
+                self.assertEqual(stats_main(["--state", path, "--runs", "1"]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from agent.config.schema import MeetConfig
+from agent.mail.client import EmailMessage
+from agent.mail.filters import MeetFilter
+from agent.mail.ics import parse_event
+
+def ics(uid, sequence, start, method="REQUEST", status="CONFIRMED"):
+    return "\r\n".join([
+        "BEGIN:VCALENDAR", f"METHOD:{method}", "BEGIN:VEVENT",
+        f"DTSTART:{start:%Y%m%dT%H%M%SZ}", f"DTEND:{start + timedelta(hours=1):%Y%m%dT%H%M%SZ}",
+        f"UID:{uid}", f"SEQUENCE:{sequence}", f"STATUS:{status}",
+        "BEGIN:VALARM", "UID:alarm", "END:VALARM", "END:VEVENT", "END:VCALENDAR",
+    ])
+
+class TestParseEvent(unittest.TestCase):
+    def test_fields(self):
+        event = parse_event(
+            "BEGIN:VCALENDAR\r\nMETHOD:CANCEL\r\nBEGIN:VEVENT\r\n"
+            "DTSTART;TZID=Europe/Kyiv:20240115T100000\r\nDTEND;VALUE=DATE:20240116\r\n"
+            "UID:abc123@goo\r\n gle.com\r\nSEQUENCE:3\r\n"
+            "BEGIN:VALARM\r\nSEQUENCE:9\r\nEND:VALARM\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n")
+        self.assertEqual(event.uid, "abc123@google.com")
+        self.assertEqual(event.sequence, 3)
+        self.assertEqual(event.start, datetime(2024, 1, 15, 8, tzinfo=timezone.utc))
+        self.assertEqual(event.end, datetime(2024, 1, 16, tzinfo=timezone.utc))
+        self.assertTrue(event.cancelled)
+        self.assertTrue(event.is_over())
+
+    def test_no_event(self):
+        self.assertIsNone(parse_event("BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n"))
+
+class TestEventGrouping(unittest.TestCase):
+    def setUp(self):
+        self.filter = MeetFilter(MeetConfig(sender=None, subject_keywords=["invitation", "canceled"]))
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def email(self, email_id, subject, calendar, minutes_ago):
+        return EmailMessage(id=email_id, sender="calendar-notification@google.com", subject=subject, snippet="",
+                            body="Invitation from Google Calendar", calendar=calendar,
+                            timestamp=datetime.now() - timedelta(minutes=minutes_ago))
+
+    def test_latest_state_per_event(self):
+        start = self.now + timedelta(days=1)
+        emails = [
+            self.email("1", "Invitation: Sync", ics("sync", 0, start), 30),
+            self.email("2", "Updated invitation: Sync", ics("sync", 2, start + timedelta(hours=1)), 20),
+            # Delivered late, but older than the update it follows.
+            self.email("3", "Updated invitation: Sync", ics("sync", 1, start), 10),
+            self.email("4", "Invitation: Review", ics("review", 0, start), 5),
+            self.email("5", "Canceled: Review", ics("review", 1, start, method="CANCEL"), 1),
+            self.email("6", "Invitation: Retro", ics("retro", 0, self.now - timedelta(days=1)), 1),
+            self.email("7", "Invitation: Plain", None, 1),
+        ]
+        results = {n.email_id: n for n in self.filter.filter_and_parse(emails)}
+
+        self.assertEqual(sorted(results), ["2", "5", "7"])
+        self.assertEqual(sorted(results["2"].email_ids), ["1", "2", "3"])
+        self.assertEqual(results["2"].event.start, start + timedelta(hours=1))
+        self.assertEqual(results["5"].status, "cancelled")
+        self.assertEqual(results["5"].email_ids, ["5", "4"])
+
+    def test_grouping_disabled(self):
+        start = self.now - timedelta(days=1)
+        emails = [self.email(str(s), "Invitation: Sync", ics("sync", s, start), 10 - s) for s in range(3)]
+        config = MeetConfig(sender=None, subject_keywords=["invitation"], group_by_event=False, skip_past_events=False)
+        self.assertEqual(len(MeetFilter(config).filter_and_parse(emails)), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+import os
+import re
+import select
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage as MimeMessage
+from agent.config.schema import AppConfig, EmailConfig, ImapConfig, MeetConfig
+from agent.mail.factory import only_unread
+from agent.mail.filters import MeetFilter
+from agent.mail.imap_client import ImapClient
+from agent.state.store import StateStore
+
+
+def build_raw(sender, subject, body):
+    msg = MimeMessage()
+    msg["From"] = sender
+    msg["Subject"] = subject
+    msg["Date"] = "Mon, 01 Jan 2024 10:00:00 +0000"
+    msg.set_content(body)
+    return msg.as_bytes()
+
+
+class FakeImapHandler(socketserver.StreamRequestHandler):
+    """Just enough IMAP4rev1 + IDLE for ImapClient."""
+
+    def send(self, text):
+        self.wfile.write(text if isinstance(text, bytes) else text.encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections.append(self.connection)
+        self.send("* OK [CAPABILITY IMAP4rev1 IDLE] Fake IMAP ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            server.commands.append(f"{command} {args}".strip())
+            if command == "CAPABILITY":
+                self.send(f"* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK done\r\n")
+            elif command == "LOGIN":
+                self.send(f"{tag} OK logged in\r\n")
+            elif command == "SELECT":
+                with server.lock:
+                    self.known = len(server.messages)
+                self.send(f"* {self.known} EXISTS\r\n* OK [UIDVALIDITY {server.uidvalidity}] ok\r\n"
+                          f"* OK [UIDNEXT {server.next_uid}] ok\r\n{tag} OK [READ-WRITE] done\r\n")
+            elif command == "UID":
+                self.uid_command(tag, args)
+            elif command == "IDLE":
+                if not self.idle(tag):
+                    return
+            elif command == "LOGOUT":
+                self.send(f"* BYE\r\n{tag} OK bye\r\n")
+                return
+            else:
+                self.send(f"{tag} OK done\r\n")
+
+    def uid_command(self, tag, args):
+        server = self.server
+        sub, _, rest = args.partition(" ")
+        with server.lock:
+            messages = list(server.messages)
+        if sub.upper() == "SEARCH":
+            matches = messages
+            if "UNSEEN" in rest:
+                matches = [m for m in matches if "\\Seen" not in m["flags"]]
+            sender = re.search(r'FROM "([^"]*)"', rest)
+            if sender:
+                matches = [m for m in matches if sender.group(1) in m["from"]]
+            since = re.search(r"SINCE (\S+)", rest)
+            if since:
+                day = datetime.strptime(since.group(1), "%d-%b-%Y").date()
+                matches = [m for m in matches if m["received"] >= day]
+            self.send(f"* SEARCH {' '.join(str(m['uid']) for m in matches)}\r\n{tag} OK done\r\n")
+        elif sub.upper() == "FETCH":
+            uid_set, _, query = rest.partition(" ")
+            wanted = {int(u) for u in uid_set.split(",")}
+            for seq, m in enumerate(messages, 1):
+                if m["uid"] not in wanted:
+                    continue
+                if "HEADER.FIELDS" in query:
+                    literal = m["raw"].split(b"\n\n")[0] + b"\r\n\r\n"
+                    flags = " ".join(m["flags"])
+                    head = (f'* {seq} FETCH (UID {m["uid"]} FLAGS ({flags}) INTERNALDATE "01-Jan-2024 10:00:00 +0000" '
+                            f'BODY[HEADER.FIELDS (FROM SUBJECT DATE MESSAGE-ID)] {{{len(literal)}}}\r\n')
+                else:
+                    literal = m["raw"]
+                    head = f'* {seq} FETCH (UID {m["uid"]} BODY[]<0> {{{len(literal)}}}\r\n'
+                server.fetches.append((m["uid"], "headers" if "HEADER.FIELDS" in query else "body"))
+                self.send(head.encode() + literal + b")\r\n")
+            self.send(f"{tag} OK done\r\n")
+        elif sub.upper() == "STORE":
+            uid_set = rest.split(" ")[0]
+            with server.lock:
+                for m in server.messages:
+                    if str(m["uid"]) in uid_set.split(","):
+                        m["flags"].add("\\Seen")
+            self.send(f"{tag} OK done\r\n")
+
+    def idle(self, tag):
+        self.send("+ idling\r\n")
+        while True:
+            with self.server.lock:
+                count = len(self.server.messages)
+            if count > self.known:
+                self.known = count
+                self.send(f"* {count} EXISTS\r\n")
+            ready, _, _ = select.select([self.connection], [], [], 0.02)
+            if ready:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    self.send(f"{tag} OK IDLE terminated\r\n")
+                    return True
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeImapHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.commands = []
+        self.fetches = []
+        self.connections = []
+        self.uidvalidity = 1
+        self.next_uid = 1
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def deliver(self, sender, subject, body, seen=False, received=None):
+        with self.lock:
+            self.messages.append({"uid": self.next_uid, "from": sender, "flags": {"\\Seen"} if seen else set(),
+                                  "raw": build_raw(sender, subject, body), "received": received or date.today()})
+            self.next_uid += 1
+
+    def drop_connections(self):
+        with self.lock:
+            for conn in self.connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.connections = []
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class TestImapClient(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeImapServer()
+        self.server.deliver("calendar-notification@google.com", "Invitation: Standup", "Join with Google Meet")
+        self.server.deliver("news@example.com", "Weekly digest", "lorem ipsum")
+        self.config = config = ImapConfig(host="127.0.0.1", port=self.server.server_address[1], use_ssl=False,
+                            username="me", password="secret", timeout=5, reconnect_initial_delay=0.01)
+        self.meet_filter = MeetFilter(MeetConfig(sender=None, subject_keywords=["invitation"]))
+        self.client = ImapClient(config, header_filter=self.meet_filter.matches_headers)
+        self.client.connect()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_headers_first_and_bodies_on_demand(self):
+        emails = self.client.get_emails()
+        self.assertEqual([e.subject for e in emails], ["Invitation: Standup", "Weekly digest"])
+        # Only the email passing the header filter had its body downloaded.
+        self.assertEqual(self.server.fetches, [(1, "headers"), (2, "headers"), (1, "body")])
+        self.assertIn("Join with Google Meet", emails[0].body)
+        self.assertEqual(len(self.meet_filter.filter_and_parse(emails)), 1)
+
+    def test_only_new_uids_fetched(self):
+        self.client.get_emails()
+        self.server.fetches.clear()
+        self.server.deliver("x@example.com", "Invitation: Retro", "meet.google.com/abc")
+
+        emails = self.client.get_emails()
+        self.assertEqual(len(emails), 3)
+        self.assertEqual(self.server.fetches, [(3, "headers"), (3, "body")])
+
+    def test_sender_and_unread_criteria(self):
+        self.server.deliver("calendar-notification@google.com", "Invitation: Old", "x", seen=True)
+        emails = self.client.get_emails(sender_filter="calendar-notification@google.com", only_unread=True)
+        self.assertEqual([e.id for e in emails], ["1"])
+
+    def test_label_acknowledgement_falls_back_to_read(self):
+        config = AppConfig(email=EmailConfig(provider="imap"), meet=MeetConfig(acknowledge="label"))
+        self.assertTrue(only_unread(config))
+        self.client.acknowledge(["1"], config.meet.acknowledge, config.meet.ack_label)
+        emails = self.client.get_emails(only_unread=only_unread(config))
+        self.assertEqual([e.id for e in emails], ["2"])
+
+    def test_idle_wakes_on_new_mail(self):
+        threading.Timer(0.2, self.server.deliver, ("a@example.com", "Invitation: Now", "meet.google.com")).start()
+        started = time.monotonic()
+        self.assertTrue(self.client.wait_for_changes(timeout=5))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIn("IDLE", self.server.commands)
+
+    def test_without_idle_sleeps_and_reports_no_change(self):
+        self.client.conn.capabilities = ("IMAP4REV1",)
+        self.assertFalse(self.client.wait_for_changes(timeout=0.1))
+        self.assertNotIn("IDLE", self.server.commands)
+
+    def test_idle_times_out_without_mail(self):
+        self.assertFalse(self.client.wait_for_changes(timeout=0.3))
+        # The connection is still usable afterwards.
+        self.assertEqual(len(self.client.get_emails()), 2)
+
+    def test_reconnects_after_connection_loss(self):
+        self.client.get_emails()
+        self.server.drop_connections()
+        self.server.deliver("a@example.com", "Invitation: After drop", "meet.google.com")
+        emails = self.client.get_emails()
+        self.assertEqual(len(emails), 3)
+        self.assertEqual(self.server.commands.count("LOGIN me \"secret\""), 2)
+
+    def test_mark_as_read(self):
+        self.client.mark_as_read(["1"])
+        self.assertEqual([e.id for e in self.client.get_emails(only_unread=True)], ["2"])
+
+    def test_since_limits_search(self):
+        self.server.deliver("a@example.com", "Invitation: Old", "x", received=date.today() - timedelta(days=30))
+        client = ImapClient(self.config, header_filter=self.meet_filter.matches_headers, since_days=7)
+        client.connect()
+        self.addCleanup(client.close)
+        self.assertEqual([e.id for e in client.get_emails()], ["1", "2"])
+        self.assertTrue(any("SINCE" in c for c in self.server.commands))
+
+    def test_persisted_scan_skips_scanned_uids(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        state = StateStore(os.path.join(tmp.name, "state.json"))
+
+        def one_shot(scope="meet"):
+            client = ImapClient(self.config, header_filter=self.meet_filter.matches_headers, state=state, scope=scope)
+            client.connect()
+            try:
+                return client.get_emails()
+            finally:
+                client.close()
+
+        one_shot()
+        self.server.fetches.clear()
+        self.server.deliver("x@example.com", "Invitation: Retro", "meet.google.com/abc")
+
+        # Only the new UID's headers are fetched; the earlier invitation comes from state.
+        emails = one_shot()
+        self.assertEqual([e.id for e in emails], ["1", "3"])
+        self.assertEqual(self.server.fetches, [(3, "headers"), (1, "body"), (3, "body")])
+        self.assertIn("Join with Google Meet", emails[0].body)
+
+        # Changed filter settings start over.
+        self.server.fetches.clear()
+        one_shot(scope="other")
+        self.assertIn((2, "headers"), self.server.fetches)
+
+    def test_drain_keeps_partial_line(self):
+        class Conn:
+            def __init__(self, chunks):
+                self.chunks = list(chunks)
+
+            def readline(self):
+                chunk = self.chunks.pop(0)
+                if chunk is None:
+                    raise BlockingIOError
+                return chunk
+
+        self.client.conn = Conn([b"* 3 EXI", None, b"STS\r\n", None])
+        self.assertEqual(self.client._drain_lines(), (True, False))
+        self.assertEqual(self.client._drain_lines(), (True, True))
+
+if __name__ == '__main__':
+    unittest.main()
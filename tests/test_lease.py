@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agent.main import run_once
+from agent.notifier.manager import NotificationManager
+from agent.state.lease import Lease
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import StubServer
+
+class TestLease(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.now = 1000.0
+        path = os.path.join(self.dir, "state.lease")
+        self.a = Lease(path, "a", ttl=60, clock=lambda: self.now)
+        self.b = Lease(path, "b", ttl=60, clock=lambda: self.now)
+
+    def test_one_holder_and_fencing_tokens(self):
+        self.assertTrue(self.a.acquire())
+        self.assertFalse(self.b.acquire())
+        self.now += 50
+        self.assertTrue(self.a.acquire())  # Renewed, same token
+        self.assertEqual(self.a.token, 1)
+
+        self.now += 61
+        self.assertFalse(self.a.held())
+        self.assertTrue(self.b.acquire())
+        self.assertEqual(self.b.token, 2)
+        self.assertFalse(self.a.acquire())
+
+        self.b.release()
+        self.assertTrue(self.a.acquire())
+        self.assertEqual(self.a.token, 3)
+
+    def test_stale_leader_cannot_overwrite_state(self):
+        path = os.path.join(self.dir, "state.json")
+        old, new = StateStore(path), StateStore(path)
+        old.fencing_token, new.fencing_token = 1, 2
+        old.set("slack", {"writer": "old"})
+        old.save()
+        new.set("slack", {"writer": "new"})
+        new.save()
+        old.save()
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual((data["fencing_token"], data["sections"]["slack"]), (2, {"writer": "new"}))
+        self.assertEqual(os.listdir(self.dir), ["state.json"])
+
+class TestReplicas(unittest.TestCase):
+    def test_only_the_leader_pages(self):
+        with StubServer() as server, tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": server.url + "/", "GMAIL_TOKEN_URI": server.url + "/token",
+        }):
+            server.set_mailbox(build_mailbox(20, meet_ratio=0.5))
+            config = build_config(server.url)
+            config.polling.enabled = False
+            config.meet.acknowledge = "read"
+            config.run.memo_ttl = 0  # Runs minutes apart
+            replicas = []
+            for name in ("a", "b"):
+                state = StateStore(os.path.join(tmp, "state.json"))
+                lease = Lease(os.path.join(tmp, "state.lease"), name, ttl=60)
+                replicas.append((NotificationManager(config.notifications, state), state, lease))
+
+            for manager, state, lease in replicas + replicas:
+                self.assertTrue(run_once(config, manager, state=state, lease=lease))
+            # Leader runs page (Slack stays unread); the Meet emails are acknowledged once.
+            self.assertEqual(server.stub.stats["pushover"].requests, 2)
+            self.assertEqual(server.stub.stats["gmail"].paths.get("/gmail/v1/users/me/messages/batchModify"), 1)
+
+            # The leader goes away; the standby takes over on its next run.
+            replicas[0][2].release()
+            server.reset_stats()
+            manager, state, lease = replicas[1]
+            self.assertTrue(run_once(config, manager, state=state, lease=lease))
+            self.assertEqual((lease.token, server.stub.stats["pushover"].requests), (2, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import logging
+import unittest
+from agent.logs.setup import JsonFormatter, LazyQueueHandler, RateLimitFilter
+
+def make_record(msg, *args, name="agent.test", level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_formats_lazy_args_and_extra(self):
+        record = make_record("Matched %d of %d", 2, 10)
+        record.source = "meet"
+        payload = json.loads(JsonFormatter().format(record))
+        self.assertEqual(payload["message"], "Matched 2 of 10")
+        self.assertEqual(payload["level"], "INFO")
+        self.assertEqual(payload["logger"], "agent.test")
+        self.assertEqual(payload["source"], "meet")
+
+class TestRateLimitFilter(unittest.TestCase):
+    def test_drops_repeats_and_reports_suppressed(self):
+        limiter = RateLimitFilter(per_minute=2, window=60.0)
+        passed = [limiter.filter(make_record("Identified %s", i)) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+
+        # A new window lets the next record through and reports what was dropped.
+        for group in limiter._groups.values():
+            group[0] -= 61
+        record = make_record("Identified %s", 99)
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_templates_and_warnings_not_limited(self):
+        limiter = RateLimitFilter(per_minute=1)
+        self.assertTrue(limiter.filter(make_record("A %s", 1)))
+        self.assertTrue(limiter.filter(make_record("B %s", 1)))
+        self.assertFalse(limiter.filter(make_record("A %s", 2)))
+        self.assertTrue(limiter.filter(make_record("A %s", 3, level=logging.WARNING)))
+
+    def test_expired_groups_are_dropped(self):
+        limiter = RateLimitFilter(per_minute=1, window=60.0)
+        limiter.filter(make_record("Quiet %s", 1))
+        for i in range(2):
+            limiter.filter(make_record("Busy %s", i))
+        for group in limiter._groups.values():
+            group[0] -= 61
+        limiter._last_sweep -= 61
+
+        self.assertTrue(limiter.filter(make_record("Other %s", 1)))
+        # "Busy" keeps its suppressed count for its next record.
+        self.assertEqual({key[1] for key in limiter._groups}, {"Busy %s", "Other %s"})
+
+    def test_per_logger_override(self):
+        limiter = RateLimitFilter(per_minute=100, overrides={"agent.mail": 1})
+        self.assertTrue(limiter.filter(make_record("x", name="agent.mail.filters")))
+        self.assertFalse(limiter.filter(make_record("x", name="agent.mail.filters")))
+        self.assertTrue(limiter.filter(make_record("x", name="agent.slack.client")))
+        self.assertTrue(limiter.filter(make_record("x", name="agent.slack.client")))
+
+class TestLazyQueueHandler(unittest.TestCase):
+    def test_renders_mutable_args_eagerly(self):
+        handler = LazyQueueHandler(None)
+        ids = ["a"]
+        record = handler.prepare(make_record("Acknowledged %s", ids))
+        ids.append("b")
+        self.assertEqual(record.getMessage(), "Acknowledged ['a']")
+
+        record = handler.prepare(make_record("Matched %d of %s", 2, "ten"))
+        self.assertEqual(record.args, (2, "ten"))
+
+if __name__ == '__main__':
+    unittest.main()
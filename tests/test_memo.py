@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agent.main import run_once
+from agent.memo import ResultMemo
+from agent.notifier.manager import NotificationManager
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import StubServer
+
+class TestResultMemo(unittest.TestCase):
+    def setUp(self):
+        self.config = build_config("http://localhost")
+        self.now = 1000.0
+        self.memo = ResultMemo(self.config, clock=lambda: self.now)
+
+    def test_reused_within_ttl_and_same_settings(self):
+        self.memo.remember("meet", ["Found 1 Google Meet events: Sync"], ["m1"])
+        self.now += 59
+        self.assertEqual(self.memo.recall("meet")["matched"], ["m1"])
+        self.assertIsNone(self.memo.recall("slack"))
+
+        self.config.meet.subject_keywords = ["invitation"]
+        self.assertIsNone(self.memo.recall("meet"))
+        self.config.meet.subject_keywords = ["invitation", "canceled", "updated"]
+        self.now += 1
+        self.assertIsNone(self.memo.recall("meet"))
+
+    def test_duplicate_alerts(self):
+        self.memo.sent("alert")
+        self.now += 30
+        self.assertTrue(self.memo.already_sent("alert"))
+        self.assertFalse(self.memo.already_sent("another alert"))
+        self.now += 30
+        self.assertFalse(self.memo.already_sent("alert"))
+
+class TestDuplicateTriggers(unittest.TestCase):
+    def test_second_run_reuses_the_first(self):
+        with StubServer() as server, tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": server.url + "/", "GMAIL_TOKEN_URI": server.url + "/token",
+        }):
+            server.set_mailbox(build_mailbox(10, meet_ratio=0.5))
+            config = build_config(server.url)
+            config.polling.enabled = False
+            config.meet.acknowledge = "label"
+            path = os.path.join(tmp, "state.json")
+
+            def trigger():
+                # Each trigger is a fresh process reading the state file.
+                state = StateStore(path)
+                return run_once(config, NotificationManager(config.notifications, state), state=state)
+
+            self.assertTrue(trigger())
+            self.assertEqual(server.stub.stats["pushover"].requests, 1)
+            self.assertEqual(server.stub.stats["gmail"].paths.get("/gmail/v1/users/me/messages/batchModify"), 1)
+
+            server.reset_stats()
+            self.assertTrue(trigger())
+            self.assertEqual({name: stats.requests for name, stats in server.stub.stats.items() if stats.requests}, {})
+
+            # A new alert within the ttl still goes out.
+            server.stub.slack_badges = {"channels": 0, "dms": 7, "thread_mentions": 0}
+            config.slack.max_mentions = 1
+            self.assertTrue(trigger())
+            self.assertEqual(server.stub.stats["pushover"].requests, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import urllib.request
+from agent.metrics.registry import MetricsRegistry, timed
+from agent.metrics.server import start_metrics_server
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge_render(self):
+        counter = self.registry.counter("agent_test_total", "Test counter.", ["source"])
+        counter.inc(source="slack")
+        counter.inc(2, source="slack")
+        gauge = self.registry.gauge("agent_test_unread", "Test gauge.")
+        gauge.set(5)
+
+        text = self.registry.render()
+        self.assertIn("# TYPE agent_test_total counter", text)
+        self.assertIn('agent_test_total{source="slack"} 3.0', text)
+        self.assertIn("agent_test_unread 5.0", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = self.registry.histogram("agent_test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+        hist.observe(0.05)
+        hist.observe(0.5)
+        hist.observe(3.0)
+
+        text = self.registry.render()
+        self.assertIn('agent_test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('agent_test_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('agent_test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("agent_test_seconds_count 3", text)
+        self.assertAlmostEqual(hist.sum(), 3.55)
+
+    def test_timed_counts_errors(self):
+        hist = self.registry.histogram("agent_call_seconds", "Calls.", ["method"])
+        counter = self.registry.counter("agent_calls_total", "Calls.", ["method", "outcome"])
+
+        with timed(hist, counter, method="get"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with timed(hist, counter, method="get"):
+                raise RuntimeError("boom")
+
+        self.assertEqual(hist.count(method="get"), 2)
+        self.assertEqual(counter.value(method="get", outcome="ok"), 1)
+        self.assertEqual(counter.value(method="get", outcome="error"), 1)
+
+    def test_label_mismatch_rejected(self):
+        counter = self.registry.counter("agent_labels_total", "Labels.", ["source"])
+        with self.assertRaises(ValueError):
+            counter.inc(notifier="pushover")
+
+    def test_http_endpoint(self):
+        self.registry.counter("agent_http_total", "HTTP.").inc()
+        server = start_metrics_server(0, host="127.0.0.1", registry=self.registry)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode()
+                self.assertIn("text/plain", response.headers["Content-Type"])
+            self.assertIn("agent_http_total 1.0", body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+import unittest
+from email.utils import formatdate
+from unittest import mock
+from agent.config.schema import PollingConfig
+from agent.errors import RateLimitedError, parse_retry_after
+from agent.main import run_once
+from agent.mail.gmail_client import GmailClient
+from agent.notifier.manager import NotificationManager
+from agent.polling import PollController
+from agent.slack.client import SlackSessionClient
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestPollController(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.config = PollingConfig(enabled=True, min_interval=60, max_interval=480, backoff=2.0, tolerance=10)
+        self.controller = PollController(self.config, {}, clock=self.clock)
+
+    def test_idle_backs_off_and_activity_tightens(self):
+        intervals = []
+        for _ in range(5):
+            self.controller.record("slack", active=False)
+            intervals.append(self.controller.state["slack"]["interval"])
+        self.assertEqual(intervals, [120, 240, 480, 480, 480])
+
+        self.controller.record("slack", active=True)
+        self.assertEqual(self.controller.state["slack"]["interval"], 60)
+
+    def test_due_respects_schedule_with_tolerance(self):
+        self.assertTrue(self.controller.is_due("meet"))
+        self.controller.record("meet", active=False)  # next due in 120s
+        self.clock.now += 100
+        self.assertFalse(self.controller.is_due("meet"))
+        self.clock.now += 15  # 5s early, within tolerance
+        self.assertTrue(self.controller.is_due("meet"))
+
+    def test_retry_after_is_obeyed_exactly(self):
+        self.controller.record_rate_limited("slack", 37)
+        self.controller.wake("slack")  # Waking does not override the server
+        self.clock.now += 36.9
+        self.assertFalse(self.controller.is_due("slack"))
+        self.clock.now += 0.1
+        self.assertTrue(self.controller.is_due("slack"))
+
+    def test_rate_limit_without_header_backs_off(self):
+        self.controller.record_rate_limited("slack", None)
+        self.assertEqual(self.controller.state["slack"]["interval"], 120)
+        self.assertEqual(self.controller.seconds_until_next(["slack"]), 120)
+
+    def test_disabled_is_always_due(self):
+        controller = PollController(PollingConfig(enabled=False), {}, clock=self.clock)
+        controller.record_rate_limited("slack", 100)
+        self.assertTrue(controller.is_due("slack"))
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        in_a_minute = parse_retry_after(formatdate(time.time() + 60, usegmt=True))
+        self.assertTrue(55 <= in_a_minute <= 61)
+
+class TestRateLimitedClients(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.set_mailbox(build_mailbox(5))
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_slack_429_carries_retry_after(self):
+        self.server.stub.behaviors["slack"] = Behavior(error_rate=1.0, error_status=429, retry_after=30)
+        with self.assertRaises(RateLimitedError) as ctx:
+            SlackSessionClient("xoxc", "xoxd", self.server.url).get_unread_count()
+        self.assertEqual(ctx.exception.retry_after, 30)
+
+    def test_gmail_429_carries_retry_after(self):
+        client = GmailClient()
+        client.connect()
+        self.server.stub.behaviors["gmail"] = Behavior(error_rate=1.0, error_status=429, retry_after=12)
+        with self.assertRaises(RateLimitedError) as ctx:
+            client.get_emails()
+        self.assertEqual(ctx.exception.retry_after, 12)
+
+    def test_run_once_skips_rate_limited_source_until_retry_after(self):
+        config = build_config(self.server.url)
+        config.polling.enabled = True
+        manager = NotificationManager(config.notifications)
+        self.server.stub.behaviors["slack"] = Behavior(error_rate=1.0, error_status=429, retry_after=600)
+        with tempfile.TemporaryDirectory() as tmp:
+            state = StateStore(os.path.join(tmp, "state.json"))
+            run_once(config, manager, state=state)
+            self.assertEqual(self.server.stub.stats["slack"].requests, 1)
+
+            # Next run (e.g. the next cron trigger, state reloaded from disk) leaves Slack alone.
+            self.server.reset_stats()
+            run_once(config, manager, state=StateStore(state.file_path))
+        self.assertEqual(self.server.stub.stats["slack"].requests, 0)
+        # Meet was checked a moment ago and is not due again yet either.
+        self.assertEqual(self.server.stub.stats["gmail"].requests, 0)
+
+if __name__ == '__main__':
+    unittest.main()
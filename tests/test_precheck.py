@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agent.main import MEET_SECTION, check_meet
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import StubServer
+
+PROFILE_PATH = "/gmail/v1/users/me/profile"
+
+class TestPrecheck(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.set_mailbox(build_mailbox(20, meet_ratio=0.5))
+        self.config = build_config(self.server.url)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state = StateStore(os.path.join(tmp.name, "state.json"))
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self):
+        self.server.reset_stats()
+        matched = []
+        alerts = check_meet(self.config, matched=matched, state=self.state)
+        return alerts, sorted(matched), dict(self.server.stub.stats["gmail"].paths)
+
+    def test_unchanged_mailbox_skips_the_scan(self):
+        alerts, matched, paths = self.check()
+        self.assertTrue(alerts)
+        self.assertGreater(sum(paths.values()), 2)
+
+        self.assertEqual(self.check(), (alerts, matched, {PROFILE_PATH: 1}))
+
+        # Any change to the mailbox (here an acknowledgement) moves the historyId.
+        self.server.stub.gmail_history_id += 1
+        again, again_matched, paths = self.check()
+        self.assertEqual((again, again_matched), (alerts, matched))
+        self.assertGreater(sum(paths.values()), 2)
+
+    def test_rescans_when_an_event_ends_or_settings_change(self):
+        self.check()
+        self.state.sections[MEET_SECTION]["valid_until"] = 0
+        self.assertGreater(sum(self.check()[2].values()), 1)
+
+        self.config.meet.subject_keywords = ["nothing matches this"]
+        alerts, matched, paths = self.check()
+        self.assertEqual((alerts, matched), ([], []))
+        self.assertGreater(sum(paths.values()), 1)
+
+    def test_disabled(self):
+        self.config.meet.precheck = False
+        self.check()
+        self.assertNotIn(PROFILE_PATH, self.check()[2])
+        self.assertNotIn(MEET_SECTION, self.state.sections)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+from agent.main import run_once
+from agent.notifier.manager import NotificationManager
+from agent.profiling import PROFILE_ENV, Profiler, profile_dir, profiled
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+class TestProfiler(unittest.TestCase):
+    def test_run_writes_reports(self):
+        with StubServer() as server, tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": server.url + "/", "GMAIL_TOKEN_URI": server.url + "/token",
+        }):
+            server.set_mailbox(build_mailbox(20, meet_ratio=0.5))
+            server.stub.behaviors["gmail"] = Behavior(latency=0.02)
+            config = build_config(server.url)
+            out = os.path.join(tmp, "profile")
+            with Profiler(out, top_allocations=5):
+                run_once(config, NotificationManager(config.notifications))
+
+            self.assertEqual(sorted(os.listdir(out)),
+                             ["allocations.txt", "profile.folded", "profile.pstats", "summary.txt"])
+            stats = pstats.Stats(os.path.join(out, "profile.pstats"))
+            self.assertTrue(any(func[2] == "check_meet" for func in stats.stats))
+
+            with open(os.path.join(out, "profile.folded")) as f:
+                folded = f.read().splitlines()
+            self.assertTrue(folded)
+            self.assertTrue(all(int(line.rsplit(" ", 1)[1]) > 0 for line in folded))
+            # The stub server's threads are sampled too; the agent's own work is on MainThread.
+            self.assertTrue(any(line.startswith("MainThread;") and "main.py:check_meet" in line for line in folded))
+
+            with open(os.path.join(out, "allocations.txt")) as f:
+                allocations = f.read().splitlines()
+            self.assertTrue(allocations[0].startswith("Peak traced memory:"))
+            self.assertEqual(len([l for l in allocations if " KiB in " in l and l.strip()[0].isdigit()]), 5)
+
+            with open(os.path.join(out, "summary.txt")) as f:
+                summary = f.read()
+            self.assertIn("agent_source_duration_seconds{source=meet}", summary)
+            self.assertIn("cumulative", summary)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_disabled_is_a_no_op(self):
+        with mock.patch.dict(os.environ, {PROFILE_ENV: ""}):
+            self.assertIsNone(profile_dir(None))
+            with profiled(profile_dir(None)) as profiler:
+                self.assertIsNone(profiler)
+                self.assertFalse(tracemalloc.is_tracing())
+        with mock.patch.dict(os.environ, {PROFILE_ENV: "out"}):
+            self.assertEqual(profile_dir(None), "out")
+            self.assertEqual(profile_dir("cli"), "cli")
+
+if __name__ == '__main__':
+    unittest.main()
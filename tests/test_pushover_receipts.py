@@ -0,0 +1,154 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import httpx
+from agent.main import run_once
+from agent.notifier.manager import NotificationManager
+from agent.notifier.pushover import RECEIPT_SECTION, AsyncPushoverNotifier, PushoverNotifier
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+class TestPushoverReceipts(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.addCleanup(self.server.stop)
+        self.config = build_config(self.server.url)
+        self.config.notifications.pushover.priority = 2
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state = StateStore(os.path.join(tmp.name, "state.json"))
+
+    def receipt_polls(self):
+        return sum(n for path, n in self.server.stub.stats["pushover"].paths.items()
+                   if path.startswith("/1/receipts/") and not path.endswith("/cancel.json"))
+
+    def test_suppresses_repages_and_cancels(self):
+        receipts = self.server.stub.pushover_receipts
+        notifier = PushoverNotifier(self.config.notifications.pushover, self.state)
+
+        self.assertTrue(notifier.notify("meeting"))
+        self.assertEqual(self.state.get(RECEIPT_SECTION)["receipt"], "r1")
+
+        # Still ringing, then acknowledged a minute ago: no new page either time.
+        self.assertTrue(notifier.notify("meeting"))
+        receipts["r1"]["acknowledged_at"] = int(time.time()) - 60
+        self.assertTrue(notifier.notify("meeting"))
+        self.assertEqual(list(receipts), ["r1"])
+        self.assertEqual(self.receipt_polls(), 2)
+
+        # Acknowledged longer ago than ack_quiet_period: page again.
+        receipts["r1"]["acknowledged_at"] = int(time.time()) - 7200
+        self.assertTrue(notifier.notify("meeting"))
+        self.assertEqual(list(receipts), ["r1", "r2"])
+
+        notifier.resolve()
+        self.assertTrue(receipts["r2"]["cancelled"])
+        self.assertEqual(self.state.get(RECEIPT_SECTION), {})
+        requests_before = self.server.stub.stats["pushover"].requests
+        notifier.resolve()
+        self.assertEqual(self.server.stub.stats["pushover"].requests, requests_before)
+
+    def test_failed_cancel_keeps_receipt(self):
+        receipts = self.server.stub.pushover_receipts
+        notifier = PushoverNotifier(self.config.notifications.pushover, self.state)
+        self.assertTrue(notifier.notify("meeting"))
+
+        self.server.stub.behaviors["pushover"] = Behavior(error_rate=1.0)
+        notifier.resolve()
+        self.assertEqual(self.state.get(RECEIPT_SECTION)["receipt"], "r1")
+
+        # The next run retries the cancellation.
+        self.server.stub.behaviors["pushover"] = Behavior()
+        notifier.resolve()
+        self.assertTrue(receipts["r1"]["cancelled"])
+        self.assertEqual(self.state.get(RECEIPT_SECTION), {})
+
+    def test_async_failed_cancel_keeps_receipt(self):
+        async def scenario():
+            async with httpx.AsyncClient() as http:
+                notifier = AsyncPushoverNotifier(self.config.notifications.pushover, http, self.state)
+                self.assertTrue(await notifier.notify("meeting"))
+                self.server.stub.behaviors["pushover"] = Behavior(error_rate=1.0)
+                await notifier.resolve()
+                self.assertEqual(self.state.get(RECEIPT_SECTION)["receipt"], "r1")
+                self.server.stub.behaviors["pushover"] = Behavior()
+                await notifier.resolve()
+
+        asyncio.run(scenario())
+        self.assertTrue(self.server.stub.pushover_receipts["r1"]["cancelled"])
+        self.assertEqual(self.state.get(RECEIPT_SECTION), {})
+
+    def test_different_alert_pages_while_ringing(self):
+        receipts = self.server.stub.pushover_receipts
+        notifier = PushoverNotifier(self.config.notifications.pushover, self.state)
+        self.assertTrue(notifier.notify("meeting"))
+        receipts["r1"]["acknowledged_at"] = int(time.time()) - 60
+
+        self.assertTrue(notifier.notify("meeting\nCRITICAL: Slack session token expired."))
+        self.assertEqual(list(receipts), ["r1", "r2"])
+        self.assertEqual(self.state.get(RECEIPT_SECTION)["receipt"], "r2")
+        # The last receipt's alert is the one suppressed from now on.
+        self.assertTrue(notifier.notify("meeting\nCRITICAL: Slack session token expired."))
+        self.assertEqual(list(receipts), ["r1", "r2"])
+
+    def test_untracked_priorities_always_page(self):
+        self.config.notifications.pushover.priority = 1
+        notifier = PushoverNotifier(self.config.notifications.pushover, self.state)
+        notifier.notify("one")
+        notifier.notify("two")
+        self.assertEqual(self.server.stub.stats["pushover"].requests, 2)
+        self.assertIsNone(self.state.get(RECEIPT_SECTION))
+
+    def test_run_cancels_only_after_full_clear_check(self):
+        with mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        }):
+            self.server.set_mailbox(build_mailbox(10, meet_ratio=0.5))
+            self.config.run.memo_ttl = 0  # Runs minutes apart
+            self.config.polling.enabled = True
+            manager = NotificationManager(self.config.notifications, self.state)
+            run_once(self.config, manager, state=self.state)
+            receipt = self.server.stub.pushover_receipts["r1"]
+
+            # Nothing left to alert about, but no source is due yet: the alert keeps ringing.
+            self.server.set_mailbox([])
+            self.server.stub.slack_badges = {"channels": 0, "dms": 0, "thread_mentions": 0}
+            run_once(self.config, manager, state=self.state)
+            self.assertFalse(receipt["cancelled"])
+
+            self.config.polling.enabled = False
+            run_once(self.config, manager, state=self.state)
+            self.assertTrue(receipt["cancelled"])
+            self.assertEqual(len(self.server.stub.pushover_receipts), 1)
+
+    def test_failed_source_does_not_cancel(self):
+        with mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        }):
+            self.config.polling.enabled = False
+            self.config.run.memo_ttl = 0
+            manager = NotificationManager(self.config.notifications, self.state)
+            self.assertTrue(manager.notify("meeting"))
+            receipt = self.server.stub.pushover_receipts["r1"]
+
+            # Meet is clear, but Slack is down: nothing is known about the Slack alert.
+            self.server.set_mailbox([])
+            self.server.stub.behaviors["slack"] = Behavior(error_rate=1.0)
+            run_once(self.config, manager, state=self.state)
+            self.assertFalse(receipt["cancelled"])
+            self.assertEqual(self.state.get(RECEIPT_SECTION)["receipt"], "r1")
+
+            self.server.stub.behaviors["slack"] = Behavior()
+            self.server.stub.slack_badges = {"channels": 0, "dms": 0, "thread_mentions": 0}
+            run_once(self.config, manager, state=self.state)
+            self.assertTrue(receipt["cancelled"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from agent.config.schema import ProviderQuotaConfig, QuotaConfig
+from agent.deadline import DEADLINE
+from agent.errors import DeadlineExceeded, RateLimitedError
+from agent.main import run_once
+from agent.notifier.manager import NotificationManager
+from agent.ratelimit import LIMITER, QuotaLimiter, TokenBucket
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.stubs import StubServer
+
+class FakeTime:
+    """Clock whose sleep() advances the clock instead of blocking."""
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reservations_queue_behind_each_other(self):
+        t = FakeTime()
+        bucket = TokenBucket(rate=10, capacity=10, clock=t.clock)
+        self.assertEqual(bucket.reserve(10), 0)
+        self.assertAlmostEqual(bucket.reserve(5), 0.5)
+        self.assertAlmostEqual(bucket.reserve(5), 1.0)
+        t.now += 1.0
+        self.assertAlmostEqual(bucket.reserve(5), 0.5)
+
+    def test_refill_is_capped(self):
+        t = FakeTime()
+        bucket = TokenBucket(rate=10, capacity=10, clock=t.clock)
+        t.now += 100
+        self.assertEqual(bucket.reserve(10), 0)
+        self.assertAlmostEqual(bucket.reserve(1), 0.1)
+
+    def test_max_wait_refuses_without_taking(self):
+        t = FakeTime()
+        bucket = TokenBucket(rate=1, capacity=1, clock=t.clock)
+        bucket.reserve(1)
+        self.assertIsNone(bucket.reserve(10, max_wait=5))
+        self.assertAlmostEqual(bucket.reserve(1, max_wait=5), 1.0)
+
+class TestQuotaLimiter(unittest.TestCase):
+    def setUp(self):
+        self.t = FakeTime()
+        config = QuotaConfig(gmail=ProviderQuotaConfig(rate=250, burst=250), max_wait=2)
+        self.limiter = QuotaLimiter(config, clock=self.t.clock, sleep=self.t.sleep)
+
+    def test_gmail_burst_is_paced_by_method_cost(self):
+        # 100 messages.get at 5 units each = 500 units: 250 burst, then 250 more at 250/s.
+        for _ in range(100):
+            self.limiter.acquire("gmail", "messages.get")
+        self.assertAlmostEqual(self.t.now, 1.0)
+        self.assertEqual(self.limiter.take_usage(), {"gmail": {"messages.get": 500}})
+        self.assertEqual(self.limiter.take_usage(), {})
+
+    def test_exhausted_quota_raises_rate_limited(self):
+        for _ in range(50):
+            self.limiter.acquire("gmail", "messages.get")
+        for _ in range(100):
+            self.limiter._reserve("gmail", "messages.get")  # queue up 2s of work without sleeping
+        with self.assertRaises(RateLimitedError) as ctx:
+            self.limiter.acquire("gmail", "messages.batchModify")
+        self.assertGreater(ctx.exception.retry_after, 2)
+
+    def test_rejected_calls_are_not_charged(self):
+        for _ in range(50):
+            self.limiter.acquire("gmail", "messages.get")
+        self.limiter.take_usage()
+        bucket = self.limiter.buckets["gmail"]
+        for _ in range(70):
+            self.limiter._reserve("gmail", "messages.get")  # 1.4s of queued work
+        tokens = bucket.tokens
+        with DEADLINE.run(1), self.assertRaises(DeadlineExceeded):
+            self.limiter.acquire("gmail", "messages.get")
+        self.assertEqual(bucket.tokens, tokens)
+        for _ in range(30):
+            self.limiter._reserve("gmail", "messages.get")
+        tokens = bucket.tokens
+        with self.assertRaises(RateLimitedError):
+            self.limiter.acquire("gmail", "messages.batchModify")
+        self.assertEqual(bucket.tokens, tokens)
+        self.assertEqual(self.t.slept, [])
+        self.assertEqual(self.limiter.take_usage(), {})
+
+    def test_async_acquire(self):
+        limiter = QuotaLimiter(QuotaConfig(slack=ProviderQuotaConfig(rate=1000, burst=2)))
+
+        async def burst():
+            await asyncio.gather(*(limiter.acquire_async("slack", "users.info") for _ in range(12)))
+
+        asyncio.run(burst())  # 10 units beyond the burst at 1000/s: ~10ms
+        self.assertEqual(limiter.take_usage(), {"slack": {"users.info": 12}})
+
+    def test_disabled_only_counts(self):
+        limiter = QuotaLimiter(QuotaConfig(enabled=False), clock=self.t.clock, sleep=self.t.sleep)
+        for _ in range(1000):
+            limiter.acquire("gmail", "messages.get")
+        self.assertEqual(self.t.slept, [])
+        self.assertEqual(limiter.take_usage()["gmail"]["messages.get"], 5000)
+
+class TestUsageInState(unittest.TestCase):
+    def test_run_records_units(self):
+        with StubServer() as server, tempfile.TemporaryDirectory() as tmp:
+            config = build_config(server.url)
+            config.meet.enabled = False
+            LIMITER.take_usage()
+            state = StateStore(os.path.join(tmp, "state.json"))
+            run_once(config, NotificationManager(config.notifications), state=state)
+
+            quota = StateStore(state.file_path).get("quota")
+        self.assertEqual(quota["last_run"], {"slack": {"client.counts": 2}})
+        self.assertEqual(quota["daily"], {"slack": 2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+from agent.mail.filters import MeetNotification
+from agent.mail.ics import CalendarEvent
+from agent.main import next_check_delay, run_once
+from agent.notifier.manager import NotificationManager
+from agent.reminders import REMINDERS, ReminderQueue
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import StubServer
+
+def notification(uid, start, sequence=0, method="REQUEST"):
+    start = datetime.fromtimestamp(start, tz=timezone.utc)
+    event = CalendarEvent(uid=uid, sequence=sequence, start=start, end=start.replace(hour=(start.hour + 1) % 24),
+                          method=method)
+    return MeetNotification(email_id=f"{uid}-{sequence}", title=f"Meeting {uid}", received_at=start,
+                            status="invitation", event=event)
+
+class TestReminderQueue(unittest.TestCase):
+    def setUp(self):
+        self.now = 1_700_000_000.0
+        self.state = {}
+        self.queue = ReminderQueue(300, self.state, clock=lambda: self.now)
+
+    def test_fires_once_at_lead_time(self):
+        self.queue.schedule([notification("b", self.now + 3600), notification("a", self.now + 1200)])
+        self.assertEqual(self.queue.seconds_until_next(), 900)
+        self.now += 899
+        self.assertEqual(self.queue.pop_due(), [])
+
+        self.now += 1
+        due = self.queue.pop_due()
+        self.assertEqual([r["uid"] for r in due], ["a"])
+        # A rescan of the same invitation doesn't schedule it again.
+        self.queue.schedule([notification("a", self.now + 300)])
+        self.assertEqual(self.queue.seconds_until_next(), 3600 - 300 - 900)
+
+    def test_reschedule_cancel_and_missed(self):
+        self.queue.schedule([notification("a", self.now + 1200), notification("b", self.now + 1800)])
+        self.queue.schedule([notification("a", self.now + 7200, sequence=1),
+                             notification("b", self.now + 1800, sequence=2, method="CANCEL")])
+        self.now += 1800
+        self.assertEqual(self.queue.pop_due(), [])
+        self.assertEqual(self.queue.seconds_until_next(), 7200 - 300 - 1800)
+
+        missed = REMINDERS.value(result="missed")
+        self.now += 7200 + 3600
+        self.assertEqual(self.queue.pop_due(), [])
+        self.assertEqual(REMINDERS.value(result="missed"), missed + 1)
+        self.assertEqual((self.state["events"], self.queue.seconds_until_next()), ({}, float("inf")))
+
+    def test_requeue_and_persistence(self):
+        self.queue.schedule([notification("a", self.now + 600)])
+        self.now += 300
+        due = self.queue.pop_due()
+        self.queue.requeue(due)
+
+        restored = ReminderQueue(300, json.loads(json.dumps(self.state)), clock=lambda: self.now)
+        self.assertEqual([r["uid"] for r in restored.pop_due()], ["a"])
+        self.assertEqual(restored.pop_due(), [])
+
+class TestReminderRuns(unittest.TestCase):
+    def test_run_pages_due_reminders(self):
+        with StubServer() as server, tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": server.url + "/", "GMAIL_TOKEN_URI": server.url + "/token",
+        }):
+            server.set_mailbox(build_mailbox(10, meet_ratio=0.5))
+            config = build_config(server.url)
+            config.slack = None
+            config.meet.remind_before = 5
+            config.meet.acknowledge = "archive"
+            config.run.memo_ttl = 0
+            state = StateStore(os.path.join(tmp, "state.json"))
+            manager = NotificationManager(config.notifications, state)
+
+            # The synthetic events are long over: scheduled by the scan, then dropped.
+            missed = REMINDERS.value(result="missed")
+            self.assertTrue(run_once(config, manager, state=state))
+            self.assertGreater(REMINDERS.value(result="missed"), missed)
+            self.assertEqual(state.get("reminders")["events"], {})
+
+            # The invitations are archived; the reminder still fires from state.
+            self.assertFalse([m for m in server.stub.mailbox if "INBOX" in m["labelIds"] and m["threadId"] != m["id"]])
+            now = time.time()
+            ReminderQueue(300, state.get("reminders")).schedule([notification("x", now + 240)])
+            self.assertLessEqual(next_check_delay(config, state), 1.0)
+            with mock.patch.object(manager, "notify", wraps=manager.notify) as notify:
+                self.assertTrue(run_once(config, manager, state=state))
+                self.assertTrue(run_once(config, manager, state=state))
+            self.assertEqual([c.args[0] for c in notify.call_args_list], ["Google Meet event in 4 min: Meeting x"])
+
+if __name__ == '__main__':
+    unittest.main()
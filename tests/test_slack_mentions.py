@@ -0,0 +1,132 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import httpx
+from agent.config.schema import QuotaConfig
+from agent.main import check_slack
+from agent.ratelimit import LIMITER
+from agent.slack.cache import TTLCache
+from agent.slack.client import AsyncSlackSessionClient, SlackSessionClient, _changed_conversations
+from agent.state.store import StateStore
+from benchmarks.e2e import build_config
+from benchmarks.stubs import StubServer
+
+def conversations():
+    return [
+        {"id": "C1", "name": "general", "kind": "channels", "last_read": "100.0", "mention_count": 1, "messages": [
+            {"ts": "99.0", "user": "U1", "text": "<@USELF> already read"},
+            {"ts": "101.0", "user": "U1", "text": "lunch?"},
+            {"ts": "102.0", "user": "U2", "text": "<@USELF> can you review?\nDetails inside"},
+        ]},
+        {"id": "C2", "name": "random", "kind": "channels", "last_read": "0", "mention_count": 0, "messages": [
+            {"ts": "103.0", "user": "U1", "text": "no mention here"},
+        ]},
+        {"id": "D1", "name": "dm", "kind": "ims", "last_read": "0", "mention_count": 1, "messages": [
+            {"ts": "104.0", "user": "U1", "text": "ping"},
+        ]},
+    ]
+
+class TestTTLCache(unittest.TestCase):
+    def test_entries_expire_and_survive_round_trip(self):
+        now = [1000.0]
+        cache = TTLCache(ttl=60, clock=lambda: now[0])
+        cache.set("user:U1", "alice")
+        self.assertEqual(cache.get("user:U1"), "alice")
+
+        restored = TTLCache(ttl=60, clock=lambda: now[0])
+        restored.load(cache.to_dict())
+        self.assertEqual(restored.get("user:U1"), "alice")
+
+        now[0] += 61
+        self.assertIsNone(restored.get("user:U1"))
+        self.assertEqual(cache.to_dict(), {})
+
+    def test_max_size_evicts_oldest(self):
+        cache = TTLCache(ttl=60, max_size=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
+
+class TestChangedConversations(unittest.TestCase):
+    def test_only_moved_badges_are_fetched(self):
+        counts = {
+            "channels": [{"id": "C1", "last_read": "100.0", "latest": "102.0", "mention_count": 1},
+                         {"id": "C2", "last_read": "0", "latest": "103.0", "mention_count": 0}],
+            "ims": [{"id": "D1", "last_read": "0", "latest": "104.0", "mention_count": 0, "has_unreads": True}],
+        }
+        changed, seen = _changed_conversations(counts, {"D1": "104.0", "C9": "1.0"})
+        self.assertEqual(changed, [{"id": "C1", "is_dm": False, "oldest": "100.0"}])
+        # Read/untouched conversations drop out of the map.
+        self.assertEqual(seen, {"C1": "102.0", "D1": "104.0"})
+
+        changed, _ = _changed_conversations(counts, {"C1": "101.5"})
+        self.assertEqual(changed[0]["oldest"], "101.5")
+
+class TestSlackMentions(unittest.TestCase):
+    def setUp(self):
+        # Pacing against Slack's real limits would make these runs wait on the bucket.
+        LIMITER.configure(QuotaConfig(enabled=False))
+        self.addCleanup(LIMITER.configure, QuotaConfig())
+        self.server = StubServer().start()
+        self.server.stub.slack_conversations = conversations()
+        self.server.stub.slack_users = {"U1": "alice", "U2": "bob"}
+
+    def tearDown(self):
+        self.server.stop()
+
+    def client(self, cache=None):
+        return SlackSessionClient("xoxc", "xoxd", self.server.url, name_cache=cache)
+
+    def paths(self):
+        return self.server.stub.stats["slack"].paths
+
+    def test_fetches_new_mentions_then_only_new_activity(self):
+        cache = TTLCache(ttl=3600)
+        client = self.client(cache)
+        counts = client.get_unread_count()["raw_data"]
+        mentions, seen = client.get_mentions(counts, {})
+
+        self.assertEqual([str(m) for m in mentions], ["#general - bob: <@USELF> can you review?", "DM - alice: ping"])
+        self.assertEqual(self.paths()["/api/conversations.history"], 2)
+
+        # Nothing moved: no history calls at all.
+        self.server.reset_stats()
+        mentions, seen = client.get_mentions(client.get_unread_count()["raw_data"], seen)
+        self.assertEqual(mentions, [])
+        self.assertNotIn("/api/conversations.history", self.paths())
+
+        # One new DM: one history call, names served from the cache.
+        self.server.stub.slack_conversations[2]["messages"].append({"ts": "105.0", "user": "U2", "text": "hello?"})
+        self.server.reset_stats()
+        mentions, _ = self.client(cache).get_mentions(client.get_unread_count()["raw_data"], seen)
+        self.assertEqual([str(m) for m in mentions], ["DM - bob: hello?"])
+        self.assertEqual(self.paths()["/api/conversations.history"], 1)
+        for path in ("/api/users.info", "/api/conversations.info", "/api/auth.test"):
+            self.assertNotIn(path, self.paths())
+
+    def test_async_client_matches_sync(self):
+        async def fetch():
+            async with httpx.AsyncClient() as http:
+                client = AsyncSlackSessionClient("xoxc", "xoxd", self.server.url, http, max_concurrency=2)
+                counts = (await client.get_unread_count())["raw_data"]
+                return await client.get_mentions(counts, {})
+
+        mentions, seen = asyncio.run(fetch())
+        self.assertEqual([str(m) for m in mentions], ["#general - bob: <@USELF> can you review?", "DM - alice: ping"])
+        self.assertEqual(seen, {"C1": "102.0", "D1": "104.0"})
+
+    def test_check_slack_lists_mentions_once(self):
+        config = build_config(self.server.url)
+        with tempfile.TemporaryDirectory() as tmp:
+            state = StateStore(os.path.join(tmp, "state.json"))
+            first = check_slack(config, state)
+            self.assertIn("#general - bob", first[0])
+            state.save()
+
+            second = check_slack(config, StateStore(state.file_path))
+        self.assertEqual(second, ["You have 1 unread Slack messages."])
+
+if __name__ == '__main__':
+    unittest.main()
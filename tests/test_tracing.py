@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from agent.async_main import create_http_client, run_once as run_once_async
+from agent.main import run_once, write_trace
+from agent.notifier.manager import AsyncNotificationManager, NotificationManager
+from agent.state.store import StateStore
+from agent.tracing import TRACER, Tracer, traced
+from benchmarks.e2e import build_config
+from benchmarks.mailbox import build_mailbox
+from benchmarks.stubs import Behavior, StubServer
+
+def spans(events, name):
+    return [e for e in events if e["ph"] == "X" and e["name"] == name]
+
+class TestTracer(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        tracer = Tracer()
+        with tracer.span("noop"):
+            pass
+        self.assertEqual(tracer.events(), [])
+
+    def test_spans_nest_and_record_errors(self):
+        tracer = Tracer()
+        tracer.enable()
+        with tracer.span("outer", size=3):
+            with self.assertRaises(ValueError), tracer.span("inner"):
+                raise ValueError("boom")
+        outer, inner = spans(tracer.events(), "outer")[0], spans(tracer.events(), "inner")[0]
+        self.assertEqual(outer["tid"], inner["tid"])
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        self.assertGreaterEqual(outer["ts"] + outer["dur"], inner["ts"] + inner["dur"])
+        self.assertEqual(outer["args"], {"size": 3})
+        self.assertEqual(inner["args"], {"error": "ValueError"})
+
+    def test_traced_async_tasks_get_own_tracks(self):
+        TRACER.enable()
+        self.addCleanup(TRACER.disable)
+
+        @traced("work")
+        async def work():
+            await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(work(), work(), work())
+
+        asyncio.run(main())
+        events = spans(TRACER.events(), "work")
+        self.assertEqual(len({e["tid"] for e in events}), 3)
+        names = [e for e in TRACER.events() if e["ph"] == "M"]
+        self.assertEqual(len(names), 3)
+
+class TestRunTrace(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.set_mailbox(build_mailbox(20, meet_ratio=0.5))
+        self.config = build_config(self.server.url)
+        # Each event's emails share a thread, fetched with one threads.get.
+        self.invitation_threads = len({m["threadId"] for m in self.server.stub.mailbox
+                                       if m["payload"]["headers"][0]["value"].startswith("Google Calendar")})
+        patcher = mock.patch.dict(os.environ, {
+            "GMAIL_CLIENT_ID": "id", "GMAIL_CLIENT_SECRET": "secret", "GMAIL_REFRESH_TOKEN": "refresh",
+            "GMAIL_API_ENDPOINT": self.server.url + "/", "GMAIL_TOKEN_URI": self.server.url + "/token",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        TRACER.enable()
+        self.addCleanup(TRACER.disable)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.config.tracing.enabled = True
+        self.trace_dir = os.path.join(self.tmp.name, "traces")
+        os.makedirs(self.trace_dir)
+        self.config.tracing.output_file = os.path.join(self.trace_dir, "trace-{timestamp}.json")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _written_trace(self):
+        write_trace(self.config)
+        self.assertEqual(TRACER.events(), [])
+        files = os.listdir(self.trace_dir)
+        self.assertEqual(len(files), 1)
+        with open(os.path.join(self.trace_dir, files[0])) as f:
+            return json.load(f)["traceEvents"]
+
+    def test_sync_run(self):
+        state = StateStore(os.path.join(self.tmp.name, "state.json"))
+        run_once(self.config, NotificationManager(self.config.notifications), state=state)
+        events = self._written_trace()
+
+        for name in ("run", "source.slack", "source.meet", "slack.client.counts", "gmail.oauth_refresh",
+                     "gmail.threads.list", "meet.filter", "notify.pushover", "notify.telegram_call", "state.save"):
+            self.assertEqual(len(spans(events, name)), 1, name)
+        self.assertEqual(len(spans(events, "gmail.threads.get")), self.invitation_threads)
+        run = spans(events, "run")[0]
+        meet = spans(events, "source.meet")[0]
+        self.assertTrue(run["ts"] <= meet["ts"] and meet["ts"] + meet["dur"] <= run["ts"] + run["dur"])
+
+    def test_async_gets_overlap(self):
+        self.server.stub.behaviors["gmail"] = Behavior(latency=0.02)
+
+        async def cycle():
+            async with create_http_client(self.config) as http:
+                manager = AsyncNotificationManager(self.config.notifications, http)
+                await run_once_async(self.config, http, manager)
+
+        asyncio.run(cycle())
+        gets = spans(self._written_trace(), "gmail.threads.get")
+        self.assertEqual(len(gets), self.invitation_threads)
+        self.assertGreater(len({g["tid"] for g in gets}), 1)
+        first_end = min(g["ts"] + g["dur"] for g in gets)
+        self.assertGreater(sum(g["ts"] < first_end for g in gets), 1)
+
+if __name__ == '__main__':
+    unittest.main()